@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class AccessConfig(AppConfig):
     name = 'access'
+
+    def ready(self):
+        from ephany_framework.instrumentation import register_stats
+
+        from .cache import api_key_cache
+        register_stats('api_key_cache', api_key_cache.stats)
@@ -0,0 +1,105 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from ephany_framework.stamps import aget_stamp, bump_stamp, get_stamp
+
+
+def hash_key(key: str) -> str:
+    """Cache entries are keyed by a digest so raw keys never sit in memory indexes."""
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+class APIKeyCache:
+    """
+    Bounded LRU of validated API clients with a per-entry TTL.
+
+    Any change to an APIClient row bumps the shared 'api_clients' stamp; every
+    process drops its whole cache on the next lookup, so deactivating or
+    deleting a key takes effect immediately rather than after the TTL.
+    """
+    STAMP = 'api_clients'
+
+    def __init__(self, max_size=None, ttl=None):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stamp = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_size(self):
+        if self._max_size is None:
+            return getattr(settings, 'API_KEY_CACHE_SIZE', 1024)
+        return self._max_size
+
+    @property
+    def ttl(self):
+        if self._ttl is None:
+            return getattr(settings, 'API_KEY_CACHE_TTL', 300)
+        return self._ttl
+
+    def current_stamp(self):
+        return get_stamp(self.STAMP)
+
+    async def acurrent_stamp(self):
+        return await aget_stamp(self.STAMP)
+
+    def get(self, digest, stamp):
+        """
+        Returns the cached client for `digest`, or None.
+        `stamp` must be read before the lookup so a concurrent revocation is never missed.
+        """
+        with self._lock:
+            if stamp != self._stamp:
+                self._entries.clear()
+                self._stamp = stamp
+
+            entry = self._entries.get(digest)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[digest]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, digest, client, stamp):
+        with self._lock:
+            # The row was read under an older stamp: it may already be revoked
+            if stamp != self._stamp:
+                return
+
+            self._entries[digest] = (client, time.monotonic() + self.ttl)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+        bump_stamp(self.STAMP)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+api_key_cache = APIKeyCache()
@@ -1,45 +1,114 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.conf import settings
 from django.http import JsonResponse
 
+from .cache import api_key_cache, hash_key
 from .models import APIClient
 
 
 class APIKeyMiddleware:
+    # Runs natively under both WSGI and ASGI, so async views are not pushed into threads
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
 
     def _path_is_protected(self, path: str) -> bool:
         prefixes = getattr(settings, "API_KEY_PROTECTED_PREFIXES", ["/api/"])
         return any(path.startswith(prefix) for prefix in prefixes)
 
-    def __call__(self, request):
+    def _get_key(self, request):
+        """The key sent with a protected request ('' if none), or None when no key is needed."""
         # If feature is disabled, do nothing
         if not getattr(settings, "API_KEY_AUTH_ENABLED", False):
-            return self.get_response(request)
+            return None
 
         # Only protect configured prefixes
         if not self._path_is_protected(request.path):
-            return self.get_response(request)
+            return None
 
         # Get key from header or query string
-        key = (
+        return (
             request.headers.get("X-API-Key")
             or request.META.get("HTTP_X_API_KEY")
             or request.GET.get("api_key")
+            or ""
         )
 
-        if not key:
-            return JsonResponse({"detail": "API key required."}, status=401)
+    def _get_client(self, key):
+        # Serve validated keys from the in-process cache; only misses hit the DB
+        digest = hash_key(key)
+        stamp = api_key_cache.current_stamp()
+        client = api_key_cache.get(digest, stamp)
+        if client is not None:
+            return client
 
         try:
             client = APIClient.objects.get(key=key, is_active=True)
         except APIClient.DoesNotExist:
-            return JsonResponse(
-                {"detail": "Invalid or inactive API key."},
-                status=403,
-            )
+            return None
+
+        api_key_cache.set(digest, client, stamp)
+        return client
+
+    async def _aget_client(self, key):
+        digest = hash_key(key)
+        stamp = await api_key_cache.acurrent_stamp()
+        client = api_key_cache.get(digest, stamp)
+        if client is not None:
+            return client
+
+        try:
+            client = await APIClient.objects.aget(key=key, is_active=True)
+        except APIClient.DoesNotExist:
+            return None
+
+        api_key_cache.set(digest, client, stamp)
+        return client
+
+    def _key_required(self):
+        return JsonResponse({"detail": "API key required."}, status=401)
+
+    def _key_rejected(self):
+        return JsonResponse(
+            {"detail": "Invalid or inactive API key."},
+            status=403,
+        )
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        key = self._get_key(request)
+        if key is None:
+            return self.get_response(request)
+        if not key:
+            return self._key_required()
+
+        client = self._get_client(key)
+        if client is None:
+            return self._key_rejected()
 
         # Attach for downstream use (logging, rate limiting, etc.)
         request.api_client = client
 
         return self.get_response(request)
+
+    async def __acall__(self, request):
+        key = self._get_key(request)
+        if key is None:
+            return await self.get_response(request)
+        if not key:
+            return self._key_required()
+
+        client = await self._aget_client(key)
+        if client is None:
+            return self._key_rejected()
+
+        request.api_client = client
+
+        return await self.get_response(request)
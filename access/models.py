@@ -1,5 +1,9 @@
 import secrets
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import api_key_cache
 
 
 class APIClient(models.Model):
@@ -16,3 +20,9 @@ class APIClient(models.Model):
 
     def __str__(self):
         return self.name
+
+
+# Deactivation, deletion or any other edit must reach every worker's key cache
+@receiver([post_save, post_delete], sender=APIClient)
+def invalidate_api_key_cache(sender, **kwargs):
+    api_key_cache.invalidate()
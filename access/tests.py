@@ -1,3 +1,74 @@
-from django.test import TestCase
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, TestCase, override_settings
+
+
+from .cache import api_key_cache, hash_key
+from .middleware import APIKeyMiddleware
+from .models import APIClient
+
+
+@override_settings(API_KEY_AUTH_ENABLED=True)
+class APIKeyMiddlewareCacheTests(TestCase):
+
+    def setUp(self):
+        self.client_row = APIClient.objects.create(name="Revit plugin")
+        self.headers = {'HTTP_X_API_KEY': self.client_row.key}
+
+    def test_validated_key_is_served_from_cache(self):
+        self.client.get('/api/categories/', **self.headers)
+        hits = api_key_cache.hits
+
+        # Only the view's own COUNT remains (the table is empty)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/categories/', **self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(api_key_cache.hits, hits + 1)
+
+    def test_deactivation_revokes_cached_key_immediately(self):
+        self.assertEqual(self.client.get('/api/categories/', **self.headers).status_code, 200)
+
+        self.client_row.is_active = False
+        self.client_row.save()
+        self.assertEqual(self.client.get('/api/categories/', **self.headers).status_code, 403)
+
+    def test_deletion_revokes_cached_key_immediately(self):
+        self.assertEqual(self.client.get('/api/categories/', **self.headers).status_code, 200)
+
+        self.client_row.delete()
+        self.assertEqual(self.client.get('/api/categories/', **self.headers).status_code, 403)
+
+    def test_cache_never_indexes_raw_keys(self):
+        self.client.get('/api/categories/', **self.headers)
+        self.assertIn(hash_key(self.client_row.key), api_key_cache._entries)
+        self.assertNotIn(self.client_row.key, api_key_cache._entries)
+
+    def test_unknown_key_is_rejected(self):
+        response = self.client.get('/api/categories/', HTTP_X_API_KEY='not-a-key')
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(API_KEY_AUTH_ENABLED=True)
+class AsyncAPIKeyMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.client_row = APIClient.objects.create(name="Revit plugin")
+
+        async def view(request):
+            return HttpResponse(request.api_client.name)
+
+        self.middleware = APIKeyMiddleware(view)
+
+    def test_runs_natively_in_async_chains(self):
+        self.assertTrue(iscoroutinefunction(self.middleware))
+        self.assertFalse(iscoroutinefunction(APIKeyMiddleware(lambda request: HttpResponse())))
+
+    async def test_checks_keys_without_a_thread_per_request(self):
+        factory = AsyncRequestFactory()
+        self.assertEqual((await self.middleware(factory.get('/api/assets/'))).status_code, 401)
+        self.assertEqual((await self.middleware(factory.get('/api/assets/', headers={'X-API-Key': 'nope'}))).status_code, 403)
+
+        response = await self.middleware(factory.get('/api/assets/', headers={'X-API-Key': self.client_row.key}))
+        self.assertEqual((response.status_code, response.content), (200, b'Revit plugin'))
+        self.assertIn(hash_key(self.client_row.key), api_key_cache._entries)
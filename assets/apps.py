@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class AssetsConfig(AppConfig):
     name = 'assets'
+
+    def ready(self):
+        # Register signal handlers (schema cache, search and custom field indexes)
+        from . import signals  # noqa: F401
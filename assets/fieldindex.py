@@ -0,0 +1,187 @@
+"""
+Typed, indexed filtering on custom_fields.
+
+Every write to an Asset or AssetInstance mirrors its custom_fields into a side
+table (AssetFieldValue / InstanceFieldValue) with one row per key and typed,
+indexed columns. Query parameters such as
+
+    ?cf.voltage=208
+    ?cf.weight__gte=50
+    ?cf.finish__in=chrome,satin
+
+are coerced using the AssetAttribute schema (data_type + unit_type), unit
+converted from the requesting user's preferred units into storage units, and
+resolved with an index range scan on (name, value).
+"""
+import json
+import math
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+from ephany_framework.utils import UnitConverter
+from .models import AssetAttribute
+from .schema import attribute_registry
+
+PARAM_PREFIX = 'cf.'
+OPERATORS = ('exact', 'gt', 'gte', 'lt', 'lte', 'in', 'contains', 'isnull')
+RANGE_OPERATORS = ('gt', 'gte', 'lt', 'lte')
+NAME_MAX_LENGTH = 50
+TEXT_MAX_LENGTH = 255
+
+TRUE_VALUES = ('true', '1', 'yes')
+FALSE_VALUES = ('false', '0', 'no')
+
+
+def field_value_rows(custom_fields):
+    """
+    Flattens a custom_fields dict into (name, value_num, value_text) rows.
+    Numbers are stored as-is (already in storage units), booleans as 1/0 plus
+    'true'/'false', everything else as lowercased text.
+    """
+    rows = []
+    for name, value in (custom_fields or {}).items():
+        if value is None:
+            continue
+        name = name[:NAME_MAX_LENGTH]
+        if isinstance(value, bool):
+            rows.append((name, 1.0 if value else 0.0, 'true' if value else 'false'))
+        elif isinstance(value, (int, float)):
+            rows.append((name, float(value), None))
+        elif isinstance(value, str):
+            rows.append((name, None, value.lower()[:TEXT_MAX_LENGTH]))
+        else:
+            rows.append((name, None, json.dumps(value).lower()[:TEXT_MAX_LENGTH]))
+    return rows
+
+
+def reindex_custom_fields(index_model, owner_field, owners, batch_size=1000):
+    """
+    Replaces the index rows of `owners` (Asset or AssetInstance objects).
+    Bulk write paths that bypass post_save must call this themselves.
+    """
+    owners = [owner for owner in owners if owner.pk is not None]
+    if not owners:
+        return
+
+    for start in range(0, len(owners), batch_size):
+        batch = owners[start:start + batch_size]
+        index_model.objects.filter(**{f'{owner_field}_id__in': [o.pk for o in batch]}).delete()
+        index_model.objects.bulk_create(
+            [
+                index_model(**{f'{owner_field}_id': owner.pk}, name=name, value_num=num, value_text=text)
+                for owner in batch
+                for name, num, text in field_value_rows(owner.custom_fields)
+            ],
+            batch_size=batch_size,
+        )
+
+
+def parse_filter_params(query_params):
+    """Returns [(param, attribute name, operator, raw value)] for every cf.* parameter."""
+    filters = []
+    for param in query_params:
+        if not param.startswith(PARAM_PREFIX):
+            continue
+        name, _, operator = param[len(PARAM_PREFIX):].partition('__')
+        operator = operator or 'exact'
+        if not name or operator not in OPERATORS:
+            raise ValidationError({
+                param: f"Unsupported custom field filter. Use cf.<name>[__{'|'.join(OPERATORS)}]."
+            })
+        for raw in query_params.getlist(param):
+            filters.append((param, name, operator, raw))
+    return filters
+
+
+def filter_queryset(queryset, filters, index_model, owner_field, user_units):
+    """Applies parsed cf.* filters; each one becomes a `pk IN (index lookup)` clause."""
+    schema = attribute_registry.get()
+    owner_column = f'{owner_field}_id'
+
+    for param, name, operator, raw in filters:
+        rows = index_model.objects.filter(name=name)
+
+        if operator == 'isnull':
+            is_null = _parse_bool(param, raw)
+            owners = rows.values(owner_column)
+            queryset = queryset.exclude(pk__in=owners) if is_null else queryset.filter(pk__in=owners)
+            continue
+
+        lookups = _build_lookups(param, schema.get(name), operator, raw, user_units)
+        queryset = queryset.filter(pk__in=rows.filter(lookups).values(owner_column))
+
+    return queryset
+
+
+def _build_lookups(param, spec, operator, raw, user_units):
+    data_type = spec.data_type if spec else None
+    is_numeric = data_type in (AssetAttribute.AttributeType.INTEGER, AssetAttribute.AttributeType.FLOAT)
+    is_bool = data_type == AssetAttribute.AttributeType.BOOLEAN
+    operands = raw.split(',') if operator == 'in' else [raw]
+
+    if is_bool:
+        values = [1.0 if _parse_bool(param, op) else 0.0 for op in operands]
+        return _numeric_lookups(param, operator, values)
+
+    # Keys with no AssetAttribute (free-form instance fields) are typed by the operand
+    if data_type is None:
+        is_numeric = operator in RANGE_OPERATORS or all(_is_number(op) for op in operands)
+
+    if is_numeric:
+        category = UnitConverter.category_for_spec(spec.unit_type) if spec else None
+        values = []
+        for operand in operands:
+            try:
+                value = float(operand)
+            except ValueError:
+                value = math.nan
+            if not math.isfinite(value):
+                raise ValidationError({param: f"'{operand}' is not a number."})
+            if category:
+                value = UnitConverter.to_storage(value, user_units[category], category)
+            values.append(value)
+        return _numeric_lookups(param, operator, values)
+
+    if operator in RANGE_OPERATORS:
+        raise ValidationError({param: f"'{spec.name}' is a text attribute; range filters need a number."})
+
+    values = [operand.strip().lower() for operand in operands]
+    if operator == 'in':
+        return Q(value_text__in=values)
+    if operator == 'contains':
+        return Q(value_text__contains=values[0])
+    return Q(value_text=values[0])
+
+
+def _numeric_lookups(param, operator, values):
+    if operator == 'contains':
+        raise ValidationError({param: "'contains' only applies to text attributes."})
+    if operator in ('in', 'exact'):
+        # Unit conversion introduces float noise, so equality is a tight range per value
+        lookups = Q()
+        for value in values:
+            lookups |= Q(value_num__range=_tolerance_range(value))
+        return lookups
+    return Q(**{f'value_num__{operator}': values[0]})
+
+
+def _tolerance_range(value):
+    tolerance = 1e-9 * max(1.0, abs(value))
+    return (value - tolerance, value + tolerance)
+
+
+def _is_number(value):
+    try:
+        return math.isfinite(float(value))
+    except ValueError:
+        return False
+
+
+def _parse_bool(param, raw):
+    value = raw.strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValidationError({param: f"'{raw}' is not a boolean (use true/false)."})
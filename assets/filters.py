@@ -0,0 +1,62 @@
+from rest_framework.filters import BaseFilterBackend
+
+from ephany_framework.utils import UnitConverter
+from . import fieldindex
+from .search import search_assets
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Ranked full-text search over assets: ?q=stainless sink
+    Backed by the FTS5 index in assets.search; best matches come first.
+    """
+    search_param = 'q'
+    # Results are ordered by rank, which keyset (?cursor=) pages cannot keep
+    rank_param = search_param
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').strip()
+        if not text:
+            return queryset
+        return search_assets(queryset, text)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.search_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Ranked full-text search across name, description, model and manufacturer.',
+                'schema': {'type': 'string'},
+            },
+        ]
+
+
+class CustomFieldFilter(BaseFilterBackend):
+    """
+    Typed attribute filters over custom_fields: ?cf.voltage=208, ?cf.weight__gte=50
+    Operands are given in the requesting user's preferred units.
+
+    Views name the side index to filter through:
+        custom_field_index = (AssetFieldValue, 'asset')
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        filters = fieldindex.parse_filter_params(request.query_params)
+        if not filters:
+            return queryset
+
+        index_model, owner_field = view.custom_field_index
+        user_units = UnitConverter.units_for_user(request.user)
+        return fieldindex.filter_queryset(queryset, filters, index_model, owner_field, user_units)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': 'cf.<attribute>[__gt|__gte|__lt|__lte|__in|__contains|__isnull]',
+                'required': False,
+                'in': 'query',
+                'description': 'Filter on a custom field, e.g. cf.voltage=208 or cf.weight__gte=50.',
+                'schema': {'type': 'string'},
+            },
+        ]
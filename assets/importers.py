@@ -0,0 +1,428 @@
+"""
+Bulk import of catalog rows from NDJSON or CSV.
+
+Rows are processed in batches. For every batch:
+  1. foreign keys (manufacturer, category, files) are resolved with one query each,
+  2. custom fields are validated against the cached attribute schema and
+     columns against the model's field limits (no queries),
+  3. dimensional values are unit-converted column by column,
+  4. rows are written with bulk_create inside one transaction
+     (assets upsert on type_id),
+  5. the search and custom field indexes are refreshed for the written rows,
+     since bulk_create does not send post_save.
+
+Invalid rows are reported individually (by 1-based row number) and skipped;
+the rest of the file is still imported.
+"""
+import codecs
+import csv
+import json
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+
+from ephany_framework.stamps import bump_table_stamp
+from ephany_framework.utils import UnitConverter, UnknownUnitError
+from . import fieldindex, search
+from .models import Asset, AssetAttribute, AssetCategory, AssetFieldValue, AssetFile, Manufacturer
+from .schema import attribute_registry
+
+FORMATS = ('ndjson', 'csv')
+
+CONTENT_TYPES = {
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'application/json-lines': 'ndjson',
+    'text/csv': 'csv',
+}
+
+# CSV column prefix for individual custom fields: cf.voltage,cf.finish,...
+CSV_CUSTOM_FIELD_PREFIX = 'cf.'
+
+
+class ImportFormatError(ValueError):
+    """The input as a whole cannot be read (unknown format, bad input_units...)."""
+
+
+def detect_format(content_type=None, filename=None):
+    if filename:
+        suffix = Path(filename).suffix.lower().lstrip('.')
+        if suffix in ('ndjson', 'jsonl'):
+            return 'ndjson'
+        if suffix == 'csv':
+            return 'csv'
+    if content_type:
+        fmt = CONTENT_TYPES.get(content_type.split(';')[0].strip().lower())
+        if fmt:
+            return fmt
+    raise ImportFormatError("Send NDJSON (application/x-ndjson, .ndjson) or CSV (text/csv, .csv).")
+
+
+def read_records(lines, fmt):
+    """
+    Yields (row number, record dict, error message) from an iterable of text
+    lines. Exactly one of record / error is set.
+    """
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(lines), start=1):
+            yield number, {k.strip(): v for k, v in row.items() if k and v not in ('', None)}, None
+        return
+
+    number = 0
+    for line in lines:
+        number += 1
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield number, None, f"Invalid JSON: {exc}"
+            continue
+        if not isinstance(record, dict):
+            yield number, None, "Each line must be a JSON object."
+            continue
+        yield number, record, None
+
+
+def records_from_request(request):
+    """
+    Streams records from either a multipart upload (field 'file') or a raw
+    NDJSON/CSV request body, without reading the whole body into memory.
+    """
+    if request.content_type.startswith('multipart/form-data'):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ImportFormatError("Upload the data as a file field named 'file'.")
+        fmt = detect_format(upload.content_type, upload.name)
+        return read_records(codecs.iterdecode(upload, 'utf-8-sig'), fmt)
+
+    fmt = detect_format(request.content_type)
+    return read_records(codecs.iterdecode(iter(request._request), 'utf-8-sig'), fmt)
+
+
+def parse_input_units(raw):
+    """
+    Validates an input_units mapping ({'length': 'ft', ...}), given as a dict or
+    a JSON string, against UnitConverter.
+    """
+    if not raw:
+        return {}
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            raise ImportFormatError("input_units must be a JSON object, e.g. {\"length\": \"ft\"}.")
+    if not isinstance(raw, dict):
+        raise ImportFormatError("input_units must be a JSON object, e.g. {\"length\": \"ft\"}.")
+
+    for category, unit in raw.items():
+        try:
+            UnitConverter.factor(category, unit)
+        except UnknownUnitError as exc:
+            raise ImportFormatError(str(exc))
+    return raw
+
+
+def error_messages(exc):
+    if hasattr(exc, 'message_dict'):
+        return exc.message_dict
+    return exc.messages
+
+
+class BulkImporter:
+    """Batching and per-row error reporting shared by the asset and instance importers."""
+    batch_size = 1000
+
+    def __init__(self, batch_size=None):
+        if batch_size:
+            try:
+                self.batch_size = max(1, int(batch_size))
+            except (TypeError, ValueError):
+                raise ImportFormatError("batch_size must be a positive integer.")
+        self.report = {'created': 0, 'updated': 0, 'failed': 0, 'errors': []}
+
+    def run(self, records):
+        batch = []
+        for number, record, error in records:
+            if error:
+                self.fail(number, error)
+                continue
+            batch.append((number, record))
+            if len(batch) >= self.batch_size:
+                self.process_batch(batch)
+                batch = []
+        if batch:
+            self.process_batch(batch)
+        return self.report
+
+    def fail(self, number, errors):
+        self.report['failed'] += 1
+        self.report['errors'].append({'row': number, 'errors': errors})
+
+    def process_batch(self, batch):
+        raise NotImplementedError
+
+    def _custom_fields(self, record, schema):
+        """The record's custom_fields object merged with its cf.<name> columns."""
+        custom_fields = record.get('custom_fields') or {}
+        if isinstance(custom_fields, str):
+            try:
+                custom_fields = json.loads(custom_fields)
+            except ValueError:
+                raise ValidationError("custom_fields must be a JSON object.")
+        if not isinstance(custom_fields, dict):
+            raise ValidationError("custom_fields must be a JSON object.")
+
+        # CSV cells are strings: type them from the schema
+        for key, raw in record.items():
+            if key.startswith(CSV_CUSTOM_FIELD_PREFIX):
+                name = key[len(CSV_CUSTOM_FIELD_PREFIX):]
+                custom_fields[name] = _coerce_cell(raw, schema.get(name))
+        return custom_fields
+
+
+class AssetImporter(BulkImporter):
+    """
+    Upserts assets on type_id. Rows are full records: on update, every
+    writable column (including custom_fields) is replaced.
+
+    Values are taken to be in storage units (mm, sq_m, cu_m, kg) unless
+    input_units names the unit used for a category, e.g. {'length': 'ft'}.
+
+    Accepted keys: type_id, manufacturer_id or manufacturer (name),
+    category_id or category (name), model, name, description, url,
+    overall_height, overall_width, overall_depth, custom_fields, file_ids.
+    CSV files may also carry one column per custom field as cf.<name>.
+    """
+    DIMENSION_FIELDS = ['overall_height', 'overall_width', 'overall_depth']
+    WRITE_FIELDS = [
+        'manufacturer', 'category', 'model', 'name', 'description', 'url',
+        'overall_height', 'overall_width', 'overall_depth', 'custom_fields',
+    ]
+
+    def __init__(self, input_units=None, batch_size=None):
+        super().__init__(batch_size)
+        self.input_units = parse_input_units(input_units)
+
+    def process_batch(self, batch):
+        lookups = self._resolve_relations([record for _, record in batch])
+        schema = attribute_registry.get()
+
+        prepared, seen = [], {}
+        for number, record in batch:
+            try:
+                asset, file_ids = self._build(record, lookups, schema)
+            except ValidationError as exc:
+                self.fail(number, error_messages(exc))
+                continue
+
+            if asset.type_id in seen:
+                self.fail(number, {'type_id': [f"Duplicate of row {seen[asset.type_id]} in the same batch."]})
+                continue
+            seen[asset.type_id] = number
+            prepared.append((number, asset, file_ids))
+
+        self._convert_units([asset for _, asset, _ in prepared], schema)
+        self._write(prepared)
+
+    def _resolve_relations(self, records):
+        """One query per relation for the whole batch."""
+        manufacturer_ids, manufacturer_names = set(), set()
+        category_ids, category_names = set(), set()
+        file_ids = set()
+
+        for record in records:
+            if 'manufacturer_id' in record:
+                manufacturer_ids.add(_as_int(record['manufacturer_id']))
+            elif 'manufacturer' in record:
+                manufacturer_names.add(str(record['manufacturer']))
+            if 'category_id' in record:
+                category_ids.add(_as_int(record['category_id']))
+            elif 'category' in record:
+                category_names.add(str(record['category']))
+            file_ids.update(_as_int(pk) for pk in _as_list(record.get('file_ids')))
+
+        manufacturers = list(Manufacturer.objects.filter(Q(pk__in=manufacturer_ids) | Q(name__in=manufacturer_names)))
+        categories = list(AssetCategory.objects.filter(Q(pk__in=category_ids) | Q(name__in=category_names)))
+        return {
+            'manufacturer_ids': {m.pk: m for m in manufacturers},
+            'manufacturer_names': {m.name: m for m in manufacturers},
+            'category_ids': {c.pk: c for c in categories},
+            'category_names': {c.name: c for c in categories},
+            'file_ids': set(AssetFile.objects.filter(pk__in=file_ids).values_list('pk', flat=True)),
+        }
+
+    def _build(self, record, lookups, schema):
+        errors = {}
+
+        for field in ('type_id', 'model', 'name'):
+            if not str(record.get(field, '')).strip():
+                errors[field] = ["This field is required."]
+
+        if 'manufacturer_id' in record:
+            manufacturer = lookups['manufacturer_ids'].get(_as_int(record['manufacturer_id']))
+        else:
+            manufacturer = lookups['manufacturer_names'].get(str(record.get('manufacturer', '')))
+        if manufacturer is None:
+            errors['manufacturer'] = ["Unknown or missing manufacturer (give manufacturer_id or manufacturer name)."]
+
+        category = None
+        if 'category_id' in record:
+            category = lookups['category_ids'].get(_as_int(record['category_id']))
+            if category is None:
+                errors['category_id'] = [f"Unknown category id '{record['category_id']}'."]
+        elif 'category' in record:
+            category = lookups['category_names'].get(str(record['category']))
+            if category is None:
+                errors['category'] = [f"Unknown category '{record['category']}'."]
+
+        file_ids = None
+        if 'file_ids' in record:
+            file_ids = [_as_int(pk) for pk in _as_list(record['file_ids'])]
+            missing = [pk for pk in file_ids if pk not in lookups['file_ids']]
+            if missing:
+                errors['file_ids'] = [f"Unknown file ids: {missing}"]
+
+        dimensions = {}
+        for field in self.DIMENSION_FIELDS:
+            if record.get(field) is not None:
+                try:
+                    dimensions[field] = float(record[field])
+                except (TypeError, ValueError):
+                    errors[field] = ["A valid number is required."]
+
+        custom_fields = {}
+        try:
+            custom_fields = Asset.normalize_custom_fields(self._custom_fields(record, schema))
+        except ValidationError as exc:
+            errors['custom_fields'] = exc.messages
+
+        if errors:
+            raise ValidationError(errors)
+
+        asset = Asset(
+            type_id=str(record['type_id']).strip(),
+            manufacturer=manufacturer,
+            category=category,
+            model=str(record['model']),
+            name=str(record['name']),
+            description=record.get('description'),
+            url=record.get('url', ''),
+            custom_fields=custom_fields,
+            **dimensions,
+        )
+        # Lengths, URL format and the like, which bulk_create would not check.
+        # Relations were resolved above; custom fields were normalized.
+        asset.clean_fields(exclude=['manufacturer', 'category', 'custom_fields'])
+        return asset, file_ids
+
+    def _convert_units(self, assets, schema):
+        """Converts whole columns to storage units with UnitConverter's batch API."""
+        if not assets or not self.input_units:
+            return
+
+        if 'length' in self.input_units:
+            for field in self.DIMENSION_FIELDS:
+                column = UnitConverter.to_storage_many(
+                    [getattr(asset, field) for asset in assets], self.input_units['length'], 'length',
+                )
+                for asset, value in zip(assets, column):
+                    setattr(asset, field, value)
+
+        columns = {}
+        for asset in assets:
+            for name, value in asset.custom_fields.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    columns.setdefault(name, []).append(asset)
+
+        for name, owners in columns.items():
+            category = UnitConverter.category_for_spec(schema[name].unit_type)
+            if category not in self.input_units:
+                continue
+            column = UnitConverter.to_storage_many(
+                [asset.custom_fields[name] for asset in owners], self.input_units[category], category,
+            )
+            for asset, value in zip(owners, column):
+                asset.custom_fields[name] = value
+
+    def _write(self, prepared):
+        if not prepared:
+            return
+
+        assets = [asset for _, asset, _ in prepared]
+        type_ids = [asset.type_id for asset in assets]
+        try:
+            with transaction.atomic():
+                existing = set(Asset.objects.filter(type_id__in=type_ids).values_list('type_id', flat=True))
+                Asset.objects.bulk_create(
+                    assets,
+                    update_conflicts=True,
+                    unique_fields=['type_id'],
+                    update_fields=self.WRITE_FIELDS,
+                )
+
+                ids = dict(Asset.objects.filter(type_id__in=type_ids).values_list('type_id', 'id'))
+                for asset in assets:
+                    asset.pk = ids[asset.type_id]
+
+                self._write_files(prepared)
+                search.index_assets(ids.values())
+                fieldindex.reindex_custom_fields(AssetFieldValue, 'asset', assets)
+                bump_table_stamp(Asset)
+        except DatabaseError as exc:
+            for number, _, _ in prepared:
+                self.fail(number, [f"Database error: {exc}"])
+            return
+
+        self.report['updated'] += len(existing)
+        self.report['created'] += len(assets) - len(existing)
+
+    def _write_files(self, prepared):
+        Through = Asset.files.through
+        with_files = [(asset.pk, file_ids) for _, asset, file_ids in prepared if file_ids is not None]
+        if not with_files:
+            return
+        Through.objects.filter(asset_id__in=[pk for pk, _ in with_files]).delete()
+        Through.objects.bulk_create([
+            Through(asset_id=pk, assetfile_id=file_id)
+            for pk, file_ids in with_files
+            for file_id in dict.fromkeys(file_ids)
+        ])
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_list(value):
+    if value is None or value == '':
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [part for part in str(value).replace(';', ',').split(',') if part.strip()]
+
+
+def _coerce_cell(raw, spec):
+    """Types a CSV cell using the attribute's data_type; invalid cells stay strings and fail validation."""
+    if spec is None:
+        return raw
+    try:
+        if spec.data_type == AssetAttribute.AttributeType.INTEGER:
+            return int(raw)
+        if spec.data_type == AssetAttribute.AttributeType.FLOAT:
+            return float(raw)
+    except ValueError:
+        return raw
+    if spec.data_type == AssetAttribute.AttributeType.BOOLEAN:
+        lowered = raw.strip().lower()
+        if lowered in fieldindex.TRUE_VALUES:
+            return True
+        if lowered in fieldindex.FALSE_VALUES:
+            return False
+    return raw
@@ -0,0 +1,48 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from assets.models import AssetFile
+
+
+class Command(BaseCommand):
+    help = 'Deletes stored asset files that no AssetFile refers to any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=float, default=1,
+                            help="Hours since a file was last stored or reused before it can go (default: 1)")
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be deleted")
+
+    def handle(self, *args, **options):
+        storage = AssetFile._meta.get_field('file').storage
+        root = Path(storage.location)
+        files = Path(storage.path('assets/files'))
+        cutoff = time.time() - options['older_than'] * 3600
+        referenced = set(AssetFile.objects.values_list('file', flat=True))
+
+        def is_referenced(name):
+            # Rows committed since the listing above
+            return AssetFile.objects.filter(file=name).exists()
+
+        deleted = freed = 0
+        for path in sorted(files.rglob('*')) if files.is_dir() else []:
+            name = path.relative_to(root).as_posix()
+            # Chunked uploads in progress, and writes or collections of other processes
+            if not path.is_file() or name.startswith('assets/files/uploads/') or path.suffix in ('.part', '.collect'):
+                continue
+            if name in referenced:
+                continue
+            if options['dry_run']:
+                stat = path.stat()
+                if stat.st_mtime < cutoff:
+                    deleted += 1
+                    freed += stat.st_size
+                continue
+            size = storage.delete_unused(name, cutoff, is_referenced)
+            if size is not None:
+                deleted += 1
+                freed += size
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {deleted} unreferenced files ({freed} bytes)"))
@@ -0,0 +1,55 @@
+import os
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from assets.models import AssetFile
+from assets.storage import hash_content
+
+
+class Command(BaseCommand):
+    help = 'Moves asset files stored before content addressing into hash-named blobs, dropping duplicates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be moved")
+
+    def handle(self, *args, **options):
+        legacy = AssetFile.objects.filter(sha256='').exclude(file='').order_by('pk')
+        moved = missing = 0
+        freed = 0
+        seen = set()
+
+        for asset_file in legacy.iterator():
+            name = asset_file.file.name
+            storage = asset_file.file.storage
+            if not storage.exists(name):
+                missing += 1
+                self.stderr.write(f"AssetFile {asset_file.pk}: {name} is missing")
+                continue
+
+            original_name = os.path.basename(name)
+            with storage.open(name) as content:
+                # Hashed once here; the storage reuses content.sha256 when saving
+                content.sha256 = hash_content(content)
+                blob = storage.blob_name(asset_file.file.field.generate_filename(asset_file, original_name), content.sha256)
+                if content.sha256 in seen or storage.exists(blob):
+                    freed += content.size
+                seen.add(content.sha256)
+                moved += 1
+                if options['dry_run']:
+                    continue
+
+                with transaction.atomic():
+                    # Writes only when no blob has this content yet
+                    asset_file.original_name = original_name
+                    asset_file.file.save(original_name, content, save=False)
+                    asset_file.save(update_fields=['file', 'original_name', 'sha256', 'size'])
+
+            # Legacy names are never handed out again, so this cannot race with an upload
+            if not AssetFile.objects.filter(file=name).exists():
+                storage.delete(name)
+
+        verb = 'Would move' if options['dry_run'] else 'Moved'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {moved} files into content-addressed storage ({freed} bytes freed by duplicates, {missing} missing)"
+        ))
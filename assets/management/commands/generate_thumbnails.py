@@ -0,0 +1,57 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from ephany_framework import thumbnails
+
+
+def _setup_worker():
+    # Spawned / forkserver workers start without Django configured
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _generate(label, field_name, name, force):
+    from django.apps import apps
+    storage = apps.get_model(label)._meta.get_field(field_name).storage
+    try:
+        return name, len(thumbnails.generate(storage, name, force=force)), None
+    except Exception as exc:
+        return name, 0, str(exc)
+
+
+class Command(BaseCommand):
+    help = 'Generates missing thumbnails (all of them with --force) for catalog images, logos and portfolio images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Worker processes (default: one per CPU; 1 runs inline)")
+        parser.add_argument('--force', action='store_true', help="Regenerate thumbnails that already exist")
+
+    def handle(self, *args, **options):
+        jobs = [
+            (model._meta.label, field_name, name, options['force'])
+            for model, field_name in thumbnails.registry
+            for name in model._default_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            .values_list(field_name, flat=True).iterator()
+        ]
+
+        if options['workers'] > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=_setup_worker) as pool:
+                results = [future.result() for future in as_completed(pool.submit(_generate, *job) for job in jobs)]
+        else:
+            results = [_generate(*job) for job in jobs]
+
+        written = 0
+        for name, count, error in results:
+            written += count
+            if error:
+                self.stderr.write(f"{name}: {error}")
+        failed = sum(1 for _, _, error in results if error)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} thumbnails for {len(jobs)} images ({failed} failed)"
+        ))
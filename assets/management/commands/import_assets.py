@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from assets.importers import AssetImporter, ImportFormatError, detect_format, read_records
+
+
+class Command(BaseCommand):
+    help = 'Bulk imports assets (upsert on type_id) or snapshot instances from an NDJSON or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path to a .ndjson/.jsonl or .csv file")
+        parser.add_argument('--format', choices=['ndjson', 'csv'], help="Override format detection by extension")
+        parser.add_argument(
+            '--units', nargs='*', default=[], metavar='CATEGORY=UNIT',
+            help="Units the file's values are given in, e.g. --units length=ft mass=lb (assets only)",
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--instances', action='store_true', help="Import asset instances instead of assets")
+        parser.add_argument('--snapshot', type=int, help="Default snapshot id for instance rows without one")
+
+    def handle(self, *args, **options):
+        if options['instances'] and options['units']:
+            raise CommandError("--units applies to asset imports; instance custom fields are free-form and not converted")
+        try:
+            units = dict(item.split('=', 1) for item in options['units'])
+        except ValueError:
+            raise CommandError("Units must be given as CATEGORY=UNIT, e.g. length=ft")
+
+        try:
+            fmt = options['format'] or detect_format(filename=options['path'])
+            importer = self._importer(options, units)
+        except ImportFormatError as exc:
+            raise CommandError(str(exc))
+
+        try:
+            handle = open(options['path'], encoding='utf-8-sig', newline='')
+        except OSError as exc:
+            raise CommandError(f"Cannot read {options['path']}: {exc.strerror}")
+        with handle:
+            report = importer.run(read_records(handle, fmt))
+
+        for error in report['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+
+        message = f"Created {report['created']}, updated {report['updated']}, failed {report['failed']}"
+        if report['failed']:
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
+
+    def _importer(self, options, units):
+        if not options['instances']:
+            return AssetImporter(input_units=units, batch_size=options['batch_size'])
+
+        from projects.importers import InstanceImporter
+        from projects.models import Snapshot
+
+        snapshot = None
+        if options['snapshot']:
+            snapshot = Snapshot.objects.filter(pk=options['snapshot']).first()
+            if snapshot is None:
+                raise CommandError(f"Unknown snapshot {options['snapshot']}")
+        return InstanceImporter(snapshot=snapshot, batch_size=options['batch_size'])
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from assets import uploads
+from assets.models import FileUpload
+
+
+class Command(BaseCommand):
+    help = 'Aborts chunked uploads that were started but never finalized'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=float, default=24,
+                            help="Age in hours after which an unfinished upload is dropped (default: 24)")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['older_than'])
+        stale = FileUpload.objects.filter(created_at__lt=cutoff)
+        count = 0
+        for upload in stale.iterator():
+            uploads.abort(upload)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Purged {count} unfinished uploads"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+from assets import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index for assets'
+
+    def handle(self, *args, **kwargs):
+        if not search.search_available():
+            raise CommandError("Full-text search index requires SQLite (FTS5); nothing to rebuild.")
+
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} assets"))
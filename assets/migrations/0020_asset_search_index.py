@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-18 09:12
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS assets_asset_fts USING fts5("
+        "name, description, model, manufacturer, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO assets_asset_fts (rowid, name, description, model, manufacturer) "
+        "SELECT a.id, a.name, COALESCE(a.description, ''), a.model, m.name "
+        "FROM assets_asset a INNER JOIN assets_manufacturer m ON m.id = a.manufacturer_id"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS assets_asset_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0019_vendor_assetattribute_scope_vendorproduct'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-18 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_field_values(apps, schema_editor):
+    from assets.fieldindex import field_value_rows
+
+    Owner = apps.get_model('assets', 'Asset')
+    FieldValue = apps.get_model('assets', 'AssetFieldValue')
+
+    batch = []
+    for owner_id, custom_fields in Owner.objects.values_list('id', 'custom_fields').iterator(chunk_size=2000):
+        for name, num, text in field_value_rows(custom_fields):
+            batch.append(FieldValue(asset_id=owner_id, name=name, value_num=num, value_text=text))
+        if len(batch) >= 2000:
+            FieldValue.objects.bulk_create(batch)
+            batch = []
+    FieldValue.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0020_asset_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssetFieldValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('value_num', models.FloatField(blank=True, help_text='Numeric value in storage units', null=True)),
+                ('value_text', models.CharField(blank=True, help_text='Lowercased text value', max_length=255, null=True)),
+                ('asset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='field_values', to='assets.asset')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['name', 'value_num'], name='asset_cf_num_idx'), models.Index(fields=['name', 'value_text'], name='asset_cf_text_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_field_values, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-18 01:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0021_assetfieldvalue'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vendorproduct',
+            index=models.Index(fields=['asset', 'cost'], name='vendorproduct_asset_cost_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendorproduct',
+            index=models.Index(fields=['asset', 'lead_time_days'], name='vendorproduct_asset_lead_idx'),
+        ),
+    ]
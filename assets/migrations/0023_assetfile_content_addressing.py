@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-18 01:47
+
+import assets.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0022_vendorproduct_vendorproduct_asset_cost_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assetfile',
+            name='original_name',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='assetfile',
+            name='sha256',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, verbose_name='SHA-256'),
+        ),
+        migrations.AddField(
+            model_name='assetfile',
+            name='size',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='assetfile',
+            name='file',
+            field=assets.storage.ContentAddressedFileField(max_length=255, storage=assets.storage.get_content_addressed_storage, upload_to='assets/files/'),
+        ),
+    ]
@@ -2,6 +2,10 @@ from django.db import models
 from django.core.exceptions import ValidationError
 import re
 import os
+import uuid
+
+from .schema import attribute_registry
+from .storage import ContentAddressedFileField
 
 
 def manufacturer_logo_path(instance, filename):
@@ -32,7 +36,8 @@ class AssetFile(models.Model):
         REVIT_FAMILY = 'RFA', 'Revit Family'
         OTHER = 'ETC', 'Other'
 
-    file = models.FileField(upload_to='assets/files/')
+    # Stored under its content hash (assets.storage); identical uploads share one blob
+    file = ContentAddressedFileField(upload_to='assets/files/', max_length=255)
     category = models.CharField(
         max_length=3,
         choices=Category.choices,
@@ -40,6 +45,11 @@ class AssetFile(models.Model):
     )
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    # Filled in from the upload by ContentAddressedFileField
+    original_name = models.CharField(max_length=255, blank=True, editable=False)
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True, editable=False, verbose_name="SHA-256")
+    size = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+
     class Meta:
         verbose_name_plural = "Asset Files"
 
@@ -47,6 +57,44 @@ class AssetFile(models.Model):
         return f"{self.get_category_display()}: {self.file.name}"
 
 
+class FileUpload(models.Model):
+    """
+    A resumable, chunked AssetFile upload in progress (see assets.uploads).
+    Chunk i covers bytes [i * chunk_size, (i + 1) * chunk_size) of the file.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255)
+    category = models.CharField(max_length=3, choices=AssetFile.Category.choices, default=AssetFile.Category.OTHER)
+    size = models.PositiveBigIntegerField(help_text="Total size of the file in bytes")
+    chunk_size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def chunk_count(self):
+        return -(-self.size // self.chunk_size)
+
+    def chunk_length(self, index):
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+    @property
+    def partial_name(self):
+        """Storage name the chunks are written into, until finalize renames it."""
+        return f"assets/files/uploads/{self.pk}.part"
+
+    def __str__(self):
+        return f"{self.filename} ({self.size} bytes)"
+
+
+class FileUploadChunk(models.Model):
+    """A chunk of a FileUpload that arrived with a matching checksum."""
+    upload = models.ForeignKey(FileUpload, on_delete=models.CASCADE, related_name='chunks')
+    index = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64)
+
+    class Meta:
+        unique_together = ['upload', 'index']
+
+
 class AssetCategory(models.Model):
     """Categories for organizing assets (e.g., Refrigerators, Ovens, Sinks)."""
     name = models.CharField(max_length=100, unique=True)
@@ -167,60 +215,96 @@ class Asset(models.Model):
     def clean(self):
         super().clean()
         if self.custom_fields:
-            # Get all allowed attributes with their types
-            defined_attributes = {attr.name: attr.data_type for attr in AssetAttribute.objects.all()}
-            normalized_data = {}
-        
-            for key, value in self.custom_fields.items():
-                # Normalize the key: 
-                # 1. Lowercase
-                # 2. Spaces to underscores
-                # 3. Remove non-alphanumeric/underscore
-                new_key = key.lower().strip().replace(' ', '_')
-                new_key = re.sub(r'[^a-z0-9_]', '', new_key)
-
-                # Check for collision within the input itself (e.g. "Height" and "height")
-                if new_key in normalized_data:
-                     raise ValidationError(f"Duplicate custom field detected: '{key}' conflicts with existing '{new_key}'.")
-
-                # 1. Check if normalized key is allowed
-                if new_key not in defined_attributes:
-                    raise ValidationError(
-                        f"Invalid custom field: '{key}' (normalized to '{new_key}'). Allowed fields are: {', '.join(sorted(defined_attributes.keys()))}"
-                    )
-
-                # 2. Check if value type matches the definition
-                expected_type = defined_attributes[new_key]
-                is_valid_type = True
-
-                if expected_type == AssetAttribute.AttributeType.INTEGER:
-                    # In Python, bool is a subclass of int, so we must explicitly exclude it
-                    if isinstance(value, bool) or not isinstance(value, int):
-                        is_valid_type = False
-                elif expected_type == AssetAttribute.AttributeType.FLOAT:
-                    if isinstance(value, bool) or not isinstance(value, (float, int)):
-                        is_valid_type = False
-                elif expected_type == AssetAttribute.AttributeType.BOOLEAN:
-                    if not isinstance(value, bool):
-                        is_valid_type = False
-                elif expected_type == AssetAttribute.AttributeType.STRING:
-                    if not isinstance(value, str):
-                        is_valid_type = False
-                
-                if not is_valid_type:
-                    raise ValidationError(
-                        f"Invalid value for '{key}': Expected {expected_type}, got {type(value).__name__}"
-                    )
-                
-                # Add to normalized dict
-                normalized_data[new_key] = value
-            
             # Replace the raw input with the normalized data
-            self.custom_fields = normalized_data
+            self.custom_fields = self.normalize_custom_fields(self.custom_fields)
+
+    @staticmethod
+    def normalize_custom_fields(custom_fields):
+        """
+        Normalizes custom field keys and checks them against the AssetAttribute
+        schema (existence and data type). Returns the normalized dict or raises
+        ValidationError. Shared by clean() and the bulk importer.
+        """
+        # Get all allowed attributes with their types
+        defined_attributes = {name: spec.data_type for name, spec in attribute_registry.get().items()}
+        normalized_data = {}
+    
+        for key, value in custom_fields.items():
+            # Normalize the key: 
+            # 1. Lowercase
+            # 2. Spaces to underscores
+            # 3. Remove non-alphanumeric/underscore
+            new_key = key.lower().strip().replace(' ', '_')
+            new_key = re.sub(r'[^a-z0-9_]', '', new_key)
+
+            # Check for collision within the input itself (e.g. "Height" and "height")
+            if new_key in normalized_data:
+                 raise ValidationError(f"Duplicate custom field detected: '{key}' conflicts with existing '{new_key}'.")
+
+            # 1. Check if normalized key is allowed
+            if new_key not in defined_attributes:
+                raise ValidationError(
+                    f"Invalid custom field: '{key}' (normalized to '{new_key}'). Allowed fields are: {', '.join(sorted(defined_attributes.keys()))}"
+                )
+
+            # 2. Check if value type matches the definition
+            expected_type = defined_attributes[new_key]
+            is_valid_type = True
+
+            if expected_type == AssetAttribute.AttributeType.INTEGER:
+                # In Python, bool is a subclass of int, so we must explicitly exclude it
+                if isinstance(value, bool) or not isinstance(value, int):
+                    is_valid_type = False
+            elif expected_type == AssetAttribute.AttributeType.FLOAT:
+                if isinstance(value, bool) or not isinstance(value, (float, int)):
+                    is_valid_type = False
+            elif expected_type == AssetAttribute.AttributeType.BOOLEAN:
+                if not isinstance(value, bool):
+                    is_valid_type = False
+            elif expected_type == AssetAttribute.AttributeType.STRING:
+                if not isinstance(value, str):
+                    is_valid_type = False
+            
+            if not is_valid_type:
+                raise ValidationError(
+                    f"Invalid value for '{key}': Expected {expected_type}, got {type(value).__name__}"
+                )
+            
+            # Add to normalized dict
+            normalized_data[new_key] = value
+
+        return normalized_data
 
     def __str__(self):
         return f"{self.manufacturer.name} {self.model} ({self.type_id})"
 
+class CustomFieldValue(models.Model):
+    """
+    Side index of a custom_fields JSON blob: one row per key, kept in sync on
+    write (see assets.fieldindex). Typed attribute filters (?cf.voltage=208)
+    run against these indexed columns instead of scanning JSON.
+    """
+    name = models.CharField(max_length=50)
+    value_num = models.FloatField(null=True, blank=True, help_text="Numeric value in storage units")
+    value_text = models.CharField(max_length=255, null=True, blank=True, help_text="Lowercased text value")
+
+    class Meta:
+        abstract = True
+
+
+class AssetFieldValue(CustomFieldValue):
+    asset = models.ForeignKey(Asset, on_delete=models.CASCADE, related_name='field_values')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name', 'value_num'], name='asset_cf_num_idx'),
+            models.Index(fields=['name', 'value_text'], name='asset_cf_text_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.asset_id}.{self.name}"
+
+
 class Vendor(models.Model):
     name = models.CharField(max_length=255)
     website = models.URLField(blank=True)
@@ -246,8 +330,14 @@ class VendorProduct(models.Model):
 
     class Meta:
         unique_together = ['asset', 'vendor']
+        indexes = [
+            # Cheapest / fastest offer per asset (assets.pricing)
+            models.Index(fields=['asset', 'cost'], name='vendorproduct_asset_cost_idx'),
+            models.Index(fields=['asset', 'lead_time_days'], name='vendorproduct_asset_lead_idx'),
+        ]
         verbose_name = "Vendor Product"
         verbose_name_plural = "Vendor Products"
 
     def __str__(self):
-        return f"{self.vendor.name} - {self.asset.name} (${self.cost})"
\ No newline at end of file
+        return f"{self.vendor.name} - {self.asset.name} (${self.cost})"
+
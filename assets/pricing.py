@@ -0,0 +1,39 @@
+"""
+Best vendor offers for a page of assets.
+
+One query per page: every VendorProduct of the page's assets is ranked twice
+per asset with ROW_NUMBER() windows (by cost and by lead time, both served by
+the (asset, cost) / (asset, lead_time_days) indexes), and only the rows that
+rank first in either window come back.
+"""
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from .models import VendorProduct
+
+
+def best_offers(asset_ids):
+    """Returns {asset id: {'cheapest': VendorProduct|None, 'fastest': VendorProduct|None}}."""
+    offers = {pk: {'cheapest': None, 'fastest': None} for pk in asset_ids}
+    if not offers:
+        return offers
+
+    products = (
+        VendorProduct.objects.filter(asset_id__in=offers)
+        .select_related('vendor')
+        .annotate(
+            cost_rank=Window(
+                RowNumber(), partition_by=[F('asset_id')], order_by=[F('cost').asc(), F('lead_time_days').asc(), F('id').asc()],
+            ),
+            lead_rank=Window(
+                RowNumber(), partition_by=[F('asset_id')], order_by=[F('lead_time_days').asc(), F('cost').asc(), F('id').asc()],
+            ),
+        )
+        .filter(Q(cost_rank=1) | Q(lead_rank=1))
+    )
+    for product in products:
+        if product.cost_rank == 1:
+            offers[product.asset_id]['cheapest'] = product
+        if product.lead_rank == 1:
+            offers[product.asset_id]['fastest'] = product
+    return offers
@@ -0,0 +1,53 @@
+import threading
+from typing import Dict, NamedTuple
+
+from ephany_framework.stamps import bump_stamp, get_stamp
+
+
+class AttributeSpec(NamedTuple):
+    name: str
+    data_type: str
+    unit_type: str
+    scope: str
+
+
+class AttributeSchemaRegistry:
+    """
+    Process-wide, read-mostly copy of the AssetAttribute table.
+
+    The schema changes rarely but is read for every asset that is validated or
+    rendered, so it is held in memory and only reloaded when the shared
+    'asset_attributes' change stamp moves (see the AssetAttribute handlers
+    in signals.py).
+    """
+    STAMP = 'asset_attributes'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (stamp, specs), replaced as a whole so readers never see half an update
+        self._cached = None
+
+    def get(self) -> Dict[str, AttributeSpec]:
+        """Returns {attribute name: AttributeSpec}. No queries when warm."""
+        stamp = get_stamp(self.STAMP)
+        cached = self._cached
+        if cached is None or cached[0] != stamp:
+            with self._lock:
+                cached = self._cached
+                if cached is None or cached[0] != stamp:
+                    cached = (stamp, self._load())
+                    self._cached = cached
+        return cached[1]
+
+    def invalidate(self):
+        # Every process, this one included, reloads on its next get()
+        bump_stamp(self.STAMP)
+
+    def _load(self):
+        from .models import AssetAttribute
+
+        rows = AssetAttribute.objects.values_list('name', 'data_type', 'unit_type', 'scope')
+        return {row[0]: AttributeSpec(*row) for row in rows}
+
+
+attribute_registry = AttributeSchemaRegistry()
@@ -0,0 +1,117 @@
+"""
+Full-text search index for assets.
+
+On SQLite the index is an FTS5 virtual table (created by migration 0020) whose
+rowid is the asset id. It is maintained with set-based INSERT ... SELECT
+statements so (re)indexing never pulls rows into Python. Other database
+backends have no FTS table and fall back to the same icontains OR search
+that DRF's SearchFilter performs.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+FTS_TABLE = 'assets_asset_fts'
+
+# SQLite caps bound parameters per statement; stay well under it
+ID_BATCH_SIZE = 500
+
+_INDEX_SELECT = f"""
+    INSERT INTO {FTS_TABLE} (rowid, name, description, model, manufacturer)
+    SELECT a.id, a.name, COALESCE(a.description, ''), a.model, m.name
+    FROM assets_asset a
+    INNER JOIN assets_manufacturer m ON m.id = a.manufacturer_id
+"""
+
+
+def search_available():
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(text):
+    """
+    Turns free text into a safe FTS5 query: every word becomes a quoted
+    prefix term, and all terms must match. FTS5 operators typed by users
+    are treated as plain words.
+    """
+    terms = re.findall(r'\w+', text, flags=re.UNICODE)
+    return ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+
+def index_assets(asset_ids):
+    """(Re)indexes the given assets."""
+    if not search_available():
+        return
+    asset_ids = list(asset_ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(asset_ids), ID_BATCH_SIZE):
+            batch = asset_ids[start:start + ID_BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", batch)
+            cursor.execute(f"{_INDEX_SELECT} WHERE a.id IN ({placeholders})", batch)
+
+
+def index_manufacturer_assets(manufacturer_id):
+    """Reindexes every asset of a manufacturer (used when its name changes)."""
+    if not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid IN "
+            f"(SELECT id FROM assets_asset WHERE manufacturer_id = %s)",
+            [manufacturer_id],
+        )
+        cursor.execute(f"{_INDEX_SELECT} WHERE a.manufacturer_id = %s", [manufacturer_id])
+
+
+def remove_assets(asset_ids):
+    if not search_available():
+        return
+    asset_ids = list(asset_ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(asset_ids), ID_BATCH_SIZE):
+            batch = asset_ids[start:start + ID_BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", batch)
+
+
+def rebuild_index():
+    """Drops and repopulates the whole index. Returns the number of indexed assets."""
+    if not search_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(_INDEX_SELECT)
+        cursor.execute(f"SELECT COUNT(*) FROM {FTS_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def search_assets(queryset, text):
+    """
+    Filters an Asset queryset down to matches for `text`, best matches first.
+    The rank is exposed on each row as `search_rank` (lower is better).
+    """
+    match = build_match_query(text)
+    if not match:
+        return queryset.none()
+
+    if not search_available():
+        condition = Q()
+        for term in text.split():
+            condition &= (
+                Q(name__icontains=term)
+                | Q(description__icontains=term)
+                | Q(model__icontains=term)
+                | Q(manufacturer__name__icontains=term)
+            )
+        return queryset.filter(condition)
+
+    # The FTS table is joined on rowid; its MATCH constraint drives the plan
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f"{FTS_TABLE}.rowid = assets_asset.id", f"{FTS_TABLE} MATCH %s"],
+        params=[match],
+        select={'search_rank': f"{FTS_TABLE}.rank"},
+        order_by=['search_rank', 'id'],
+    )
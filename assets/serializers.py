@@ -5,16 +5,22 @@ from .models import (
     Manufacturer,
     Asset,
     AssetFile,
-    AssetAttribute,
     AssetCategory,
+    FileUpload,
+    VendorProduct,
 )
-from ephany_framework.utils import UnitConverter
+from ephany_framework.fieldsets import SparseFieldsetMixin
+from ephany_framework.thumbnails import ThumbnailField
+from ephany_framework.utils import ConversionPlan, UnitConverter
+from .schema import attribute_registry
 
 
 class ManufacturerSerializer(serializers.ModelSerializer):
+    logo_thumb = ThumbnailField(source='logo')
+
     class Meta:
         model = Manufacturer
-        fields = ['id', 'name', 'url', 'logo']
+        fields = ['id', 'name', 'url', 'logo', 'logo_thumb']
 
 
 class AssetCategorySerializer(serializers.ModelSerializer):
@@ -34,14 +40,55 @@ class AssetFileSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = AssetFile
-        fields = ['id', 'file', 'category', 'category_display', 'uploaded_at']
+        fields = ['id', 'file', 'original_name', 'sha256', 'size', 'category', 'category_display', 'uploaded_at']
+
+
+class FileUploadSerializer(serializers.ModelSerializer):
+    """Starts a chunked upload and reports its progress (see assets.uploads)."""
+    chunk_count = serializers.IntegerField(read_only=True)
+    received = serializers.SerializerMethodField()
+
+    class Meta:
+        model = FileUpload
+        fields = ['id', 'filename', 'category', 'size', 'chunk_size', 'chunk_count', 'received', 'created_at']
+        extra_kwargs = {'chunk_size': {'required': False}}
+
+    def get_received(self, upload):
+        return sorted(chunk.index for chunk in upload.chunks.all())
+
+    def validate_size(self, value):
+        from .uploads import max_size
+        if value < 1:
+            raise serializers.ValidationError("Empty files cannot be uploaded.")
+        if value > max_size():
+            raise serializers.ValidationError(f"Files larger than {max_size()} bytes cannot be uploaded.")
+        return value
+
+    def validate_chunk_size(self, value):
+        from .uploads import max_chunk_size
+        if not 1 <= value <= max_chunk_size():
+            raise serializers.ValidationError(f"chunk_size must be between 1 and {max_chunk_size()} bytes.")
+        return value
+
 
+class VendorProductSerializer(serializers.ModelSerializer):
+    vendor_name = serializers.CharField(source='vendor.name', read_only=True)
+
+    class Meta:
+        model = VendorProduct
+        fields = ['id', 'vendor', 'vendor_name', 'sku', 'cost', 'lead_time_days', 'url']
 
-class AssetSerializer(serializers.ModelSerializer):
+
+class AssetSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Primary serializer for Asset instances.
     Handles unit conversion (metric/imperial) based on user settings.
     """
+    # ?expand=vendors: every vendor offer for the asset
+    expandable_fields = {
+        'vendors': lambda: VendorProductSerializer(source='vendor_products', many=True, read_only=True),
+    }
+
     # --- READ FIELDS ---
     manufacturer = ManufacturerSerializer(read_only=True)
     category = AssetCategorySerializer(read_only=True)
@@ -81,6 +128,9 @@ class AssetSerializer(serializers.ModelSerializer):
         help_text="Required if providing dimensions. Example: {'length': 'ft'}"
     )
 
+    # {width: url} of the generated previews
+    catalog_img_thumb = ThumbnailField(source='catalog_img')
+
     # Explicitly define custom_fields
     custom_fields = serializers.JSONField(required=False, allow_null=True)
 
@@ -100,6 +150,7 @@ class AssetSerializer(serializers.ModelSerializer):
             'description',
             'url',
             'catalog_img',
+            'catalog_img_thumb',
             'overall_height',
             'overall_width',
             'overall_depth',
@@ -110,46 +161,51 @@ class AssetSerializer(serializers.ModelSerializer):
         ]
 
     def _get_user_units(self):
-        defaults = {'length': 'mm', 'area': 'sq_m', 'volume': 'cu_m', 'mass': 'kg'}
+        # Resolved once per request and shared by every row (and nested serializer)
+        if '_user_units' in self.context:
+            return self.context['_user_units']
+
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            if hasattr(request.user, 'settings'):
-                s = request.user.settings
-                return {
-                    'length': s.length_unit,
-                    'area': s.area_unit,
-                    'volume': s.volume_unit,
-                    'mass': s.mass_unit
-                }
-        return defaults
+        units = UnitConverter.units_for_user(request.user if request else None)
+        self.context['_user_units'] = units
+        return units
+
+    def _get_attribute_units(self):
+        """
+        Returns {attribute name: unit_type} from the shared schema registry,
+        pinned for the rest of the request.
+        """
+        if '_attribute_units' in self.context:
+            return self.context['_attribute_units']
+
+        attr_map = {name: spec.unit_type for name, spec in attribute_registry.get().items()}
+        self.context['_attribute_units'] = attr_map
+        return attr_map
+
+    def resolve_context(self):
+        """Loads the lookups to_representation would make on first use (for async views)."""
+        self._get_user_units()
+        self._get_attribute_units()
 
     def _get_spec_category(self, spec_type):
-        SPECS = {
-            'autodesk.spec.aec:length-2.0.0': 'length',
-            'autodesk.spec.aec:distance-1.0.0': 'length',
-            'autodesk.spec.aec:area-2.0.0': 'area',
-            'autodesk.spec.aec:volume-2.0.0': 'volume',
-            'autodesk.spec.aec:mass-2.0.0': 'mass',
-            'autodesk.spec.aec:massDensity-2.0.0': 'mass',
-        }
-        return SPECS.get(spec_type)
+        return UnitConverter.category_for_spec(spec_type)
+
+    def _get_conversion_plan(self):
+        """Storage -> display conversions compiled once and shared by every row of the request."""
+        if '_conversion_plan' not in self.context:
+            self.context['_conversion_plan'] = ConversionPlan(self._get_user_units(), self._get_attribute_units)
+        return self.context['_conversion_plan']
 
     def validate_custom_fields(self, value):
         """
         Field-level validation for custom_fields.
-        Ensures all keys exist as AssetAttributes in the database.
+        Ensures all keys exist as AssetAttributes (checked against the cached schema).
         """
         if not value or not isinstance(value, dict):
             return value
 
         input_keys = set(value.keys())
-
-        # Query DB for these keys to see which ones exist
-        valid_attributes = set(
-            AssetAttribute.objects.filter(name__in=input_keys).values_list('name', flat=True)
-        )
-
-        invalid_keys = input_keys - valid_attributes
+        invalid_keys = input_keys - attribute_registry.get().keys()
 
         if invalid_keys:
             sorted_invalid = sorted(list(invalid_keys))
@@ -180,37 +236,26 @@ class AssetSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         ret = super().to_representation(instance)
-        user_units = self._get_user_units()
+        plan = self._get_conversion_plan()
 
         for field in ['overall_height', 'overall_width', 'overall_depth']:
             if field in ret and ret[field] is not None:
-                ret[field] = UnitConverter.from_storage(
-                    ret[field],
-                    user_units['length'],
-                    'length'
-                )
-
-        if instance.custom_fields:
-            attributes = AssetAttribute.objects.filter(name__in=instance.custom_fields.keys())
-            attr_map = {attr.name: attr.unit_type for attr in attributes}
-            new_custom_fields = instance.custom_fields.copy()
-
-            for key, value in new_custom_fields.items():
-                spec_type = attr_map.get(key)
-                category = self._get_spec_category(spec_type)
-
-                if category and isinstance(value, (int, float)):
-                    target_unit = user_units.get(category)
-                    if target_unit:
-                        new_custom_fields[key] = UnitConverter.from_storage(
-                            value,
-                            target_unit,
-                            category
-                        )
-
-            ret['custom_fields'] = new_custom_fields
-
-        ret['_display_units'] = user_units
+                ret[field] = plan.dimension(ret[field])
+
+        if 'custom_fields' in ret and instance.custom_fields:
+            ret['custom_fields'] = plan.custom_fields(instance.custom_fields)
+
+        # Opt-in (?include=pricing): best offers precomputed for the whole page by the view
+        pricing = self.context.get('pricing')
+        if pricing is not None and self.wants_field('pricing'):
+            offers = pricing.get(instance.pk, {})
+            ret['pricing'] = {
+                kind: VendorProductSerializer(offers.get(kind)).data if offers.get(kind) else None
+                for kind in ('cheapest', 'fastest')
+            }
+
+        if self.wants_field('_display_units'):
+            ret['_display_units'] = plan.user_units
         return ret
 
     def to_internal_value(self, data):
@@ -250,13 +295,15 @@ class AssetSerializer(serializers.ModelSerializer):
         custom_attr_map = {}
 
         if custom_fields and isinstance(custom_fields, dict):
-            attributes = AssetAttribute.objects.filter(name__in=custom_fields.keys())
-            for attr in attributes:
-                category = self._get_spec_category(attr.unit_type)
+            schema = attribute_registry.get()
+            for name in custom_fields.keys():
+                if name not in schema:
+                    continue
+                category = self._get_spec_category(schema[name].unit_type)
                 if category:
-                    if custom_fields.get(attr.name) is not None:
+                    if custom_fields.get(name) is not None:
                         required_categories.add(category)
-                    custom_attr_map[attr.name] = category
+                    custom_attr_map[name] = category
 
         if required_categories:
             if not units_payload or not isinstance(units_payload, dict):
@@ -0,0 +1,58 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from ephany_framework import thumbnails
+from ephany_framework.stamps import bump_table_stamp
+from . import fieldindex, search
+from .models import (
+    Asset, AssetAttribute, AssetCategory, AssetFieldValue, AssetFile, Manufacturer, Vendor, VendorProduct,
+)
+from .schema import attribute_registry
+
+
+# Keep the in-memory attribute schema in step with the table
+@receiver([post_save, post_delete], sender=AssetAttribute)
+def invalidate_attribute_schema(sender, **kwargs):
+    attribute_registry.invalidate()
+
+
+# Keep the full-text search and custom field indexes in step with assets
+@receiver(post_save, sender=Asset)
+def index_asset(sender, instance, **kwargs):
+    search.index_assets([instance.pk])
+    fieldindex.reindex_custom_fields(AssetFieldValue, 'asset', [instance])
+
+
+@receiver(post_delete, sender=Asset)
+def unindex_asset(sender, instance, **kwargs):
+    search.remove_assets([instance.pk])
+
+
+@receiver(post_save, sender=Manufacturer)
+def reindex_manufacturer_assets(sender, instance, created, **kwargs):
+    if not created:
+        search.index_manufacturer_assets(instance.pk)
+
+
+# Table change stamps for anything derived from the catalog (snapshot BOMs,
+# ETags). Bulk writers that bypass signals bump these themselves.
+STAMPED_MODELS = (Asset, AssetAttribute, AssetCategory, AssetFile, Manufacturer, Vendor, VendorProduct)
+
+
+def bump_catalog_stamp(sender, **kwargs):
+    bump_table_stamp(sender)
+
+
+for model in STAMPED_MODELS:
+    post_save.connect(bump_catalog_stamp, sender=model, dispatch_uid=f'stamp-{model._meta.label_lower}-save')
+    post_delete.connect(bump_catalog_stamp, sender=model, dispatch_uid=f'stamp-{model._meta.label_lower}-delete')
+
+
+@receiver(m2m_changed, sender=Asset.files.through)
+def bump_asset_files_stamp(sender, **kwargs):
+    bump_table_stamp(Asset)
+
+
+# Sized previews of uploaded images, made off the request path
+thumbnails.register(Asset, 'catalog_img')
+thumbnails.register(Manufacturer, 'logo')
@@ -0,0 +1,168 @@
+"""
+Content-addressed storage for AssetFile uploads.
+
+Every blob is named after the SHA-256 of its content:
+
+    assets/files/3f/a9/3fa9...e1.pdf
+
+so the same cut sheet uploaded for forty assets is stored once. The hash is
+computed while the upload streams in (the Hashing*UploadHandler classes,
+installed through FILE_UPLOAD_HANDLERS). Storing a file whose blob already
+exists costs that hash pass and nothing else. A new blob is moved into place
+from Django's temporary upload file rather than copied.
+
+A blob's references are the AssetFile rows naming it. Deleting or replacing
+the last of them leaves the blob on disk; `manage.py collect_blobs` deletes
+unreferenced blobs later. Deleting right away would race with an upload of
+the same content that has found the blob but not yet committed its row. So
+every reuse touches the blob, and the collector skips anything touched within
+its grace period.
+"""
+import hashlib
+import os
+import re
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.db import models
+
+HASH_CHUNK_SIZE = 1024 * 1024
+BLOB_NAME = re.compile(r'(?:^|/)([0-9a-f]{2})/([0-9a-f]{2})/(?P<digest>\1\2[0-9a-f]{60})(?:\.[^/]*)?$')
+
+
+def digest_of(name):
+    """The SHA-256 embedded in a blob name, or None for files stored before content addressing."""
+    match = BLOB_NAME.search(name or '')
+    return match.group('digest') if match else None
+
+
+def hash_content(content):
+    """SHA-256 of a Django File, read in chunks; leaves it rewound."""
+    digest = getattr(content, 'sha256', None)
+    if digest:
+        return digest
+    sha256 = hashlib.sha256()
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        sha256.update(chunk)
+    content.seek(0)
+    return sha256.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Saves every file under its content hash, keeping the directory of the requested name."""
+
+    def blob_name(self, name, digest):
+        directory, basename = os.path.split(name)
+        extension = os.path.splitext(basename)[1].lower()
+        return os.path.join(directory, digest[:2], digest[2:4], f"{digest}{extension}")
+
+    def get_available_name(self, name, max_length=None):
+        # Names are chosen by content in _save(); an existing blob is reused, never renamed
+        return name
+
+    def touch(self, name):
+        """Marks an existing blob as just reused, so collect_blobs keeps it. False when there is none."""
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def delete_unused(self, name, cutoff, is_referenced):
+        """
+        Deletes `name` if it was last used before `cutoff` (a timestamp) and
+        is_referenced(name) is still False. Returns its size, or None when it
+        was kept or is gone.
+
+        The file is first renamed aside, so an upload reusing it from then on
+        finds nothing and writes its own copy. An upload that touched it before
+        the rename shows up in the mtime.
+        """
+        path = self.path(name)
+        held = f"{path}.collect"
+        try:
+            os.rename(path, held)
+        except FileNotFoundError:
+            return None
+        stat = os.stat(held)
+        if stat.st_mtime < cutoff and not is_referenced(name):
+            os.remove(held)
+            return stat.st_size
+        if os.path.exists(path):
+            os.remove(held)  # Already written again, with the same content
+        else:
+            os.replace(held, path)
+        return None
+
+    def _save(self, name, content):
+        name = self.blob_name(name, hash_content(content))
+        if self.touch(name):
+            return name
+
+        # Write (or move) under a private name, then rename into place: a
+        # concurrent upload of the same content just replaces identical bytes.
+        partial = f"{name}.{uuid.uuid4().hex}.part"
+        partial = super()._save(partial, content)
+        os.replace(self.path(partial), self.path(name))
+        return name
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def get_content_addressed_storage():
+    return content_addressed_storage
+
+
+class ContentAddressedFileField(models.FileField):
+    """
+    FileField that records the upload's original name, content hash and size
+    on the model (in `original_name`, `sha256` and `size`) when it is saved.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('storage', get_content_addressed_storage)
+        super().__init__(*args, **kwargs)
+
+    def pre_save(self, model_instance, add):
+        pending = getattr(model_instance, self.attname)
+        uploading = bool(pending) and not pending._committed
+        if uploading:
+            model_instance.original_name = os.path.basename(pending.name)[:255]
+
+        file = super().pre_save(model_instance, add)
+
+        digest = digest_of(file.name)
+        if digest and digest != model_instance.sha256:
+            model_instance.sha256 = digest
+            model_instance.size = file.size
+        return file
+
+
+class HashingUploadMixin:
+    """Upload handler mixin: SHA-256 of each file as its chunks arrive, set as `.sha256` on the result."""
+
+    def new_file(self, *args, **kwargs):
+        self._sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        # An inactive memory handler only passes chunks on to the next handler
+        if getattr(self, 'activated', True):
+            self._sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.sha256 = self._sha256.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin, TemporaryFileUploadHandler):
+    pass
@@ -1,3 +1,926 @@
-from django.test import TestCase
+import array
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import resolve
+from rest_framework.test import APIClient
+
+from ephany_framework import downloads, streaming, thumbnails
+from ephany_framework.stamps import check_stamp_cache
+from ephany_framework.utils import UnitConverter, UnknownUnitError, numpy
+from .models import (
+    Asset, AssetAttribute, AssetCategory, AssetFile, FileUpload, FileUploadChunk, Manufacturer, Vendor, VendorProduct,
+)
+from . import uploads
+from .schema import AttributeSchemaRegistry, attribute_registry
+from .views import AssetAttributeViewSet, AssetCategoryViewSet, AssetViewSet, ManufacturerViewSet
+
+
+@override_settings(MEDIA_ROOT='/tmp/ephany-test-media')
+class AssetListQueryCountTests(TestCase):
+    """
+    Regression guard: an asset list page must cost the same number of queries
+    no matter how many rows are on it.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manufacturers = [Manufacturer.objects.create(name=f"Maker {i}") for i in range(3)]
+        cls.categories = [AssetCategory.objects.create(name=f"Category {i}") for i in range(3)]
+        AssetAttribute.objects.create(
+            name='shelf_width',
+            data_type=AssetAttribute.AttributeType.FLOAT,
+            unit_type=AssetAttribute.UnitType.LENGTH,
+        )
+        AssetAttribute.objects.create(name='finish')
+        cls.file = AssetFile.objects.create(file=SimpleUploadedFile('sheet.pdf', b'%PDF-1.4'))
+
+    def _create_assets(self, count):
+        for i in range(count):
+            asset = Asset.objects.create(
+                type_id=f"TYPE-{Asset.objects.count()}",
+                manufacturer=self.manufacturers[i % 3],
+                category=self.categories[i % 3],
+                model=f"M-{i}",
+                name=f"Asset {i}",
+                overall_height=1000,
+                custom_fields={'shelf_width': 254.0, 'finish': 'Chrome'},
+            )
+            asset.files.add(self.file)
+
+    def _list_queries(self):
+        client = APIClient()
+        attribute_registry.get()
+        with self.assertNumQueries(3):
+            # COUNT, page SELECT (manufacturer + category joined), files prefetch
+            response = client.get('/api/assets/', {'page_size': 200})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list_query_count_is_constant(self):
+        self._create_assets(3)
+        small = self._list_queries()
+        self.assertEqual(small.data['count'], 3)
+
+        self._create_assets(60)
+        large = self._list_queries()
+        self.assertEqual(large.data['count'], 63)
+
+        row = large.data['results'][0]
+        self.assertEqual(row['manufacturer_name'], row['manufacturer']['name'])
+        self.assertEqual(len(row['files']), 1)
+        self.assertEqual(row['custom_fields']['shelf_width'], 254.0)
+
+    def test_user_settings_are_read_once_per_request(self):
+        self._create_assets(20)
+        user = User.objects.create_user('estimator', password='pw')
+        user.settings.length_unit = 'in'
+        user.settings.save()
+
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=user.pk))
+        attribute_registry.get()
+        with self.assertNumQueries(4):
+            response = client.get('/api/assets/', {'page_size': 200})
+
+        row = response.data['results'][0]
+        self.assertEqual(row['_display_units']['length'], 'in')
+        self.assertAlmostEqual(row['custom_fields']['shelf_width'], 10.0)
+        self.assertAlmostEqual(row['overall_height'], 1000 / 25.4)
+        self.assertEqual(row['custom_fields']['finish'], 'Chrome')
+
+
+class AttributeSchemaRegistryTests(TestCase):
+
+    def setUp(self):
+        self.manufacturer = Manufacturer.objects.create(name="Maker")
+        AssetAttribute.objects.create(name='voltage', data_type=AssetAttribute.AttributeType.INTEGER)
+
+    def test_warm_registry_validates_without_schema_queries(self):
+        attribute_registry.get()
+        asset = Asset(
+            type_id='T-1',
+            manufacturer=self.manufacturer,
+            model='M',
+            name='Sink',
+            custom_fields={'Voltage': 208},
+        )
+        with self.assertNumQueries(0):
+            asset.clean()
+        self.assertEqual(asset.custom_fields, {'voltage': 208})
+
+    def test_attribute_changes_invalidate_registry(self):
+        self.assertNotIn('amperage', attribute_registry.get())
+
+        attribute = AssetAttribute.objects.create(name='amperage', data_type=AssetAttribute.AttributeType.FLOAT)
+        self.assertEqual(attribute_registry.get()['amperage'].data_type, 'float')
+
+        attribute.data_type = AssetAttribute.AttributeType.INTEGER
+        attribute.save()
+        self.assertEqual(attribute_registry.get()['amperage'].data_type, 'int')
+
+        attribute.delete()
+        self.assertNotIn('amperage', attribute_registry.get())
+
+    def test_changes_reach_every_worker_copy(self):
+        worker = AttributeSchemaRegistry()  # the copy held by another worker process
+        self.assertNotIn('amperage', worker.get())
+
+        AssetAttribute.objects.create(name='amperage', data_type=AssetAttribute.AttributeType.FLOAT)
+        self.assertIn('amperage', worker.get())
+
+    def test_process_local_stamp_cache_is_rejected(self):
+        self.assertEqual(check_stamp_cache(None), [])
+        local = {**settings.CACHES, 'stamps': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=local):
+            self.assertEqual([error.id for error in check_stamp_cache(None)], ['ephany.E002'])
+
+
+class AssetFullTextSearchTests(TestCase):
+
+    def setUp(self):
+        self.maker = Manufacturer.objects.create(name="Elkay")
+        other = Manufacturer.objects.create(name="Hoshizaki")
+        self.sink = Asset.objects.create(
+            type_id='SINK-1', manufacturer=self.maker, model='LR2522',
+            name='Stainless Steel Sink', description='Single bowl drop-in sink',
+        )
+        self.ice = Asset.objects.create(
+            type_id='ICE-1', manufacturer=other, model='KM-515',
+            name='Ice Machine', description='Crescent cuber with stainless finish',
+        )
+
+    def _ids(self, params):
+        response = APIClient().get('/api/assets/', params)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_ranked_search_matches_prefixes_across_fields(self):
+        self.assertEqual(self._ids({'q': 'stain'}), [self.sink.id, self.ice.id])
+        self.assertEqual(self._ids({'q': 'elkay sink'}), [self.sink.id])
+        self.assertEqual(self._ids({'q': 'KM-515'}), [self.ice.id])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.sink.name = 'Trough Basin'
+        self.sink.description = ''
+        self.sink.save()
+        self.assertEqual(self._ids({'q': 'trough'}), [self.sink.id])
+        self.assertEqual(self._ids({'q': 'bowl'}), [])
+
+        self.maker.name = 'Just Manufacturing'
+        self.maker.save()
+        self.assertEqual(self._ids({'q': 'just'}), [self.sink.id])
+
+        self.sink.delete()
+        self.assertEqual(self._ids({'q': 'trough'}), [])
+
+    def test_operator_characters_are_plain_text(self):
+        self.assertEqual(self._ids({'q': '"sink* ('}), [self.sink.id])
+        self.assertEqual(self._ids({'q': 'sink OR ice'}), [])
+
+    def test_ranked_results_are_not_keyset_paged(self):
+        response = APIClient().get('/api/assets/', {'q': 'stain', 'cursor': ''})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cursor', response.data)
+
+
+class CustomFieldFilterTests(TestCase):
+
+    def setUp(self):
+        maker = Manufacturer.objects.create(name="Maker")
+        AssetAttribute.objects.create(name='voltage', data_type=AssetAttribute.AttributeType.INTEGER)
+        AssetAttribute.objects.create(
+            name='shelf_width',
+            data_type=AssetAttribute.AttributeType.FLOAT,
+            unit_type=AssetAttribute.UnitType.LENGTH,
+        )
+        AssetAttribute.objects.create(name='finish')
+        AssetAttribute.objects.create(name='ada', data_type=AssetAttribute.AttributeType.BOOLEAN)
+
+        def create(type_id, **custom_fields):
+            return Asset.objects.create(
+                type_id=type_id, manufacturer=maker, model=type_id, name=type_id, custom_fields=custom_fields,
+            )
+
+        self.small = create('SMALL', voltage=120, shelf_width=254.0, finish='Chrome', ada=True)
+        self.large = create('LARGE', voltage=208, shelf_width=609.6, finish='Satin', ada=False)
+        self.bare = create('BARE')
+
+    def _ids(self, params, user=None):
+        client = APIClient()
+        if user:
+            client.force_authenticate(user)
+        response = client.get('/api/assets/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return sorted(row['id'] for row in response.data['results'])
+
+    def test_typed_comparisons(self):
+        self.assertEqual(self._ids({'cf.voltage': '208'}), [self.large.id])
+        self.assertEqual(self._ids({'cf.voltage__gte': '100'}), [self.small.id, self.large.id])
+        self.assertEqual(self._ids({'cf.voltage__in': '120,277'}), [self.small.id])
+        self.assertEqual(self._ids({'cf.finish': 'chrome'}), [self.small.id])
+        self.assertEqual(self._ids({'cf.finish__contains': 'ati'}), [self.large.id])
+        self.assertEqual(self._ids({'cf.ada': 'true'}), [self.small.id])
+        self.assertEqual(self._ids({'cf.voltage__isnull': 'true'}), [self.bare.id])
+
+    def test_operands_are_converted_from_user_units(self):
+        user = User.objects.create_user('imperial', password='pw')
+        user.settings.length_unit = 'in'
+        user.settings.save()
+        user = User.objects.get(pk=user.pk)
+
+        self.assertEqual(self._ids({'cf.shelf_width': '10'}, user), [self.small.id])
+        self.assertEqual(self._ids({'cf.shelf_width__gt': '12'}, user), [self.large.id])
+        self.assertEqual(self._ids({'cf.shelf_width__gt': '12'}), [self.small.id, self.large.id])
+
+    def test_in_matches_converted_operands_like_exact(self):
+        user = User.objects.create_user('feet', password='pw')
+        user.settings.length_unit = 'ft'
+        user.settings.save()
+        user = User.objects.get(pk=user.pk)
+        wide = Asset.objects.create(
+            type_id='WIDE', manufacturer=self.small.manufacturer, model='WIDE', name='WIDE',
+            custom_fields={'shelf_width': 914.4},
+        )
+
+        self.assertEqual(self._ids({'cf.shelf_width': '2'}, user), [self.large.id])
+        self.assertEqual(self._ids({'cf.shelf_width__in': '2,3'}, user), [self.large.id, wide.id])
+
+    def test_index_follows_updates(self):
+        self.small.custom_fields = {'voltage': 277}
+        self.small.save()
+        self.assertEqual(self._ids({'cf.voltage': '277'}), [self.small.id])
+        self.assertEqual(self._ids({'cf.finish': 'chrome'}), [])
+
+    def test_invalid_operands_are_rejected(self):
+        client = APIClient()
+        self.assertEqual(client.get('/api/assets/', {'cf.voltage': 'lots'}).status_code, 400)
+        self.assertEqual(client.get('/api/assets/', {'cf.finish__gt': 'a'}).status_code, 400)
+        self.assertEqual(client.get('/api/assets/', {'cf.voltage__between': '1'}).status_code, 400)
+
+
+class AssetBulkImportTests(TestCase):
+
+    def setUp(self):
+        self.maker = Manufacturer.objects.create(name="Maker")
+        self.category = AssetCategory.objects.create(name="Sinks")
+        AssetAttribute.objects.create(name='voltage', data_type=AssetAttribute.AttributeType.INTEGER)
+        AssetAttribute.objects.create(
+            name='shelf_width',
+            data_type=AssetAttribute.AttributeType.FLOAT,
+            unit_type=AssetAttribute.UnitType.LENGTH,
+        )
+        self.existing = Asset.objects.create(
+            type_id='SINK-1', manufacturer=self.maker, model='Old', name='Old sink',
+        )
+        self.client = APIClient()
+
+    def _post(self, body, content_type, params=''):
+        return self.client.generic('POST', f'/api/assets/bulk/{params}', body, content_type=content_type)
+
+    def test_ndjson_upserts_on_type_id_and_reports_bad_rows(self):
+        body = "\n".join([
+            '{"type_id": "SINK-1", "manufacturer": "Maker", "category": "Sinks", "model": "New", "name": "New sink",'
+            ' "overall_height": 3, "custom_fields": {"shelf_width": 1.5, "voltage": 120}}',
+            '{"type_id": "SINK-2", "manufacturer_id": %d, "model": "S2", "name": "Second sink"}' % self.maker.id,
+            '{"type_id": "SINK-3", "manufacturer": "Nobody", "model": "S3", "name": "Third"}',
+            'not json',
+            '{"type_id": "SINK-4", "manufacturer": "Maker", "model": "S4", "name": "Fourth", "custom_fields": {"voltage": "high"}}',
+        ])
+        response = self._post(body, 'application/x-ndjson', '?input_units={"length": "ft"}')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['failed']), (1, 1, 3))
+        self.assertEqual([error['row'] for error in response.data['errors']], [4, 3, 5])
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, 'New sink')
+        self.assertEqual(self.existing.category, self.category)
+        self.assertAlmostEqual(self.existing.overall_height, 914.4)
+        self.assertAlmostEqual(self.existing.custom_fields['shelf_width'], 457.2)
+
+        # bulk writes bypass post_save, so the importer maintains the side indexes itself
+        ids = [row['id'] for row in self.client.get('/api/assets/', {'cf.voltage': '120'}).data['results']]
+        self.assertEqual(ids, [self.existing.id])
+
+    def test_csv_upload_types_custom_field_columns(self):
+        upload = SimpleUploadedFile(
+            'catalog.csv',
+            b"type_id,manufacturer,model,name,cf.voltage,cf.shelf_width\n"
+            b"CSV-1,Maker,C1,From CSV,208,254\n",
+            content_type='text/csv',
+        )
+        response = self.client.post('/api/assets/bulk/', {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(Asset.objects.get(type_id='CSV-1').custom_fields, {'voltage': 208, 'shelf_width': 254.0})
+
+    def test_unknown_format_and_units_are_rejected(self):
+        self.assertEqual(self._post('{}', 'application/xml').status_code, 400)
+        response = self._post('{}', 'application/x-ndjson', '?input_units={"length": "furlong"}')
+        self.assertEqual(response.status_code, 400)
+
+    def test_command_reports_rows_over_column_limits(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as source:
+            source.write("type_id,manufacturer,model,name,url\n")
+            source.write(f"CMD-1,Maker,M1,{'x' * 300},\n")
+            source.write("CMD-2,Maker,M2,Fine,not a url\n")
+            source.write("CMD-3,Maker,M3,Fine,\n")
+        self.addCleanup(os.remove, source.name)
+
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_assets', source.name, stdout=out, stderr=err)
+        self.assertIn("Created 1, updated 0, failed 2", out.getvalue())
+        self.assertIn("Row 1: {'name'", err.getvalue())
+        self.assertIn("Row 2: {'url'", err.getvalue())
+        self.assertEqual(list(Asset.objects.filter(type_id__startswith='CMD').values_list('type_id', flat=True)), ['CMD-3'])
+
+    def test_command_rejects_missing_files_and_units_for_instances(self):
+        with self.assertRaisesMessage(CommandError, "Cannot read /nonexistent/catalog.csv"):
+            call_command('import_assets', '/nonexistent/catalog.csv')
+        with self.assertRaisesMessage(CommandError, "--units applies to asset imports"):
+            call_command('import_assets', 'instances.csv', '--instances', '--units', 'length=ft')
+
+
+class VendorPricingTests(TestCase):
+
+    def setUp(self):
+        maker = Manufacturer.objects.create(name="Maker")
+        acme, bolt = Vendor.objects.create(name='Acme'), Vendor.objects.create(name='Bolt')
+        self.assets = [
+            Asset.objects.create(type_id=f'A-{i}', manufacturer=maker, model=f'M{i}', name=f'Asset {i}')
+            for i in range(3)
+        ]
+        for asset in self.assets[:2]:
+            VendorProduct.objects.create(asset=asset, vendor=acme, cost='120.00', lead_time_days=5)
+            VendorProduct.objects.create(asset=asset, vendor=bolt, cost='99.50', lead_time_days=21)
+        self.client = APIClient()
+
+    def test_vendors_endpoint_lists_offers_cheapest_first(self):
+        response = self.client.get(f'/api/assets/{self.assets[0].id}/vendors/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['vendor_name'] for row in response.data], ['Bolt', 'Acme'])
+
+    def test_include_pricing_costs_one_query_per_page(self):
+        with self.assertNumQueries(4):
+            # COUNT + page + files prefetch + ranked offers for the whole page
+            response = self.client.get('/api/assets/', {'include': 'pricing'})
+
+        pricing = {row['type_id']: row['pricing'] for row in response.data['results']}
+        self.assertEqual(pricing['A-0']['cheapest']['vendor_name'], 'Bolt')
+        self.assertEqual(pricing['A-0']['fastest']['vendor_name'], 'Acme')
+        self.assertEqual(pricing['A-2'], {'cheapest': None, 'fastest': None})
+
+        self.assertNotIn('pricing', self.client.get('/api/assets/').data['results'][0])
+
+    def test_sparse_fields_drop_pricing_and_its_query(self):
+        with self.assertNumQueries(2):
+            # COUNT + page; no files prefetch and no offers
+            response = self.client.get('/api/assets/', {'include': 'pricing', 'fields': 'id,name'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name'})
+
+        response = self.client.get('/api/assets/', {'include': 'pricing', 'fields': 'type_id,pricing'})
+        row = next(row for row in response.data['results'] if row['type_id'] == 'A-0')
+        self.assertEqual(row['pricing']['cheapest']['vendor_name'], 'Bolt')
+
+    def test_expand_vendors_survives_sparse_fields(self):
+        with self.assertNumQueries(4):
+            # COUNT + page + offers and their vendors prefetched (files are not rendered)
+            response = self.client.get('/api/assets/', {'fields': 'id,type_id', 'expand': 'vendors'})
+
+        row = response.data['results'][0]
+        self.assertEqual(set(row), {'id', 'type_id', 'vendors'})
+        self.assertEqual(sorted(offer['vendor_name'] for offer in row['vendors']), ['Acme', 'Bolt'])
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        self.maker = Manufacturer.objects.create(name="Maker")
+        self.asset = Asset.objects.create(type_id='A-1', manufacturer=self.maker, model='M', name='Asset')
+        self.client = APIClient()
+
+    def _revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_matching_etag_is_answered_without_querying(self):
+        for url in ('/api/assets/', f'/api/assets/{self.asset.id}/', '/api/attributes/',
+                    '/api/assets/all_categories/', '/api/assets/all_manufacturers/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('Last-Modified', response)
+
+            with self.assertNumQueries(0):
+                not_modified = self._revalidate(url, response)
+            self.assertEqual(not_modified.status_code, 304, url)
+            self.assertEqual(not_modified['ETag'], response['ETag'])
+            self.assertEqual(not_modified.content, b'')
+
+    def test_etag_follows_table_stamps_and_user_units(self):
+        response = self.client.get('/api/assets/')
+        categories = self.client.get('/api/assets/all_categories/')
+
+        self.maker.name = 'Renamed'
+        self.maker.save()
+        self.assertEqual(self._revalidate('/api/assets/', response).status_code, 200)
+        # unrelated tables keep their validators
+        self.assertEqual(self._revalidate('/api/assets/all_categories/', categories).status_code, 304)
+
+        response = self.client.get('/api/assets/')
+        user = User.objects.create_user('imperial', password='pw')
+        user.settings.length_unit = 'in'
+        user.settings.save()
+        self.client.force_authenticate(User.objects.get(pk=user.pk))
+        self.assertEqual(self._revalidate('/api/assets/', response).status_code, 200)
+
+    def test_if_modified_since_sees_changes_within_the_same_second(self):
+        # Ahead of any stamp left in the cache by other tests, 0.2s into a second
+        now = (time.time_ns() // 10**9 + 1000) * 10**9 + 200_000_000
+        with mock.patch('time.time_ns', return_value=now):
+            self.asset.save()
+            response = self.client.get('/api/assets/')
+            self.asset.name = 'Renamed'
+            self.asset.save()
+            stale = self.client.get('/api/assets/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(stale.status_code, 200)
+
+        with mock.patch('time.time_ns', return_value=now + 2 * 10**9):
+            response = self.client.get('/api/assets/')
+            with self.assertNumQueries(0):
+                fresh = self.client.get('/api/assets/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(fresh.status_code, 304)
+
+    def test_query_string_is_part_of_the_etag(self):
+        response = self.client.get('/api/assets/')
+        self.assertNotEqual(self.client.get('/api/assets/', {'include': 'pricing'})['ETag'], response['ETag'])
+
+
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        # stamps live in the cache and survive test rollbacks; start from a clean slate
+        caches['default'].clear()
+        caches['responses'].clear()
+        Manufacturer.objects.create(name="Maker")
+        self.client = APIClient()
+
+    def test_lookup_lists_are_served_pre_rendered(self):
+        first = self.client.get('/api/assets/all_manufacturers/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/assets/all_manufacturers/')
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['Content-Type'], first['Content-Type'])
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_model_signals_invalidate_cached_bodies(self):
+        self.client.get('/api/attributes/')
+        self.client.get('/api/assets/all_manufacturers/')
+
+        AssetAttribute.objects.create(name='voltage')
+        Manufacturer.objects.create(name="Second Maker")
+
+        self.assertEqual([row['name'] for row in self.client.get('/api/attributes/').json()['results']], ['voltage'])
+        self.assertEqual(len(self.client.get('/api/assets/all_manufacturers/').json()), 2)
+
+
+class UnitConverterBatchTests(SimpleTestCase):
+
+    def test_sequences_keep_none_masked(self):
+        self.assertEqual(UnitConverter.to_storage_many([1, None, 2.5], 'ft', 'length'), [304.8, None, 762.0])
+        self.assertEqual(UnitConverter.from_storage_many((254.0, None), 'in', 'length'), [10.0, None])
+
+    def test_array_array_stays_a_typed_array(self):
+        column = UnitConverter.to_storage_many(array.array('d', [1.0, 2.0]), 'lb', 'mass')
+        self.assertIsInstance(column, array.array)
+        self.assertEqual(list(column), [0.453592, 0.907184])
+
+    @skipUnless(numpy, "NumPy is optional")
+    def test_numpy_columns_convert_in_one_operation(self):
+        column = UnitConverter.from_storage_many(numpy.array([304.8, 609.6]), 'ft', 'length')
+        self.assertEqual(column.tolist(), [1.0, 2.0])
+
+        masked = UnitConverter.to_storage_many(numpy.array([1.0, None], dtype=object), 'm', 'length')
+        self.assertEqual(masked.tolist(), [1000.0, None])
+
+    def test_unknown_units_fail_loudly(self):
+        with self.assertRaisesMessage(UnknownUnitError, "Unknown length unit 'furlong'"):
+            UnitConverter.to_storage(1, 'furlong', 'length')
+        with self.assertRaises(UnknownUnitError):
+            UnitConverter.from_storage_many([1], 'kg', 'temperature')
+
+
+class ContentAddressedFileTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.media = Path(media.name)
+        self.client = APIClient()
+
+    def blobs(self):
+        return sorted(path.name for path in self.media.rglob('*') if path.is_file())
+
+    def upload(self, name, content):
+        return self.client.post('/api/files/', {'file': SimpleUploadedFile(name, content)}, format='multipart')
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=16)
+    def test_identical_uploads_share_one_blob(self):
+        content = b'%PDF-1.4 cut sheet' * 100
+        digest = hashlib.sha256(content).hexdigest()
+
+        first, second = self.upload('Sheet.PDF', content), self.upload('copy.pdf', content)
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((first.data['sha256'], first.data['size']), (digest, len(content)))
+        self.assertEqual((first.data['original_name'], second.data['original_name']), ('Sheet.PDF', 'copy.pdf'))
+        self.assertEqual(first.data['file'], second.data['file'])
+        self.assertEqual(self.blobs(), [f'{digest}.pdf'])
+
+    def collect_blobs(self, *args):
+        out = io.StringIO()
+        call_command('collect_blobs', *args, stdout=out)
+        return out.getvalue()
+
+    def test_unreferenced_blobs_are_collected_after_the_grace_period(self):
+        rows = [AssetFile.objects.get(pk=self.upload('a.pdf', b'same').data['id']) for _ in range(2)]
+        self.upload('b.pdf', b'other')
+        rows[0].delete()
+        self.assertIn("Deleted 0 unreferenced files", self.collect_blobs('--older-than', '0'))
+
+        rows[1].delete()
+        self.assertEqual(len(self.blobs()), 2)
+        self.assertIn("Deleted 0 unreferenced files", self.collect_blobs())
+        self.assertIn("Would delete 1 unreferenced files (4 bytes)", self.collect_blobs('--older-than', '0', '--dry-run'))
+        self.assertIn("Deleted 1 unreferenced files (4 bytes)", self.collect_blobs('--older-than', '0'))
+        self.assertEqual(self.blobs(), [f"{hashlib.sha256(b'other').hexdigest()}.pdf"])
+
+    def test_reused_blob_survives_collection(self):
+        row = AssetFile.objects.get(pk=self.upload('a.pdf', b'same').data['id'])
+        name, storage = row.file.name, row.file.storage
+        row.delete()
+        os.utime(storage.path(name), (0, 0))
+
+        # An upload of the same content finds the blob, and has not committed its row yet
+        self.assertEqual(storage.save('assets/files/again.pdf', ContentFile(b'same')), name)
+        self.assertIn("Deleted 0 unreferenced files", self.collect_blobs())
+        self.assertTrue(storage.exists(name))
+
+    def test_dedupe_command_moves_legacy_files(self):
+        for name in ('one.pdf', 'two.pdf'):
+            (self.media / 'assets' / 'files').mkdir(parents=True, exist_ok=True)
+            (self.media / 'assets' / 'files' / name).write_bytes(b'legacy')
+        AssetFile.objects.bulk_create([AssetFile(file='assets/files/one.pdf'), AssetFile(file='assets/files/two.pdf')])
+
+        dry_run = io.StringIO()
+        call_command('dedupe_asset_files', '--dry-run', stdout=dry_run)
+        self.assertIn("Would move 2 files into content-addressed storage (6 bytes freed by duplicates", dry_run.getvalue())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('dedupe_asset_files', stdout=io.StringIO())
+
+        digest = hashlib.sha256(b'legacy').hexdigest()
+        self.assertEqual(set(AssetFile.objects.values_list('sha256', 'original_name')), {(digest, 'one.pdf'), (digest, 'two.pdf')})
+        self.assertEqual(self.blobs(), [f'{digest}.pdf'])
+
+
+@override_settings(THUMBNAIL_WORKERS=0, THUMBNAIL_WIDTHS=[40, 100], THUMBNAIL_FORMAT='JPEG')
+class ThumbnailTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.media = Path(media.name)
+
+    def image(self, name='logo.png', size=(400, 200)):
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.new('RGBA', size, (200, 30, 30, 255)).save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def thumbnail_sizes(self, name):
+        from PIL import Image
+        sizes = {}
+        for width in (40, 100):
+            with Image.open(self.media / thumbnails.thumbnail_name(name, width)) as thumb:
+                sizes[width] = (thumb.format, thumb.size)
+        return sizes
+
+    def test_upload_generates_thumbnails_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            maker = Manufacturer.objects.create(name="Maker", logo=self.image())
+        self.assertEqual(self.thumbnail_sizes(maker.logo.name), {40: ('JPEG', (40, 20)), 100: ('JPEG', (100, 50))})
+
+        # Saves that do not upload a new image leave the thumbnails alone
+        small = self.media / thumbnails.thumbnail_name(maker.logo.name, 40)
+        small.unlink()
+        with self.captureOnCommitCallbacks(execute=True):
+            maker.save()
+        self.assertFalse(small.exists())
+
+        data = APIClient().get(f'/api/manufacturers/{maker.pk}/').data
+        self.assertEqual(sorted(data['logo_thumb']), ['100', '40'])
+        self.assertTrue(data['logo_thumb']['40'].endswith(thumbnails.thumbnail_name(maker.logo.name, 40)))
+
+    def test_originals_differing_in_extension_get_their_own_thumbnails(self):
+        self.assertNotEqual(
+            thumbnails.thumbnail_name('assets/catalog_img_new.jpg', 40),
+            thumbnails.thumbnail_name('assets/catalog_img_new.png', 40),
+        )
+        self.assertEqual(thumbnails.thumbnail_name('assets/catalog_img_new.png', 160, 'WEBP'), 'assets/catalog_img_new.png.w160.webp')
+
+    def test_rotated_jpeg_is_not_decoded_below_its_upright_width(self):
+        from PIL import Image
+        # Stored 200x100 landscape, shown as a 100x200 portrait (orientation 6)
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        buffer = io.BytesIO()
+        Image.new('RGB', (200, 100), (30, 30, 200)).save(buffer, 'JPEG', exif=exif)
+        with self.captureOnCommitCallbacks(execute=True):
+            maker = Manufacturer.objects.create(
+                name="Maker", logo=SimpleUploadedFile('logo.jpg', buffer.getvalue(), content_type='image/jpeg'),
+            )
+        self.assertEqual(self.thumbnail_sizes(maker.logo.name), {40: ('JPEG', (40, 80)), 100: ('JPEG', (100, 200))})
+
+    def test_command_regenerates_missing_thumbnails(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            maker = Manufacturer.objects.create(name="Maker", logo=self.image())
+        Asset.objects.create(type_id='A-1', manufacturer=maker, model='M', name='No image')
+        (self.media / thumbnails.thumbnail_name(maker.logo.name, 40)).unlink()
+
+        out = io.StringIO()
+        call_command('generate_thumbnails', '--workers', '1', stdout=out)
+        self.assertIn("Wrote 1 thumbnails for 1 images (0 failed)", out.getvalue())
+        self.assertEqual(self.thumbnail_sizes(maker.logo.name)[40], ('JPEG', (40, 20)))
+
+
+@override_settings(FILE_UPLOAD_CHUNK_SIZE=4)
+class ChunkedUploadTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.media = Path(media.name)
+        self.client = APIClient()
+
+    def start(self, content, filename='family.rfa'):
+        response = self.client.post('/api/files/uploads/', {'filename': filename, 'size': len(content)}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data
+
+    def put_chunk(self, upload, index, data, digest=None):
+        return self.client.generic(
+            'PUT', f"/api/files/uploads/{upload['id']}/chunks/{index}/", data,
+            content_type='application/octet-stream',
+            HTTP_X_CHUNK_SHA256=digest or hashlib.sha256(data).hexdigest(),
+        )
+
+    def test_out_of_order_chunks_resume_and_finalize(self):
+        content = b'0123456789'
+        upload = self.start(content)
+        self.assertEqual((upload['chunk_size'], upload['chunk_count'], upload['received']), (4, 3, []))
+
+        self.assertEqual(self.put_chunk(upload, 2, b'89').status_code, 201)
+        # A corrupted chunk is rejected and simply sent again
+        self.assertEqual(self.put_chunk(upload, 0, b'0123', digest='0' * 64).status_code, 400)
+        self.assertEqual(self.put_chunk(upload, 0, b'0123').status_code, 201)
+        self.assertEqual(self.put_chunk(upload, 0, b'0123').status_code, 200)
+
+        self.assertEqual(self.client.get(f"/api/files/uploads/{upload['id']}/").data['received'], [0, 2])
+        missing = self.client.post(f"/api/files/uploads/{upload['id']}/finalize/", {}, format='json')
+        self.assertEqual(missing.status_code, 400)
+        self.assertIn('1', missing.data['detail'])
+
+        self.assertEqual(self.put_chunk(upload, 1, b'4567').status_code, 201)
+        digest = hashlib.sha256(content).hexdigest()
+        response = self.client.post(f"/api/files/uploads/{upload['id']}/finalize/", {'sha256': digest}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['sha256'], response.data['size'], response.data['original_name']),
+                         (digest, 10, 'family.rfa'))
+        self.assertEqual(sorted(path.name for path in self.media.rglob('*') if path.is_file()), [f'{digest}.rfa'])
+        self.assertFalse(FileUpload.objects.exists())
+
+    @override_settings(FILE_UPLOAD_MAX_SIZE=8)
+    def test_oversized_upload_is_refused_before_allocating(self):
+        response = self.client.post('/api/files/uploads/', {'filename': 'big.rfa', 'size': 9}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('size', response.data)
+        self.assertFalse(FileUpload.objects.exists())
+
+    def test_failed_preallocation_leaves_no_upload_row(self):
+        with mock.patch.object(uploads.os, 'makedirs', side_effect=OSError(28, "No space left on device")):
+            with self.assertRaises(OSError):
+                uploads.start('family.rfa', 10)
+        self.assertFalse(FileUpload.objects.exists())
+
+    def test_second_finalize_of_one_upload_conflicts(self):
+        upload = self.start(b'abc')
+        self.put_chunk(upload, 0, b'abc')
+        stale = FileUpload.objects.get(pk=upload['id'])
+        self.assertEqual(self.client.post(f"/api/files/uploads/{upload['id']}/finalize/", {}, format='json').status_code, 201)
+
+        with self.assertRaises(uploads.UploadConflict):
+            uploads.finalize(stale)
+        self.assertEqual(AssetFile.objects.count(), 1)
+
+    def test_chunk_racing_an_abort_conflicts(self):
+        upload = self.start(b'0123456789')
+        # The abort removes the partial file after the chunk request has loaded the upload row
+        for path in self.media.rglob('*.part'):
+            path.unlink()
+
+        response = self.put_chunk(upload, 0, b'0123')
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(FileUploadChunk.objects.exists())
+
+    def test_duplicate_upload_reuses_blob(self):
+        first = AssetFile.objects.get(pk=self.client.post(
+            '/api/files/', {'file': SimpleUploadedFile('a.rfa', b'abc')}, format='multipart',
+        ).data['id'])
+
+        upload = self.start(b'abc', filename='b.rfa')
+        self.put_chunk(upload, 0, b'abc')
+        response = self.client.post(f"/api/files/uploads/{upload['id']}/finalize/", {}, format='json')
+        self.assertEqual(response.data['file'].rsplit('/', 1)[-1], first.file.name.rsplit('/', 1)[-1])
+        self.assertEqual(len([path for path in self.media.rglob('*') if path.is_file()]), 1)
+
+    def test_wrong_length_and_abort(self):
+        upload = self.start(b'0123456789')
+        self.assertEqual(self.put_chunk(upload, 1, b'45').status_code, 400)
+        self.assertEqual(self.put_chunk(upload, 3, b'45').status_code, 400)
+
+        self.assertEqual(self.client.delete(f"/api/files/uploads/{upload['id']}/").status_code, 204)
+        self.assertEqual(list(self.media.rglob('*.part')), [])
+        self.assertEqual(self.client.get(f"/api/files/uploads/{upload['id']}/").status_code, 404)
+
+
+class FileDownloadTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.client = APIClient()
+        self.content = bytes(range(256)) * 4
+        self.file = AssetFile.objects.create(file=SimpleUploadedFile('Family Ø.rfa', self.content))
+        self.url = f'/api/files/{self.file.pk}/download/'
+
+    def test_full_download_and_revalidation(self):
+        response = self.client.get(self.url, HTTP_ACCEPT='application/octet-stream')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['ETag'], f'"{self.file.sha256}"')
+        self.assertIn("filename*=utf-8''Family%20%C3%98.rfa", response['Content-Disposition'])
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_byte_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+        self.assertEqual((response['Content-Range'], response['Content-Length']), ('bytes 10-19/1024', '10'))
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-4')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-4:])
+        response = self.client.get(self.url, HTTP_RANGE='bytes=1000-')
+        self.assertEqual(response['Content-Range'], 'bytes 1000-1023/1024')
+
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=5000-').status_code, 416)
+        # A stale If-Range gets the whole (changed) file
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"old"').status_code, 200)
+
+    @override_settings(FILE_DOWNLOAD_BACKEND='')
+    async def test_asgi_reads_the_file_as_it_is_sent(self):
+        request = AsyncRequestFactory().get(self.url, headers={'Range': 'bytes=10-1009'})
+        with mock.patch.object(streaming, 'READ_SIZE', 100):
+            response = downloads.serve(request, self.file.file, etag='"e"')
+            self.assertTrue(response.is_async)
+            pieces = [piece async for piece in response]
+        response.close()
+        self.assertEqual((response.status_code, response['Content-Length']), (206, '1000'))
+        self.assertEqual([len(piece) for piece in pieces], [100] * 10)
+        self.assertEqual(b''.join(pieces), self.content[10:1010])
+
+    @override_settings(FILE_DOWNLOAD_BACKEND='x-accel-redirect', FILE_DOWNLOAD_ACCEL_PREFIX='/protected-media/')
+    def test_hand_off_to_front_end_server(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.file.file.name}')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(API_KEY_AUTH_ENABLED=True)
+    def test_requires_api_key(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+
+@override_settings(ASYNC_VIEWS=True, MEDIA_ROOT='/tmp/ephany-test-media')
+class AsyncReadTests(TestCase):
+    """The async list/retrieve path must render exactly what the sync views do."""
+
+    @classmethod
+    def setUpTestData(cls):
+        maker = Manufacturer.objects.create(name="Maker")
+        category = AssetCategory.objects.create(name="Shelving")
+        AssetAttribute.objects.create(
+            name='shelf_width', data_type=AssetAttribute.AttributeType.FLOAT, unit_type=AssetAttribute.UnitType.LENGTH,
+        )
+        cls.file = AssetFile.objects.create(file=SimpleUploadedFile('sheet.pdf', b'%PDF-1.4'))
+        for i in range(3):
+            asset = Asset.objects.create(
+                type_id=f'S-{i}', manufacturer=maker, category=category, model=f'M{i}', name=f'Shelf {i}',
+                overall_width=900.0, custom_fields={'shelf_width': 254.0},
+            )
+            asset.files.add(cls.file)
+        cls.asset = asset
+
+    def setUp(self):
+        caches['responses'].clear()
+        self.factory = AsyncRequestFactory()
+
+    def view(self, viewset, detail=False, actions=None):
+        actions = actions or ({'get': 'retrieve'} if detail else {'get': 'list'})
+        return viewset.as_view(actions, basename=viewset.queryset.model._meta.model_name, detail=detail)
+
+    async def test_list_and_detail_match_sync_views(self):
+        cases = [
+            (AssetViewSet, '/api/assets/', {'page_size': 2, 'page': 2}, None),
+            (AssetViewSet, '/api/assets/', {'fields': 'id,name', 'search': 'Shelf'}, None),
+            (AssetViewSet, '/api/assets/', {'cursor': ''}, None),
+            (AssetViewSet, f'/api/assets/{self.asset.pk}/', {}, self.asset.pk),
+            (AssetCategoryViewSet, '/api/categories/', {}, None),
+            (ManufacturerViewSet, '/api/manufacturers/', {}, None),
+            (AssetAttributeViewSet, '/api/attributes/', {}, None),
+        ]
+        for viewset, path, params, pk in cases:
+            expected = await self.async_client.get(path, params)
+            view = self.view(viewset, detail=pk is not None)
+            self.assertTrue(iscoroutinefunction(view))
+            with mock.patch.object(viewset, 'retrieve' if pk else 'list', side_effect=AssertionError("sync path")):
+                response = await view(self.factory.get(path, params), **({'pk': str(pk)} if pk else {}))
+            self.assertEqual(response.status_code, 200, path)
+            self.assertEqual(json.loads(response.content), expected.json(), (path, params))
+
+    async def test_errors_and_conditional_get(self):
+        detail = self.view(AssetViewSet, detail=True)
+        self.assertEqual((await detail(self.factory.get('/api/assets/0/'), pk='0')).status_code, 404)
+        self.assertEqual((await detail(self.factory.get('/api/assets/x/'), pk='x')).status_code, 404)
+
+        first = await detail(self.factory.get(f'/api/assets/{self.asset.pk}/'), pk=str(self.asset.pk))
+        again = await detail(
+            self.factory.get(f'/api/assets/{self.asset.pk}/', headers={'If-None-Match': first['ETag']}),
+            pk=str(self.asset.pk),
+        )
+        self.assertEqual(again.status_code, 304)
+
+        listing = self.view(AssetViewSet)
+        self.assertEqual((await listing(self.factory.get('/api/assets/', {'page': 9}))).status_code, 404)
+
+    def test_writes_and_sync_only_features_use_sync_views(self):
+        # ?include=pricing and the browsable API finish on the sync path
+        with mock.patch.object(AssetViewSet, 'alist', side_effect=AssertionError("async path")):
+            listing = async_to_sync(self.view(AssetViewSet))
+            response = listing(self.factory.get('/api/assets/', {'include': 'pricing'}))
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('pricing', json.loads(response.content)['results'][0])
+            request = self.factory.get('/api/assets/', headers={'Accept': 'text/html'})
+            request.resolver_match = resolve('/api/assets/')
+            response = listing(request)
+            self.assertEqual((response.status_code, response['Content-Type']), (200, 'text/html; charset=utf-8'))
+
+        response = async_to_sync(self.view(AssetCategoryViewSet, actions={'get': 'list', 'post': 'create'}))(
+            self.factory.post('/api/categories/', {'name': 'Seating'}, content_type='application/json'),
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(AssetCategory.objects.filter(name='Seating').exists())
+
+    @override_settings(ASYNC_VIEWS=False)
+    def test_off_under_wsgi(self):
+        self.assertFalse(iscoroutinefunction(self.view(AssetViewSet)))
@@ -0,0 +1,189 @@
+"""
+Resumable chunked uploads for large AssetFiles (Revit families, CAD files).
+
+    POST   /api/files/uploads/                      {filename, size, category?, chunk_size?}
+    PUT    /api/files/uploads/{id}/chunks/{index}/  raw bytes + Content-Digest: sha-256=:<base64>:
+    GET    /api/files/uploads/{id}/                 which chunks have arrived (to resume)
+    POST   /api/files/uploads/{id}/finalize/        {sha256?} -> the AssetFile
+    DELETE /api/files/uploads/{id}/                 abort
+
+The file is preallocated (sparse) in the files storage at initiate. Each
+chunk is streamed from the request into its own byte range, in pieces and
+hashed on the way, and recorded only if its checksum matches. Chunks can
+therefore arrive in any order, in parallel, or again after a dropped
+connection. Finalize makes one read pass to hash the whole file. It then
+renames it to its content-addressed blob name, or drops it when that blob
+already exists. No bytes are held in memory beyond one piece, and none are
+copied.
+"""
+import base64
+import binascii
+import hashlib
+import os
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .models import AssetFile, FileUpload, FileUploadChunk
+from .storage import HASH_CHUNK_SIZE
+
+READ_SIZE = 64 * 1024
+
+
+class UploadError(ValueError):
+    """A chunk or finalize request that cannot be accepted (answered with 400)."""
+
+
+class UploadConflict(Exception):
+    """The upload was finalized or aborted by another request (answered with 409)."""
+
+
+def _storage():
+    return AssetFile._meta.get_field('file').storage
+
+
+def default_chunk_size():
+    return getattr(settings, 'FILE_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+
+
+def max_chunk_size():
+    return getattr(settings, 'FILE_UPLOAD_MAX_CHUNK_SIZE', 64 * 1024 * 1024)
+
+
+def max_size():
+    return getattr(settings, 'FILE_UPLOAD_MAX_SIZE', 5 * 1024 * 1024 * 1024)
+
+
+def parse_digest(headers):
+    """
+    The chunk's expected SHA-256 (hex) from `Content-Digest: sha-256=:<base64>:`
+    (RFC 9530) or `X-Chunk-SHA256: <hex>`.
+    """
+    for item in headers.get('Content-Digest', '').split(','):
+        algorithm, _, value = item.strip().partition('=')
+        if algorithm.lower() == 'sha-256':
+            try:
+                return base64.b64decode(value.strip(':'), validate=True).hex()
+            except (binascii.Error, ValueError):
+                raise UploadError("Malformed Content-Digest header.")
+
+    digest = headers.get('X-Chunk-SHA256', '').strip().lower()
+    if len(digest) == 64 and all(c in '0123456789abcdef' for c in digest):
+        return digest
+    raise UploadError("Send the chunk's SHA-256 as Content-Digest: sha-256=:<base64>: or X-Chunk-SHA256: <hex>.")
+
+
+def start(filename, size, category=AssetFile.Category.OTHER, chunk_size=None):
+    upload = FileUpload.objects.create(
+        filename=os.path.basename(filename), size=size, category=category, chunk_size=chunk_size or default_chunk_size(),
+    )
+    path = _storage().path(upload.partial_name)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as partial:
+            partial.truncate(size)
+    except OSError:
+        # No row without its file (e.g. the disk is full)
+        upload.delete()
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return upload
+
+
+def write_chunk(upload, index, stream, content_length, expected_digest):
+    """
+    Streams one chunk from `stream` into its byte range of the partial file.
+    Returns False when the chunk had already been received.
+    """
+    if not 0 <= index < upload.chunk_count:
+        raise UploadError(f"Chunk index must be between 0 and {upload.chunk_count - 1}.")
+    if upload.chunks.filter(index=index).exists():
+        return False
+    length = upload.chunk_length(index)
+    if content_length != length:
+        raise UploadError(f"Chunk {index} must be exactly {length} bytes, got {content_length}.")
+
+    sha256 = hashlib.sha256()
+    remaining = length
+    try:
+        partial = open(_storage().path(upload.partial_name), 'r+b')
+    except FileNotFoundError:
+        # A concurrent abort or finalize removed the partial file after the view loaded the upload
+        raise UploadConflict("The upload was already finalized or aborted.")
+    with partial:
+        partial.seek(index * upload.chunk_size)
+        while remaining:
+            piece = stream.read(min(READ_SIZE, remaining))
+            if not piece:
+                raise UploadError(f"Chunk {index} ended after {length - remaining} of {length} bytes.")
+            sha256.update(piece)
+            partial.write(piece)
+            remaining -= len(piece)
+
+    digest = sha256.hexdigest()
+    if digest != expected_digest:
+        raise UploadError(f"Checksum mismatch for chunk {index}; send it again.")
+
+    try:
+        with transaction.atomic():
+            FileUploadChunk.objects.create(upload=upload, index=index, sha256=digest)
+    except IntegrityError:
+        return False
+    return True
+
+
+def received(upload):
+    return sorted(upload.chunks.values_list('index', flat=True))
+
+
+def finalize(upload, expected_digest=None):
+    """
+    Turns a complete upload into an AssetFile. The upload row and its chunks
+    are removed. Raises UploadConflict when another request finalized or
+    aborted the upload first.
+    """
+    with transaction.atomic():
+        # Concurrent finalizes of one upload queue on the row; the later ones find it gone
+        if FileUpload.objects.select_for_update().filter(pk=upload.pk).first() is None:
+            raise UploadConflict("The upload was already finalized or aborted.")
+
+        missing = sorted(set(range(upload.chunk_count)) - set(received(upload)))
+        if missing:
+            raise UploadError(f"Missing chunks: {', '.join(map(str, missing[:20]))}{'...' if len(missing) > 20 else ''}.")
+
+        storage = _storage()
+        partial = storage.path(upload.partial_name)
+        try:
+            sha256 = hashlib.sha256()
+            with open(partial, 'rb') as content:
+                for piece in iter(lambda: content.read(HASH_CHUNK_SIZE), b''):
+                    sha256.update(piece)
+            digest = sha256.hexdigest()
+            if expected_digest and expected_digest.lower() != digest:
+                raise UploadError("The assembled file does not match the given sha256.")
+
+            name = storage.blob_name(f"assets/files/{upload.filename}", digest)
+            if storage.touch(name):
+                os.remove(partial)
+            else:
+                os.makedirs(os.path.dirname(storage.path(name)), exist_ok=True)
+                # Chunks may be older than collect_blobs' grace period
+                os.utime(partial)
+                os.replace(partial, storage.path(name))
+        except FileNotFoundError:
+            # Backends without row locks (SQLite): the other request moved or deleted the partial file
+            raise UploadConflict("The upload was already finalized or aborted.")
+
+        asset_file = AssetFile.objects.create(
+            file=name, original_name=upload.filename, category=upload.category, sha256=digest, size=upload.size,
+        )
+        upload.delete()
+    return asset_file
+
+
+def abort(upload):
+    storage = _storage()
+    if storage.exists(upload.partial_name):
+        storage.delete(upload.partial_name)
+    upload.delete()
@@ -1,3 +1,4 @@
+from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
@@ -5,17 +6,31 @@ from rest_framework.response import Response
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .models import Manufacturer, Asset, AssetAttribute, AssetCategory, AssetFile
+from ephany_framework import downloads
+from ephany_framework.asyncviews import AsyncReadMixin
+from ephany_framework.conditional import ResponseCacheMixin
+from ephany_framework.pagination import OptionalCursorPagination
+from ephany_framework.prefetch import EagerLoadingMixin
+from ephany_framework.utils import UnitConverter
+from .filters import CustomFieldFilter, FullTextSearchFilter
+from . import uploads
+from .importers import AssetImporter, ImportFormatError, records_from_request
+from .models import (
+    Manufacturer, Asset, AssetAttribute, AssetCategory, AssetFieldValue, AssetFile, FileUpload, Vendor, VendorProduct,
+)
+from .pricing import best_offers
 from .serializers import (
     ManufacturerSerializer,
     AssetSerializer,
     AssetFileSerializer,
     AssetCategorySerializer,
-    CategoryListSerializer
+    CategoryListSerializer,
+    FileUploadSerializer,
+    VendorProductSerializer,
 )
 
 
-class ManufacturerViewSet(viewsets.ModelViewSet):
+class ManufacturerViewSet(AsyncReadMixin, viewsets.ModelViewSet):
     """
     ViewSet for viewing and editing manufacturers.
     Supports search by name and ordering.
@@ -39,12 +54,18 @@ class ManufacturerViewSet(viewsets.ModelViewSet):
     ordering = ['name']
 
 
-class AssetAttributeViewSet(viewsets.ReadOnlyModelViewSet):
+class AssetAttributeViewSet(AsyncReadMixin, ResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
     """
     Read-only endpoint to fetch available custom attributes.
     Frontend uses this to populate the 'Custom Fields' selection list.
     """
     queryset = AssetAttribute.objects.all().order_by('name')
+    conditional_models = {
+        'list': (AssetAttribute,),
+        'retrieve': (AssetAttribute,),
+    }
+    # Fetched by every client at startup: serve the rendered list from cache
+    cached_actions = ('list',)
     # You can define a simple inline serializer or add one to serializers.py
     # Here is a simple inline definition for convenience:
     from rest_framework import serializers
@@ -56,7 +77,7 @@ class AssetAttributeViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = AttributeSerializer
 
 
-class AssetCategoryViewSet(viewsets.ModelViewSet):
+class AssetCategoryViewSet(AsyncReadMixin, viewsets.ModelViewSet):
     queryset = AssetCategory.objects.all()
     serializer_class = AssetCategorySerializer
 
@@ -65,16 +86,113 @@ class AssetFileViewSet(viewsets.ModelViewSet):
     queryset = AssetFile.objects.all()
     serializer_class = AssetFileSerializer
 
+    @action(detail=True, methods=['get'], content_negotiation_class=downloads.DownloadNegotiation)
+    def download(self, request, pk=None):
+        """
+        Sends the file itself, with Range and If-None-Match support, or hands it
+        to the front-end server (FILE_DOWNLOAD_BACKEND).
+        Endpoint: /api/files/{id}/download/
+        """
+        asset_file = self.get_object()
+        return downloads.serve(
+            request,
+            asset_file.file,
+            filename=asset_file.original_name or None,
+            etag=f'"{asset_file.sha256}"' if asset_file.sha256 else None,
+        )
+
+    # --- Resumable chunked uploads (assets.uploads) ---
+
+    def _get_upload(self, upload_id):
+        return get_object_or_404(FileUpload.objects.prefetch_related('chunks'), pk=upload_id)
+
+    @action(detail=False, methods=['post'], url_path='uploads')
+    def start_upload(self, request):
+        """
+        Starts a chunked upload for a large file.
+        Endpoint: /api/files/uploads/  {filename, size, category?, chunk_size?}
+        """
+        serializer = FileUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = uploads.start(**serializer.validated_data)
+        return Response(FileUploadSerializer(upload).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get', 'delete'], url_path=r'uploads/(?P<upload_id>[0-9a-f-]{36})')
+    def upload(self, request, upload_id=None):
+        """
+        GET: chunks received so far, to resume after a dropped connection.
+        DELETE: aborts the upload.
+        """
+        upload = self._get_upload(upload_id)
+        if request.method == 'DELETE':
+            uploads.abort(upload)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return Response(FileUploadSerializer(upload).data)
+
+    @action(detail=False, methods=['put'], url_path=r'uploads/(?P<upload_id>[0-9a-f-]{36})/chunks/(?P<index>\d+)')
+    def upload_chunk(self, request, upload_id=None, index=None):
+        """
+        Stores one chunk, sent as the raw request body with its SHA-256 in
+        Content-Digest (sha-256=:<base64>:) or X-Chunk-SHA256 (hex).
+        Endpoint: /api/files/uploads/{id}/chunks/{index}/
+        """
+        upload = self._get_upload(upload_id)
+        try:
+            created = uploads.write_chunk(
+                upload,
+                int(index),
+                request._request,
+                int(request.META.get('CONTENT_LENGTH') or 0),
+                uploads.parse_digest(request.headers),
+            )
+        except uploads.UploadError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except uploads.UploadConflict as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_409_CONFLICT)
+        return Response(
+            {'index': int(index), 'received': uploads.received(upload), 'chunk_count': upload.chunk_count},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+    @action(detail=False, methods=['post'], url_path=r'uploads/(?P<upload_id>[0-9a-f-]{36})/finalize')
+    def finalize_upload(self, request, upload_id=None):
+        """
+        Assembles a complete upload into an AssetFile. Optional body: {sha256} of the whole file.
+        Endpoint: /api/files/uploads/{id}/finalize/
+        """
+        upload = self._get_upload(upload_id)
+        try:
+            asset_file = uploads.finalize(upload, expected_digest=request.data.get('sha256'))
+        except uploads.UploadError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except uploads.UploadConflict as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(asset_file).data, status=status.HTTP_201_CREATED)
+
+
+ASSET_TABLES = (Asset, AssetAttribute, AssetCategory, AssetFile, Manufacturer)
+
 
-class AssetViewSet(viewsets.ModelViewSet):
+class AssetViewSet(AsyncReadMixin, ResponseCacheMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Asset.objects.all()
     serializer_class = AssetSerializer
+    pagination_class = OptionalCursorPagination
+
+    # Tables each cacheable action renders from (ETag / Last-Modified, 304s)
+    conditional_models = {
+        'list': ASSET_TABLES,
+        'retrieve': ASSET_TABLES,
+        'all_categories': (AssetCategory,),
+        'all_manufacturers': (Manufacturer,),
+    }
+    # Unpaginated dropdown lists: served pre-rendered from the response cache
+    cached_actions = ('all_categories', 'all_manufacturers')
 
     # Enable file uploads
     parser_classes = (MultiPartParser, FormParser, JSONParser)
 
     # Configuration for filtering and searching
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filter_backends = [DjangoFilterBackend, SearchFilter, FullTextSearchFilter, CustomFieldFilter]
 
     # Fielded filtering (allows exact/partial matches on specific fields)
     filterset_fields = {
@@ -86,7 +204,11 @@ class AssetViewSet(viewsets.ModelViewSet):
         "category__name": ["exact"],
     }
 
-    # Keyword search (allows searching across these fields simultaneously)
+    # Typed custom field filters (?cf.voltage=208) run against this side index
+    custom_field_index = (AssetFieldValue, 'asset')
+
+    # Keyword search (allows searching across these fields simultaneously).
+    # For large catalogs prefer ranked full-text search: ?q=...
     search_fields = [
         "name",
         "description",
@@ -94,9 +216,64 @@ class AssetViewSet(viewsets.ModelViewSet):
         "manufacturer__name",
     ]
 
-    def update(self, request, *args, **kwargs):
-        print("DEBUG FILES:", request.FILES)  # <--- Check console. Is this empty?
-        return super().update(request, *args, **kwargs)
+    def _includes(self, name):
+        return name in self.request.query_params.get('include', '').split(',')
+
+    def get_conditional_models(self):
+        models = super().get_conditional_models()
+        if models and (self._includes('pricing') or 'vendors' in self.request.query_params.get('expand', '').split(',')):
+            models += (Vendor, VendorProduct)
+        return models
+
+    def get_conditional_variants(self):
+        # Dimensions and custom fields are rendered in the user's units
+        if self.action in ('list', 'retrieve'):
+            return sorted(UnitConverter.units_for_user(self.request.user).items())
+        return ()
+
+    def async_read_supported(self, request):
+        # Pricing is computed by a sync helper as the page is serialized
+        return super().async_read_supported(request) and not self._includes('pricing')
+
+    def get_serializer(self, *args, **kwargs):
+        # ?include=pricing: cheapest/fastest vendor for every asset being rendered, in one query
+        serializer = super().get_serializer(*args, **kwargs)
+        if args and self._includes('pricing'):
+            assets, target = (args[0], serializer.child) if kwargs.get('many') else ([args[0]], serializer)
+            # ...unless ?fields= leaves it out
+            if target.wants_field('pricing'):
+                serializer.context['pricing'] = best_offers([asset.pk for asset in assets])
+        return serializer
+
+    @action(detail=True, methods=['get'])
+    def vendors(self, request, pk=None):
+        """
+        Every vendor offer for the asset, cheapest first.
+        Endpoint: /api/assets/{id}/vendors/
+        """
+        asset = self.get_object()
+        products = asset.vendor_products.select_related('vendor').order_by('cost', 'lead_time_days', 'id')
+        serializer = VendorProductSerializer(products, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Bulk import (upsert on type_id) from NDJSON or CSV, sent as the raw
+        request body or as a multipart file named 'file'.
+        Endpoint: /api/assets/bulk/?input_units={"length": "ft"}
+        Invalid rows are reported individually; the rest are imported.
+        """
+        try:
+            importer = AssetImporter(
+                input_units=request.query_params.get('input_units'),
+                batch_size=request.query_params.get('batch_size'),
+            )
+            records = records_from_request(request)
+        except ImportFormatError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(importer.run(records), status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['get'])
     def all_categories(self, request):
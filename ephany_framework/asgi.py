@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ephany_framework.settings')
+# Catalog reads run as coroutines under ASGI (see ephany_framework.asyncviews)
+os.environ.setdefault('ASYNC_VIEWS', 'true')
 
 application = get_asgi_application()
@@ -0,0 +1,159 @@
+"""
+Async read path for the catalog endpoints under ASGI.
+
+With ASYNC_VIEWS on (asgi.py turns it on), viewsets using AsyncReadMixin
+answer GET list and retrieve with a coroutine. Otherwise Django would run the
+sync view in a thread for the whole request:
+
+    1. DRF's checks run in one short sync_to_async call: authentication,
+       permissions, content negotiation and conditional GET / the response
+       cache. The same call builds the filtered queryset (lazily) and
+       resolves anything the serializer would otherwise load on first use,
+       such as the user's units and the attribute schema.
+    2. The COUNT and the rows come from the async ORM (acount, async for,
+       aget).
+    3. Serializing and rendering happen on the event loop. The body then goes
+       out to slow clients without holding a thread.
+
+Writes, extra actions and the browsable API take the usual sync path, as
+does any request a view turns down in `async_read_supported()`. Under WSGI
+nothing changes.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.http import Http404, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
+
+ASYNC_ACTIONS = ('list', 'retrieve')
+
+
+def async_views_enabled():
+    return getattr(settings, 'ASYNC_VIEWS', False)
+
+
+async def _rendered(response):
+    """
+    Renders a DRF Response on the event loop and returns a plain HttpResponse,
+    which Django's async handler does not render again in a thread.
+    """
+    if not isinstance(response, Response):
+        return response
+    if isinstance(response.accepted_renderer, BrowsableAPIRenderer):
+        # Builds forms from querysets
+        return await sync_to_async(response.render)()
+    response.render()
+    plain = HttpResponse(response.content, status=response.status_code, headers=response.headers)
+    plain.cookies = response.cookies
+    return plain
+
+
+class AsyncReadMixin:
+    """
+    ViewSet mixin: async list and retrieve when ASYNC_VIEWS is on. Put it
+    first among the bases so its as_view() wraps the router's view.
+    """
+
+    def async_read_supported(self, request):
+        """Whether this request can be finished on the async path (checked after initial())."""
+        return not isinstance(request.accepted_renderer, BrowsableAPIRenderer)
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if not async_views_enabled() or actions.get('get') not in ASYNC_ACTIONS:
+            return view
+
+        sync_view = sync_to_async(view)
+
+        async def async_view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await sync_view(request, *args, **kwargs)
+
+            # What ViewSetMixin.as_view's view() does before dispatch()
+            self = cls(**initkwargs)
+            self.action_map = {**actions, 'head': actions['get']}
+            for method, action in self.action_map.items():
+                setattr(self, method, getattr(self, action))
+            self.request, self.args, self.kwargs = request, args, kwargs
+            return await self.adispatch(request, *args, **kwargs)
+
+        async_view.cls = cls
+        async_view.initkwargs = initkwargs
+        async_view.actions = actions
+        return csrf_exempt(async_view)
+
+    async def adispatch(self, request, *args, **kwargs):
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            if not await sync_to_async(self._begin_async_read)(request, *args, **kwargs):
+                return await sync_to_async(self._finish_sync)(request, *args, **kwargs)
+            handler = self.alist if self.action == 'list' else self.aretrieve
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return await _rendered(self.response)
+
+    def _begin_async_read(self, request, *args, **kwargs):
+        """
+        The sync part of an async read: DRF's checks, the lazy queryset and the
+        serializer's lookups. Returns False when the request has to finish on
+        the sync path.
+        """
+        self.initial(request, *args, **kwargs)
+        if not self.async_read_supported(request):
+            return False
+
+        self._async_context = self.get_serializer_context()
+        serializer = self.get_serializer()
+        if hasattr(serializer, 'resolve_context'):
+            serializer.resolve_context()
+        self._async_queryset = self.filter_queryset(self.get_queryset())
+        return True
+
+    def _finish_sync(self, request, *args, **kwargs):
+        # The rest of dispatch(), rendering included, in one thread
+        try:
+            response = getattr(self, self.action)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response.render()
+
+    def get_serializer_context(self):
+        # Pinned by _begin_async_read so lookups it resolved are not repeated
+        context = getattr(self, '_async_context', None)
+        return context if context is not None else super().get_serializer_context()
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        paginate = getattr(self.paginator, 'apaginate_queryset', None)
+        if paginate is None:
+            return await sync_to_async(self.paginate_queryset)(queryset)
+        return await paginate(queryset, self.request, view=self)
+
+    async def aget_object(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await self._async_queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (ObjectDoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def alist(self, request, *args, **kwargs):
+        page = await self.apaginate_queryset(self._async_queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        rows = [obj async for obj in self._async_queryset]
+        return Response(self.get_serializer(rows, many=True).data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return Response(self.get_serializer(await self.aget_object()).data)
@@ -0,0 +1,157 @@
+"""
+Conditional GET for read endpoints, driven by per-table change stamps.
+
+Validators are derived from the stamps of the tables a response is built
+from (plus anything else it varies on, such as the user's units), never
+from the rendered body:
+
+    ETag:          hash of view, path, renderer, stamps and variants
+    Last-Modified: the newest of those stamps, in whole seconds
+
+A matching If-None-Match (or, without one, a satisfied If-Modified-Since)
+is answered with 304 from `initial()`, before the handler, the queryset or
+the serializer run. ResponseCacheMixin goes one step further for small,
+hot lookup lists and serves their rendered bytes from a cache.
+"""
+import hashlib
+import time
+from email.utils import formatdate
+
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.http import parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from .stamps import table_stamps
+
+
+class NotModified(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+    default_detail = ''
+
+
+class CacheHit(Exception):
+    """Carries a pre-rendered response out of `initial()`."""
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    Views list the tables each action reads:
+
+        conditional_models = {
+            'list': (Asset, Manufacturer, ...),
+            'all_categories': (AssetCategory,),
+        }
+
+    Actions missing from the mapping are served unconditionally.
+    """
+    conditional_models = {}
+
+    def get_conditional_models(self):
+        return self.conditional_models.get(self.action, ())
+
+    def get_conditional_variants(self):
+        """Anything besides the URL and the tables that changes the body."""
+        return ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.conditional_validators = None
+
+        models = self.get_conditional_models() if request.method in ('GET', 'HEAD') else ()
+        if not models:
+            return
+
+        stamps = table_stamps(models)
+        parts = [
+            type(self).__name__,
+            self.action,
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            *map(str, stamps),
+            *map(str, self.get_conditional_variants()),
+        ]
+        etag = '"%s"' % hashlib.sha1('|'.join(parts).encode()).hexdigest()
+        last_modified = max(stamps) // 1_000_000_000
+        self.conditional_validators = (etag, self._advertised_last_modified(max(stamps)))
+
+        if self._not_modified(request, etag, last_modified):
+            raise NotModified()
+
+    def _advertised_last_modified(self, stamp):
+        # Until the stamp's second is over, later changes can land in the same second.
+        # Advertise the second before, which no revalidation is ever answered with 304 for.
+        seconds = stamp // 1_000_000_000
+        return seconds if time.time_ns() - stamp >= 1_000_000_000 else seconds - 1
+
+    def _not_modified(self, request, etag, last_modified):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            return '*' in etags or etag in etags
+
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        return if_modified_since is not None and last_modified <= if_modified_since
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validators = getattr(self, 'conditional_validators', None)
+        if validators and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            etag, last_modified = validators
+            response['ETag'] = etag
+            response['Last-Modified'] = formatdate(last_modified, usegmt=True)
+        return response
+
+
+class ResponseCacheMixin(ConditionalGetMixin):
+    """
+    Serves whole pre-rendered bodies for the actions in `cached_actions`.
+
+    The key is the response's ETag, which already covers the endpoint, query
+    string, renderer, variants (user units) and the change stamps of the
+    tables involved, so model signals invalidate entries by bumping stamps.
+    """
+    cached_actions = ()
+    response_cache_alias = 'responses'
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in self.cached_actions and self.conditional_validators:
+            cached = caches[self.response_cache_alias].get(self._response_cache_key())
+            if cached is not None:
+                content, content_type = cached
+                raise CacheHit(HttpResponse(content, content_type=content_type))
+
+    def _response_cache_key(self):
+        return f"ephany:response:{self.conditional_validators[0]}"
+
+    def handle_exception(self, exc):
+        if isinstance(exc, CacheHit):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        cacheable = (
+            isinstance(response, Response)
+            and response.status_code == status.HTTP_200_OK
+            and self.action in self.cached_actions
+            and getattr(self, 'conditional_validators', None)
+        )
+        if cacheable:
+            response.render()
+            caches[self.response_cache_alias].set(
+                self._response_cache_key(), (response.content, response['Content-Type']),
+            )
+        return response
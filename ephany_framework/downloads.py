@@ -0,0 +1,182 @@
+"""
+Download responses for stored files, for use outside DEBUG (where media is
+not served at all).
+
+    serve(request, field_file, filename=..., etag=...)
+
+The view in front of it runs the usual checks (APIKeyMiddleware guards
+/api/). The file is then sent in one of three ways, chosen by
+FILE_DOWNLOAD_BACKEND:
+
+    ''                  Django streams it with FileResponse. WSGI servers
+                        with wsgi.file_wrapper (gunicorn) use sendfile(2),
+                        so the bytes never pass through Python.
+    'x-accel-redirect'  nginx sends it from an `internal` location mapped to
+                        MEDIA_ROOT at FILE_DOWNLOAD_ACCEL_PREFIX.
+    'x-sendfile'        Apache (mod_xsendfile) or lighttpd sends it by path.
+
+With a hand-off the Python worker is free as soon as the headers are out,
+however slow the client. Django answers If-None-Match itself in every mode.
+When streaming, it also answers single byte ranges (Range, If-Range), which
+lets large CAD downloads resume. Multiple ranges get the whole file, as RFC
+9110 allows.
+
+Under ASGI (uvicorn) there is no sendfile(2). A streamed file is read in
+64 KiB pieces on a worker thread and sent from the event loop as they
+arrive (ephany_framework.streaming), so no thread is held for a slow client
+and the file is never held in memory whole. Large libraries should still
+use a hand-off, which costs the server nothing per byte.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils.http import content_disposition_header, parse_etags
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+
+from .streaming import is_asgi, read_file
+
+BYTE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class DownloadNegotiation(DefaultContentNegotiation):
+    """Any Accept header is fine for a file download; errors still render with the first renderer."""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        try:
+            return super().select_renderer(request, renderers, format_suffix)
+        except NotAcceptable:
+            return renderers[0], renderers[0].media_type
+
+
+class RangeFile:
+    """
+    Read-only view of `length` bytes of an open file from `start`. It keeps
+    fileno(), so gunicorn still uses sendfile(2), bounded by Content-Length.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    The (first, last) byte of a single range, or None to send the whole file
+    (no header, or one this does not serve). Raises RangeNotSatisfiable.
+    """
+    match = BYTE_RANGE.match((header or '').replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        if int(last) == 0 or size == 0:
+            raise RangeNotSatisfiable
+        return max(0, size - int(last)), size - 1
+    if last and int(last) < int(first):
+        return None
+    if int(first) >= size:
+        raise RangeNotSatisfiable
+    return int(first), min(int(last), size - 1) if last else size - 1
+
+
+def _matches(etag, header):
+    # Weak comparison, as If-None-Match requires
+    etags = parse_etags(header)
+    return '*' in etags or etag.removeprefix('W/') in (tag.removeprefix('W/') for tag in etags)
+
+
+def _stream(request, path, size, etag, filename):
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if request.method == 'GET' and (not if_range or if_range == etag):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    content = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(content, as_attachment=True, filename=filename)
+    else:
+        first, last = byte_range
+        content = RangeFile(content, first, last - first + 1)
+        response = FileResponse(content, as_attachment=True, filename=filename)
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {first}-{last}/{size}'
+        response['Content-Length'] = str(last - first + 1)
+
+    if is_asgi(request):
+        # Headers are set from the file already; it is still closed with the response
+        response.streaming_content = read_file(content)
+    return response
+
+
+def _hand_off(backend, storage, name, filename):
+    response = HttpResponse(content_type=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+    if backend == 'x-accel-redirect':
+        prefix = getattr(settings, 'FILE_DOWNLOAD_ACCEL_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = quote(f"{prefix.rstrip('/')}/{name}")
+    elif backend == 'x-sendfile':
+        response['X-Sendfile'] = storage.path(name)
+    else:
+        raise ValueError(f"Unknown FILE_DOWNLOAD_BACKEND {backend!r}")
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
+
+
+def serve(request, field_file, filename=None, etag=None):
+    """
+    Download response for a stored file. `etag` defaults to one made from the
+    file's size and modification time; pass a content hash when there is one.
+    """
+    if not field_file:
+        raise Http404
+    storage, name = field_file.storage, field_file.name
+    try:
+        stat = os.stat(storage.path(name))
+    except FileNotFoundError:
+        raise Http404
+
+    etag = etag or '"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+    filename = filename or os.path.basename(name)
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and _matches(etag, if_none_match):
+        response = HttpResponseNotModified()
+    else:
+        backend = getattr(settings, 'FILE_DOWNLOAD_BACKEND', '')
+        if backend:
+            response = _hand_off(backend, storage, name, filename)
+        else:
+            response = _stream(request, storage.path(name), stat.st_size, etag, filename)
+            response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
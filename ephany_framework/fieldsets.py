@@ -0,0 +1,93 @@
+"""
+Sparse fieldsets and expansions for read requests.
+
+    ?fields=id,asset,location           only these fields
+    ?fields=id,asset_details.name       dotted paths reach nested serializers using this mixin
+    ?expand=vendors                     opt-in fields (see `expandable_fields`), kept by ?fields=
+
+Trimming happens in get_fields(), before any row is rendered, so a dropped
+nested serializer costs nothing, and EagerLoadingMixin (which plans its joins
+from the same serializer) stops loading the relations behind it.
+Writes always see the full field set.
+"""
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def parse_fieldset(value):
+    """'a,b.c,b.d' -> {'a': {}, 'b': {'c': {}, 'd': {}}}; None when not given."""
+    if value is None:
+        return None
+    tree = {}
+    for item in value.split(','):
+        node = tree
+        for name in filter(None, item.strip().split('.')):
+            node = node.setdefault(name, {})
+    return tree
+
+
+def _subtree(tree, path):
+    """
+    Names selected below `path`, or None when everything is (no fieldset, or
+    the path itself was selected without naming any of its fields).
+    """
+    for name in path:
+        if tree is None or name not in tree:
+            return None
+        tree = tree[name]
+    return tree or None
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin. `expandable_fields` maps names to zero-argument
+    factories of fields that are only rendered when asked for with ?expand=.
+
+    A serializer rendered outside the response body (e.g. a sideloaded map)
+    can be given a 'fieldset_root' path in its context, so
+    ?fields=assets.name addresses it.
+    """
+    expandable_fields = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        self._selected_fields = None
+
+        request = self.context.get('request')
+        path = self._fieldset_path()
+        if request is None or request.method not in SAFE_METHODS or path is None:
+            return fields
+
+        expand = _subtree(parse_fieldset(request.query_params.get('expand')), path) or {}
+        for name, factory in self.expandable_fields.items():
+            if name in expand:
+                fields[name] = factory()
+
+        selected = _subtree(parse_fieldset(request.query_params.get('fields')), path)
+        if selected:
+            fields = {
+                name: field for name, field in fields.items()
+                if name in selected or name in expand or field.write_only
+            }
+            self._selected_fields = selected
+        return fields
+
+    def wants_field(self, name):
+        """For keys added in to_representation(): whether ?fields= leaves room for them."""
+        self.fields  # noqa: B018 - get_fields() records the selection
+        return self._selected_fields is None or name in self._selected_fields
+
+    def _fieldset_path(self):
+        """Field names from the root serializer down to this one; None below a serializer without the mixin."""
+        path = []
+        node = self
+        while node.parent is not None:
+            parent = node.parent
+            if isinstance(parent, serializers.ListSerializer):
+                node = parent
+                continue
+            if not isinstance(parent, SparseFieldsetMixin):
+                return None
+            path.append(node.field_name)
+            node = parent
+        return [*self.context.get('fieldset_root', ()), *reversed(path)]
@@ -0,0 +1,296 @@
+"""
+Opt-in request instrumentation (INSTRUMENTATION_ENABLED).
+
+For every request the middleware records the endpoint (HTTP method and URL
+name), the number of SQL queries and the time spent in them, the time spent
+producing serializer data and the total time in the view stack. Each
+response gets a Server-Timing header:
+
+    Server-Timing: db;dur=4.1;desc="6 queries", serialize;dur=2.3, total;dur=9.8
+
+Samples are kept per endpoint in a bounded window (the most recent
+INSTRUMENTATION_WINDOW requests), so percentiles roll with the traffic.
+Every worker process writes its windows to INSTRUMENTATION_DIR (a tmpfs such
+as /dev/shm by default) at most every INSTRUMENTATION_FLUSH_INTERVAL seconds;
+`manage.py request_stats` merges the files of all workers.
+
+Apps can add process-wide counters to the same files with
+register_stats(name, callable), e.g. the API key cache's hits and misses.
+
+The middleware runs natively under WSGI and ASGI. Queries are counted by an
+execute wrapper on every connection that reads the current request from a
+context variable, so queries made in sync_to_async threads count too.
+
+When disabled the middleware raises MiddlewareNotUsed, so Django drops it from
+the chain and nothing is hooked.
+"""
+import atexit
+import contextvars
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+STATS_FILE_PREFIX = 'requests-'
+PERCENTILES = (50, 90, 95, 99)
+
+# Sample layout: (total ms, sql ms, sql queries, serializer ms)
+METRICS = ('total_ms', 'sql_ms', 'queries', 'serializer_ms')
+
+_current = contextvars.ContextVar('ephany_request_timings', default=None)
+
+# name -> callable returning a dict of this process's counters
+_extra_stats = {}
+
+
+def register_stats(name, provider):
+    """Adds `provider()` to every stats file under `name`."""
+    _extra_stats[name] = provider
+
+
+class RequestTimings:
+    __slots__ = ('queries', 'sql', 'serializer', '_serializer_depth')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.serializer = 0.0
+        self._serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database execute wrapper."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - start
+            self.queries += 1
+
+
+def stats_dir():
+    configured = getattr(settings, 'INSTRUMENTATION_DIR', None)
+    if configured:
+        return Path(configured)
+    shm = Path('/dev/shm')
+    return (shm if shm.is_dir() else Path(tempfile.gettempdir())) / 'ephany-stats'
+
+
+class EndpointStats:
+    """Rolling per-endpoint windows of one process."""
+
+    def __init__(self, window=None, flush_interval=None):
+        self.window = window or getattr(settings, 'INSTRUMENTATION_WINDOW', 1000)
+        self.flush_interval = (
+            flush_interval if flush_interval is not None
+            else getattr(settings, 'INSTRUMENTATION_FLUSH_INTERVAL', 10)
+        )
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = {}
+        self._flushed_at = time.monotonic()
+
+    def record(self, endpoint, sample):
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.window)
+            samples.append(sample)
+            self._counts[endpoint] = self._counts.get(endpoint, 0) + 1
+            due = time.monotonic() - self._flushed_at >= self.flush_interval
+        if due:
+            self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                endpoint: {'count': self._counts[endpoint], 'samples': list(samples)}
+                for endpoint, samples in self._samples.items()
+            }
+
+    def flush(self):
+        """Writes this process's windows atomically to its file in stats_dir()."""
+        with self._lock:
+            self._flushed_at = time.monotonic()
+        directory = stats_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{STATS_FILE_PREFIX}{os.getpid()}.json"
+        tmp = path.with_suffix('.tmp')
+        extra = {name: provider() for name, provider in _extra_stats.items()}
+        tmp.write_text(json.dumps({
+            'pid': os.getpid(), 'written_at': time.time(), 'endpoints': self.snapshot(), 'extra': extra,
+        }))
+        os.replace(tmp, path)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+endpoint_stats = EndpointStats()
+
+
+def load_stats(directory=None):
+    """Merges the stats files of every worker into {endpoint: {'count', 'samples'}}."""
+    merged = {}
+    for path in sorted(Path(directory or stats_dir()).glob(f"{STATS_FILE_PREFIX}*.json")):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue  # Being replaced or truncated; the next dump will see it
+        for endpoint, stats in data.get('endpoints', {}).items():
+            target = merged.setdefault(endpoint, {'count': 0, 'samples': []})
+            target['count'] += stats['count']
+            target['samples'].extend(stats['samples'])
+    return merged
+
+
+def load_extra_stats(directory=None):
+    """Sums the integer counters each worker reported through register_stats(): {name: {counter: total}}."""
+    merged = {}
+    for path in sorted(Path(directory or stats_dir()).glob(f"{STATS_FILE_PREFIX}*.json")):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        for name, counters in data.get('extra', {}).items():
+            target = merged.setdefault(name, {'workers': 0})
+            target['workers'] += 1
+            for counter, value in counters.items():
+                if isinstance(value, int):
+                    target[counter] = target.get(counter, 0) + value
+    return merged
+
+
+def summarize(merged):
+    """Per-endpoint request counts, window sizes and metric percentiles."""
+    summary = {}
+    for endpoint, stats in merged.items():
+        columns = list(zip(*stats['samples'])) or [()] * len(METRICS)
+        row = {'count': stats['count'], 'window': len(stats['samples'])}
+        for metric, values in zip(METRICS, columns):
+            ordered = sorted(values)
+            row[metric] = {f"p{p}": _percentile(ordered, p) for p in PERCENTILES}
+            row[metric]['max'] = ordered[-1] if ordered else None
+        summary[endpoint] = row
+    return summary
+
+
+def _percentile(ordered, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def _timed_execute(execute, sql, params, many, context):
+    # Installed on every connection; counts for the request in this context, if any.
+    # Under ASGI, queries run in sync_to_async threads, which inherit the context.
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings(execute, sql, params, many, context)
+
+
+def _wrap_connection(connection, **kwargs):
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_timed_execute)
+
+
+def _timed_data(original):
+    def data(serializer):
+        timings = _current.get()
+        if timings is None:
+            return original.fget(serializer)
+        # Only the outermost .data access counts (ListSerializer goes through super().data)
+        timings._serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return original.fget(serializer)
+        finally:
+            timings._serializer_depth -= 1
+            if not timings._serializer_depth:
+                timings.serializer += time.perf_counter() - start
+    return property(data)
+
+
+_installed = False
+
+
+def _install():
+    """Hooks query and serializer timing and the exit flush, once per process."""
+    global _installed
+    if _installed:
+        return
+    from django.db.backends.signals import connection_created
+    from rest_framework.serializers import BaseSerializer
+    # Connections are per thread: hook this thread's, and every one opened later
+    for connection in connections.all():
+        _wrap_connection(connection)
+    connection_created.connect(_wrap_connection, dispatch_uid='instrumentation-execute-wrapper')
+    BaseSerializer.data = _timed_data(BaseSerializer.data)
+    atexit.register(lambda: endpoint_stats.snapshot() and endpoint_stats.flush())
+    _installed = True
+
+
+class InstrumentationMiddleware:
+    # First in MIDDLEWARE: being sync-only would push the whole async chain into threads
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'INSTRUMENTATION_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        _install()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, time.perf_counter() - start)
+
+    def _finish(self, request, response, timings, total):
+        sql_ms, serializer_ms, total_ms = (round(value * 1000, 3) for value in (timings.sql, timings.serializer, total))
+        response['Server-Timing'] = (
+            f'db;dur={sql_ms};desc="{timings.queries} queries", serialize;dur={serializer_ms}, total;dur={total_ms}'
+        )
+        endpoint_stats.record(self._endpoint(request), (total_ms, sql_ms, timings.queries, serializer_ms))
+        return response
+
+    @staticmethod
+    def _endpoint(request):
+        match = request.resolver_match
+        if match is None:
+            return f"{request.method} <unresolved>"
+        return f"{request.method} {match.view_name or match._func_path}"
+
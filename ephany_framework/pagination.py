@@ -1,4 +1,7 @@
-from rest_framework.pagination import PageNumberPagination
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -10,3 +13,107 @@ class StandardResultsSetPagination(PageNumberPagination):
 
     # Safety cap so nobody requests 1M rows in one call
     max_page_size = 200
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset() for async views (ephany_framework.asyncviews): the
+        COUNT and the page's rows go through the async ORM.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+        self.page.object_list = [obj async for obj in self.page.object_list]
+        return list(self.page)
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over the primary key: WHERE id > last ORDER BY id LIMIT n.
+    No COUNT(*) and no OFFSET, so every page costs the same however deep it is.
+    """
+    page_size = StandardResultsSetPagination.page_size
+    page_size_query_param = StandardResultsSetPagination.page_size_query_param
+    max_page_size = StandardResultsSetPagination.max_page_size
+    ordering = "id"
+
+    def get_ordering(self, request, queryset, view):
+        # Always the unique key: a view's OrderingFilter must not swap in a non-unique column
+        return (self.ordering,)
+
+    def decode_cursor(self, request):
+        # An empty ?cursor= means "start from the first row"
+        if not request.query_params.get(self.cursor_query_param):
+            return None
+        return super().decode_cursor(request)
+
+
+class OptionalCursorPagination(StandardResultsSetPagination):
+    """
+    Page-number pagination by default. Clients opt in to keyset pagination by
+    sending ?cursor= (empty for the first page, then follow the `next` links),
+    which is what sync jobs walking whole snapshots should use.
+
+    Keyset pages are always in id order, so a cursor combined with a parameter
+    that orders the results (a filter backend's `ordering_param` or
+    `rank_param`, e.g. ?ordering= or ranked ?q=) is refused with 400.
+    """
+    cursor_query_param = "cursor"
+
+    def __init__(self):
+        self.keyset = None
+
+    def check_keyset_ordering(self, request, view):
+        for backend in getattr(view, 'filter_backends', ()):
+            for attr in ('ordering_param', 'rank_param'):
+                param = getattr(backend, attr, None)
+                if param and request.query_params.get(param):
+                    raise ValidationError({self.cursor_query_param: [
+                        f"Cursor pages are in id order and cannot be combined with ?{param}=. "
+                        "Use page numbers instead."
+                    ]})
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.check_keyset_ordering(request, view)
+            self.keyset = KeysetPagination()
+            page = self.keyset.paginate_queryset(queryset, request, view)
+            self.display_page_controls = getattr(self.keyset, 'display_page_controls', False)
+            return page
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            # A keyset page is a single LIMIT query
+            return await sync_to_async(self.paginate_queryset)(queryset, request, view)
+        return await super().apaginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.keyset is not None:
+            return self.keyset.to_html()
+        return super().to_html()
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.append({
+            'name': self.cursor_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Opt in to keyset pagination (send empty for the first page). Skips the total count.',
+            'schema': {'type': 'string'},
+        })
+        return parameters
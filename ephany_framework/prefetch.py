@@ -0,0 +1,99 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+def plan_eager_loading(serializer, model):
+    """
+    Walks the readable fields of a serializer and works out which relations
+    it is going to touch while rendering.
+
+    Returns a tuple of (select_related, prefetch_related) lookups:
+    - Forward FK / one-to-one hops become select_related joins.
+    - Many-to-many / reverse FK hops (and anything below them) are prefetched.
+
+    Sources that end in a method call on a to-many manager
+    (e.g. 'instances.count') are skipped, since prefetching every related row
+    just to count it would be worse than the COUNT query itself.
+    """
+    select, prefetch = set(), set()
+    _walk_fields(serializer, model, '', False, select, prefetch)
+
+    # A prefetched path already loads everything selected beneath it
+    select = {
+        path for path in select
+        if not any(path == p or path.startswith(f"{p}__") for p in prefetch)
+    }
+    return sorted(select), sorted(prefetch)
+
+
+def _walk_fields(serializer, model, prefix, in_many, select, prefetch):
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+
+        # PrimaryKeyRelatedField only reads the local '<name>_id' column
+        if isinstance(field, serializers.RelatedField) and field.use_pk_only_optimization():
+            if len(field.source_attrs) == 1:
+                continue
+
+        hops, target_model, complete = _resolve_source(model, field.source_attrs)
+
+        # 'instances.count' style sources: drop the trailing to-many hop
+        if not complete and hops and hops[-1][1]:
+            hops = hops[:-1]
+            target_model = None
+
+        path, many = prefix, in_many
+        for attr, is_many in hops:
+            path = f"{path}__{attr}" if path else attr
+            many = many or is_many
+            (prefetch if many else select).add(path)
+
+        if not complete or target_model is None:
+            continue
+
+        # Recurse into nested serializers so their relations are loaded too
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        if isinstance(nested, serializers.Serializer):
+            _walk_fields(nested, target_model, path, many, select, prefetch)
+
+
+def _resolve_source(model, source_attrs):
+    """
+    Follows a dotted source through the model graph.
+    Returns (relation hops, model at the end of the chain, whether every
+    attribute was a relation or a concrete field).
+    """
+    hops = []
+    current = model
+    for index, attr in enumerate(source_attrs):
+        try:
+            model_field = current._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return hops, current, False
+
+        if not model_field.is_relation:
+            # A concrete column ends the chain; anything after it is not ORM
+            return hops, None, index == len(source_attrs) - 1
+
+        hops.append((attr, model_field.many_to_many or model_field.one_to_many))
+        current = model_field.related_model
+
+    return hops, current, True
+
+
+class EagerLoadingMixin:
+    """
+    ViewSet mixin that derives select_related/prefetch_related from the
+    serializer the view is about to use, so list pages run a fixed number of
+    queries regardless of page size.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        select, prefetch = plan_eager_loading(self.get_serializer(), queryset.model)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
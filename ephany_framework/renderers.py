@@ -0,0 +1,41 @@
+import csv
+import io
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline-delimited JSON. Views that stream NDJSON build their own
+    StreamingHttpResponse; this renderer makes ?format=ndjson negotiable and
+    renders error payloads as a single line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return (json.dumps(data) + '\n').encode(self.charset)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Makes ?format=csv negotiable for streaming CSV views.
+    Error payloads are rendered as a one-column 'detail' table.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        detail = data.get('detail', data) if isinstance(data, dict) else data
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['detail'])
+        writer.writerow([str(detail)])
+        return buffer.getvalue().encode(self.charset)
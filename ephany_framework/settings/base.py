@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 from corsheaders.defaults import default_headers
 
@@ -62,6 +63,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'ephany_framework.instrumentation.InstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'access.middleware.APIKeyMiddleware',
@@ -105,6 +107,48 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Local memory is per-process, which is fine for 'default' and 'responses'
+# (their keys embed change stamps). The stamps themselves must be shared by
+# every worker, so 'stamps' is file-based by default (tmpfs where available);
+# point it at Redis or Memcached when workers run on several hosts.
+SHARED_TMP_DIR = Path('/dev/shm') if Path('/dev/shm').is_dir() else Path(tempfile.gettempdir())
+STAMP_CACHE = 'stamps'
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', 'ephany-default'),
+    },
+    # Pre-rendered bodies of rarely-changing lookup endpoints. Entries are keyed
+    # by ETag (which embeds the change stamps), so a stale entry is never read;
+    # this cache need not be shared, e.g. a per-worker locmem or a file cache.
+    'responses': {
+        'BACKEND': os.environ.get('DJANGO_RESPONSE_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DJANGO_RESPONSE_CACHE_LOCATION', 'ephany-responses'),
+        'TIMEOUT': int(os.environ.get('DJANGO_RESPONSE_CACHE_TIMEOUT', '3600')),
+    },
+    # Change stamps (ephany_framework.stamps). Never locmem: a system check rejects it.
+    'stamps': {
+        'BACKEND': os.environ.get('DJANGO_STAMP_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('DJANGO_STAMP_CACHE_LOCATION', str(SHARED_TMP_DIR / 'ephany-stamps')),
+        'TIMEOUT': None,
+    },
+}
+
+
+# Request instrumentation (query counts, timings, Server-Timing headers).
+# Off by default; when off the middleware removes itself from the chain.
+# Each worker writes its per-endpoint windows to INSTRUMENTATION_DIR (default:
+# /dev/shm/ephany-stats); `manage.py request_stats` merges them.
+
+INSTRUMENTATION_ENABLED = os.getenv('INSTRUMENTATION_ENABLED', 'False').lower() == 'true'
+INSTRUMENTATION_DIR = os.getenv('INSTRUMENTATION_DIR') or None
+INSTRUMENTATION_WINDOW = int(os.getenv('INSTRUMENTATION_WINDOW', '1000'))
+INSTRUMENTATION_FLUSH_INTERVAL = float(os.getenv('INSTRUMENTATION_FLUSH_INTERVAL', '10'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -146,6 +190,30 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are hashed as they stream in, for content-addressed AssetFile storage
+FILE_UPLOAD_HANDLERS = [
+    'assets.storage.HashingMemoryFileUploadHandler',
+    'assets.storage.HashingTemporaryFileUploadHandler',
+]
+
+# Resumable chunked uploads (/api/files/uploads/): default and largest chunk, and
+# the largest file, in bytes. The whole file is preallocated when an upload starts.
+FILE_UPLOAD_CHUNK_SIZE = int(os.getenv('FILE_UPLOAD_CHUNK_SIZE', str(8 * 1024 * 1024)))
+FILE_UPLOAD_MAX_CHUNK_SIZE = int(os.getenv('FILE_UPLOAD_MAX_CHUNK_SIZE', str(64 * 1024 * 1024)))
+FILE_UPLOAD_MAX_SIZE = int(os.getenv('FILE_UPLOAD_MAX_SIZE', str(5 * 1024 * 1024 * 1024)))
+
+# How /api/files/{id}/download/ sends files (ephany_framework.downloads): '' streams
+# them from Django; 'x-accel-redirect' (nginx, internal location at
+# FILE_DOWNLOAD_ACCEL_PREFIX aliased to MEDIA_ROOT) or 'x-sendfile' hand them off
+FILE_DOWNLOAD_BACKEND = os.getenv('FILE_DOWNLOAD_BACKEND', '')
+FILE_DOWNLOAD_ACCEL_PREFIX = os.getenv('FILE_DOWNLOAD_ACCEL_PREFIX', '/protected-media/')
+
+# Thumbnails of catalog images, logos and portfolio images (ephany_framework.thumbnails)
+THUMBNAIL_WIDTHS = [int(width) for width in os.getenv('THUMBNAIL_WIDTHS', '160,480').split(',')]
+THUMBNAIL_FORMAT = os.getenv('THUMBNAIL_FORMAT', 'WEBP')  # falls back to JPEG without WebP support
+THUMBNAIL_QUALITY = int(os.getenv('THUMBNAIL_QUALITY', '80'))
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', '2'))  # 0: generate inline after commit
+
 # REST API settings
 REST_FRAMEWORK = {
     'DEFAULT_PARSER_CLASSES': [
@@ -167,8 +235,19 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": 50,
 }
 
+# Async list/retrieve for the catalog endpoints (ephany_framework.asyncviews).
+# asgi.py turns this on; leave it off under WSGI.
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "False").lower() == "true"
+
 API_KEY_AUTH_ENABLED = os.getenv("API_KEY_AUTH_ENABLED", "False").lower() == "true"
 
+# Validated keys are cached per process (LRU, TTL in seconds). Revocation is
+# immediate: saving or deleting an APIClient bumps its stamp in the shared
+# STAMP_CACHE and every worker drops its entries on the next lookup.
+# Hits and misses show up in `manage.py request_stats` when instrumentation is on.
+API_KEY_CACHE_SIZE = int(os.getenv("API_KEY_CACHE_SIZE", "1024"))
+API_KEY_CACHE_TTL = int(os.getenv("API_KEY_CACHE_TTL", "300"))
+
 # All paths starting with any of these prefixes will require an API key when enabled
 API_KEY_PROTECTED_PREFIXES = [
     "/api/",
@@ -183,4 +262,6 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_HEADERS = list(default_headers) + [
     "x-api-key",
+    "content-digest",
+    "x-chunk-sha256",
 ]
@@ -0,0 +1,111 @@
+"""
+Change stamps: tiny version markers kept in Django's cache framework.
+
+Anything that keeps a process-local copy of database state (schema registries,
+key caches, rendered responses) stores the stamp it was built against and
+compares it on read. Writers bump the stamp, which invalidates every copy in
+every worker process.
+
+That only holds if every process sees the same stamps. They live in the
+STAMP_CACHE alias ('stamps'), a file-based cache by default (one host) or
+Redis / Memcached across hosts. A per-process locmem cache would leave other
+workers serving stale copies indefinitely, so the system check below refuses
+to start with one.
+"""
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import transaction
+
+STAMP_KEY_PREFIX = 'ephany:stamp:'
+PROCESS_LOCAL_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+def _cache():
+    return caches[getattr(settings, 'STAMP_CACHE', 'stamps')]
+
+
+@checks.register(checks.Tags.caches)
+def check_stamp_cache(app_configs, **kwargs):
+    alias = getattr(settings, 'STAMP_CACHE', 'stamps')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend is None:
+        return [checks.Error(
+            f"CACHES has no {alias!r} alias for change stamps.",
+            hint="Add a cache shared by all worker processes (file-based, Redis or Memcached).",
+            id='ephany.E001',
+        )]
+    if backend in PROCESS_LOCAL_BACKENDS:
+        return [checks.Error(
+            f"The {alias!r} cache ({backend}) is private to each process, so change stamps would not "
+            "reach other workers: they would keep stale schemas and revoked API keys.",
+            hint="Use a file-based, Redis or Memcached cache (DJANGO_STAMP_CACHE_BACKEND).",
+            id='ephany.E002',
+        )]
+    return []
+
+
+def _key(name):
+    return f"{STAMP_KEY_PREFIX}{name}"
+
+
+def get_stamp(name):
+    """
+    Returns the current stamp for `name`, creating one if the cache has none
+    (first use, eviction or restart). A freshly created stamp never equals a
+    previous one, so losing the cache only ever causes extra reloads.
+    """
+    cache = _cache()
+    stamp = cache.get(_key(name))
+    if stamp is None:
+        stamp = time.time_ns()
+        if not cache.add(_key(name), stamp, timeout=None):
+            stamp = cache.get(_key(name), stamp)
+    return stamp
+
+
+async def aget_stamp(name):
+    """get_stamp() for async code, through the cache's async API."""
+    cache = _cache()
+    stamp = await cache.aget(_key(name))
+    if stamp is None:
+        stamp = time.time_ns()
+        if not await cache.aadd(_key(name), stamp, timeout=None):
+            stamp = await cache.aget(_key(name), stamp)
+    return stamp
+
+
+def bump_stamp(name):
+    """
+    Moves the stamp for `name` forward, immediately and again once the
+    surrounding transaction commits, so other processes cannot re-cache rows
+    that were read before the commit landed.
+    """
+    stamp = _bump(name)
+    transaction.on_commit(lambda: _bump(name))
+    return stamp
+
+
+def _bump(name):
+    cache = _cache()
+    stamp = max(time.time_ns(), (cache.get(_key(name)) or 0) + 1)
+    cache.set(_key(name), stamp, timeout=None)
+    return stamp
+
+
+def table_stamp(model):
+    """Change stamp for a whole table, named by the model's label (e.g. 'assets.asset')."""
+    return get_stamp(model._meta.label_lower)
+
+
+def bump_table_stamp(model):
+    return bump_stamp(model._meta.label_lower)
+
+
+def table_stamps(models):
+    """Stamps for several tables with a single cache round trip when they are warm."""
+    names = [model._meta.label_lower for model in models]
+    found = _cache().get_many([_key(name) for name in names])
+    return [found.get(_key(name)) or get_stamp(name) for name in names]
@@ -0,0 +1,50 @@
+"""
+Streamed response bodies that stay streamed under ASGI.
+
+Django's ASGI handler can only send a StreamingHttpResponse piece by piece
+when its content is an async iterator. A sync iterator is first drained with
+sync_to_async(list), so the whole export or file sits in memory before the
+first byte goes out. Under ASGI these helpers wrap the sync source instead:
+
+    streaming_content(request, generator)   each next() in the sync thread,
+                                            so server-side cursors keep
+                                            their connection
+    read_file(file)                         the file read in READ_SIZE pieces
+                                            on a worker thread
+
+Under WSGI the sync iterator is returned unchanged.
+"""
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+READ_SIZE = 64 * 1024
+
+
+def is_asgi(request):
+    # DRF's Request wraps the HttpRequest
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+async def iterate(iterable):
+    """Async iterator over a sync one."""
+    iterator = iter(iterable)
+    step = sync_to_async(next)
+    done = object()
+    try:
+        while (item := await step(iterator, done)) is not done:
+            yield item
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(close)()
+
+
+async def read_file(file, size=None):
+    read = sync_to_async(file.read, thread_sensitive=False)
+    while piece := await read(size or READ_SIZE):
+        yield piece
+
+
+def streaming_content(request, iterable):
+    """`iterable` as a StreamingHttpResponse body suited to the server the request came through."""
+    return iterate(iterable) if is_asgi(request) else iterable
@@ -0,0 +1,177 @@
+"""
+Derivative images (thumbnails) for catalog images, logos and portfolio images.
+
+For every registered image field, each stored image gets one thumbnail per
+width in THUMBNAIL_WIDTHS, saved next to the original:
+
+    assets/catalog_img_12.jpg  ->  assets/catalog_img_12.jpg.w160.webp
+                                   assets/catalog_img_12.jpg.w480.webp
+
+Thumbnails are made after the upload's transaction commits, on a small
+thread pool (THUMBNAIL_WORKERS; 0 runs them inline). Pillow releases the GIL
+while decoding and resampling, so the threads work in parallel. The request
+never waits for them. Serializers expose the URLs through ThumbnailField.
+`manage.py generate_thumbnails` rebuilds the whole library on a process
+pool.
+
+Names are the original's full name plus a suffix, so no extra columns are
+needed and originals differing only in extension do not collide. A
+re-upload gets a new name, and with it new thumbnails. Like the originals,
+replaced thumbnails are left on disk.
+"""
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+# [(model, field name)] filled in by each app's signals module
+registry = []
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def widths():
+    return tuple(getattr(settings, 'THUMBNAIL_WIDTHS', (160, 480)))
+
+
+def image_format():
+    """'WEBP' when Pillow was built with WebP support, otherwise 'JPEG'."""
+    fmt = getattr(settings, 'THUMBNAIL_FORMAT', 'WEBP').upper()
+    if fmt == 'WEBP':
+        from PIL import features
+        if not features.check('webp'):
+            return 'JPEG'
+    return fmt
+
+
+def thumbnail_name(name, width, fmt=None):
+    fmt = fmt or image_format()
+    extension = 'jpg' if fmt == 'JPEG' else fmt.lower()
+    return f"{name}.w{width}.{extension}"
+
+
+def generate(storage, name, force=False):
+    """
+    Writes the missing thumbnails of one stored image (all of them with
+    `force`). Returns the names written.
+    """
+    from PIL import ExifTags, Image, ImageOps
+
+    fmt = image_format()
+    targets = [(width, thumbnail_name(name, width, fmt)) for width in widths()]
+    if not force:
+        targets = [(width, target) for width, target in targets if not storage.exists(target)]
+    if not targets:
+        return []
+
+    with storage.open(name, 'rb') as original, Image.open(original) as image:
+        # JPEGs can be decoded straight at a fraction of their size. The draft
+        # is sized for the upright image: orientations 5-8 swap its sides.
+        largest = max(width for width, _ in targets)
+        rotated = image.getexif().get(ExifTags.Base.Orientation, 1) in (5, 6, 7, 8)
+        upright_width, upright_height = (image.height, image.width) if rotated else image.size
+        if upright_width > largest:
+            size = (largest, max(1, round(upright_height * largest / upright_width)))
+            image.draft('RGB', size[::-1] if rotated else size)
+        image = ImageOps.exif_transpose(image)
+        if fmt == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        elif image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            image = image.convert('RGBA')
+
+        written = []
+        for width, target in sorted(targets, reverse=True):
+            if image.width > width:
+                image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, fmt, quality=getattr(settings, 'THUMBNAIL_QUALITY', 80))
+            if storage.exists(target):
+                storage.delete(target)
+            written.append(storage.save(target, ContentFile(buffer.getvalue())))
+    return written
+
+
+def _run(storage, name):
+    try:
+        generate(storage, name)
+    except Exception:
+        # A broken upload must not take the worker down; the command can retry it
+        logger.exception("Thumbnail generation failed for %s", name)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'THUMBNAIL_WORKERS', 2), thread_name_prefix='thumbnails',
+            )
+        return _executor
+
+
+def schedule(field_file):
+    """Generates thumbnails for a saved image field after the transaction commits."""
+    if not field_file:
+        return
+    storage, name = field_file.storage, field_file.name
+
+    def submit():
+        if getattr(settings, 'THUMBNAIL_WORKERS', 2) > 0:
+            _get_executor().submit(_run, storage, name)
+        else:
+            _run(storage, name)
+
+    transaction.on_commit(submit)
+
+
+def register(model, field_name):
+    """Thumbnails images uploaded to model.field_name from now on (called from app signals modules)."""
+    from django.db.models.signals import post_save, pre_save
+
+    registry.append((model, field_name))
+    uid = f'thumbnails-{model._meta.label_lower}-{field_name}'
+    pending = f'_thumbnail_{field_name}_pending'
+
+    def before_save(sender, instance, raw=False, **kwargs):
+        # A new upload is still uncommitted here; FileField.pre_save stores it later in save()
+        field_file = getattr(instance, field_name)
+        setattr(instance, pending, not raw and bool(field_file) and not field_file._committed)
+
+    def after_save(sender, instance, **kwargs):
+        if getattr(instance, pending, False):
+            setattr(instance, pending, False)
+            schedule(getattr(instance, field_name))
+
+    pre_save.connect(before_save, sender=model, weak=False, dispatch_uid=f'{uid}-pre')
+    post_save.connect(after_save, sender=model, weak=False, dispatch_uid=f'{uid}-post')
+
+
+class ThumbnailField(serializers.Field):
+    """
+    Read-only {width: url} of an image field's thumbnails, or None without
+    an image. URLs are absolute when the request is available, like ImageField's.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get('request')
+        if not hasattr(self, '_format'):
+            self._format = image_format()
+        urls = {}
+        for width in widths():
+            url = value.storage.url(thumbnail_name(value.name, width, self._format))
+            urls[str(width)] = request.build_absolute_uri(url) if request is not None else url
+        return urls
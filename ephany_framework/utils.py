@@ -1,3 +1,15 @@
+import array
+
+try:
+    import numpy
+except ImportError:  # optional: only needed to convert NumPy arrays in one operation
+    numpy = None
+
+
+class UnknownUnitError(ValueError):
+    """A unit (or unit category) that UnitConverter has no factor for."""
+
+
 class UnitConverter:
     """
     Handles conversion between Base Storage Units (Metric) and User Preferred Units.
@@ -9,6 +21,19 @@ class UnitConverter:
     - Mass: Kilograms (kg)
     """
 
+    # Units used when a user has no preferences (also the storage units)
+    DEFAULT_UNITS = {'length': 'mm', 'area': 'sq_m', 'volume': 'cu_m', 'mass': 'kg'}
+
+    # Revit SpecTypeId (AssetAttribute.unit_type) -> conversion category
+    SPEC_CATEGORIES = {
+        'autodesk.spec.aec:length-2.0.0': 'length',
+        'autodesk.spec.aec:distance-1.0.0': 'length',
+        'autodesk.spec.aec:area-2.0.0': 'area',
+        'autodesk.spec.aec:volume-2.0.0': 'volume',
+        'autodesk.spec.aec:mass-2.0.0': 'mass',
+        'autodesk.spec.aec:massDensity-2.0.0': 'mass',
+    }
+
     # Conversion factors TO Base Unit (e.g., 1 foot * 304.8 = 304.8 mm)
     TO_BASE = {
         'length': {
@@ -32,6 +57,45 @@ class UnitConverter:
         }
     }
 
+    @classmethod
+    def category_for_spec(cls, spec_type):
+        """Returns 'length', 'area', ... for a unit_type, or None if it is not convertible."""
+        return cls.SPEC_CATEGORIES.get(spec_type)
+
+    @classmethod
+    def units_for_user(cls, user):
+        """
+        Returns the preferred {category: unit} map for a user,
+        falling back to storage units for anonymous users or missing settings.
+        """
+        if user is not None and user.is_authenticated and hasattr(user, 'settings'):
+            s = user.settings
+            return {
+                'length': s.length_unit,
+                'area': s.area_unit,
+                'volume': s.volume_unit,
+                'mass': s.mass_unit
+            }
+        return dict(cls.DEFAULT_UNITS)
+
+    @classmethod
+    def factor(cls, category, unit):
+        """
+        Multiplier from `unit` to the storage unit of `category`.
+        Raises UnknownUnitError (a ValueError) naming the accepted units.
+        """
+        units = cls.TO_BASE.get(category)
+        if units is None:
+            raise UnknownUnitError(
+                f"Unknown unit category '{category}'. Expected one of: {', '.join(cls.TO_BASE)}."
+            )
+        try:
+            return units[unit]
+        except KeyError:
+            raise UnknownUnitError(
+                f"Unknown {category} unit '{unit}'. Expected one of: {', '.join(units)}."
+            ) from None
+
     @classmethod
     def to_storage(cls, value, user_unit, category):
         """
@@ -40,13 +104,7 @@ class UnitConverter:
         """
         if value is None:
             return None
-            
-        try:
-            factor = cls.TO_BASE[category][user_unit]
-            return float(value) * factor
-        except KeyError:
-            # Fallback if unit not found
-            return value
+        return float(value) * cls.factor(category, user_unit)
 
     @classmethod
     def from_storage(cls, value, user_unit, category):
@@ -56,10 +114,95 @@ class UnitConverter:
         """
         if value is None:
             return None
-            
-        try:
-            factor = cls.TO_BASE[category][user_unit]
-            return float(value) / factor
-        except KeyError:
-            # Fallback
-            return value
+        return float(value) / cls.factor(category, user_unit)
+
+    @classmethod
+    def to_storage_many(cls, values, user_unit, category):
+        """
+        Column version of to_storage: one factor lookup for the whole column.
+        Accepts a sequence (None entries stay None), an array.array, or a
+        NumPy array (object arrays holding None come back as masked arrays).
+        """
+        return scale_column(values, cls.factor(category, user_unit), divide=False)
+
+    @classmethod
+    def from_storage_many(cls, values, user_unit, category):
+        """Column version of from_storage; see to_storage_many."""
+        return scale_column(values, cls.factor(category, user_unit), divide=True)
+
+
+def scale_column(values, factor, divide=False):
+    """
+    Multiplies (or divides) a whole column by `factor`, keeping its container:
+    NumPy arrays are converted in one vectorized operation, array.array
+    becomes array('d'), and any other iterable becomes a list in which None
+    is masked out (passed through) rather than converted.
+    """
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        if values.dtype == object:
+            mask = numpy.equal(values, None)
+            data = numpy.where(mask, 0.0, values).astype(float)
+            values = numpy.ma.masked_array(data, mask=mask)
+        return values / factor if divide else values * factor
+
+    if isinstance(values, array.array):
+        if divide:
+            return array.array('d', [value / factor for value in values])
+        return array.array('d', [value * factor for value in values])
+
+    if divide:
+        return [None if value is None else float(value) / factor for value in values]
+    return [None if value is None else float(value) * factor for value in values]
+
+
+class ConversionPlan:
+    """
+    Storage -> display conversions compiled once per request.
+
+    Resolves the user's units and the attribute schema into plain divisors up
+    front, so rendering a row is one division per dimensional value instead of
+    category/unit lookups (and a try/except) per value:
+
+        plan = ConversionPlan(user_units, {attribute name: unit_type})
+        plan.dimension(1000.0)          # overall_* fields, in the user's length unit
+        plan.custom_fields({...})       # converted copy of a custom_fields dict
+
+    `attribute_units` may also be a zero-argument callable; it is then only
+    resolved when the first custom_fields dict is converted.
+    Unknown units raise UnknownUnitError, like from_storage.
+    """
+
+    def __init__(self, user_units, attribute_units):
+        self.user_units = user_units
+        self.length_factor = UnitConverter.factor('length', user_units['length'])
+        self._attribute_units = attribute_units
+        self._field_factors = None
+
+    @property
+    def field_factors(self):
+        """{attribute name: divisor} for every attribute displayed in converted units."""
+        if self._field_factors is None:
+            attribute_units = self._attribute_units
+            if callable(attribute_units):
+                attribute_units = attribute_units()
+
+            self._field_factors = {}
+            for name, spec_type in attribute_units.items():
+                category = UnitConverter.category_for_spec(spec_type)
+                if category:
+                    self._field_factors[name] = UnitConverter.factor(category, self.user_units[category])
+        return self._field_factors
+
+    def dimension(self, value):
+        if value is None:
+            return None
+        return float(value) / self.length_factor
+
+    def custom_fields(self, custom_fields):
+        converted = dict(custom_fields)
+        factors = self.field_factors
+        for name, value in custom_fields.items():
+            factor = factors.get(name)
+            if factor is not None and isinstance(value, (int, float)):
+                converted[name] = float(value) / factor
+        return converted
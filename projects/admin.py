@@ -8,15 +8,21 @@ class AssetInstanceInline(admin.TabularInline):
 
 @admin.register(Project)
 class ProjectAdmin(admin.ModelAdmin):
-    list_display = ('job_id', 'name', 'created_at', 'updated_at')
+    list_display = ('job_id', 'name', 'snapshot_count', 'created_at', 'updated_at')
     search_fields = ('job_id', 'name')
 
 @admin.register(Snapshot)
 class SnapshotAdmin(admin.ModelAdmin):
-    list_display = ('name', 'project', 'date', 'created_at')
+    list_display = ('name', 'project', 'date', 'instance_count', 'created_at')
     list_filter = ('project', 'date')
     search_fields = ('name', 'project__name')
     inlines = [AssetInstanceInline]
+    readonly_fields = ('instance_count',)
+
+    def save_related(self, request, form, formsets, change):
+        # Inline edits bypass the API's counter bookkeeping; recount also moves updated_at
+        super().save_related(request, form, formsets, change)
+        Snapshot.recount([form.instance.pk])
 
 @admin.register(AssetInstance)
 class AssetInstanceAdmin(admin.ModelAdmin):
@@ -24,6 +30,21 @@ class AssetInstanceAdmin(admin.ModelAdmin):
     list_filter = ('snapshot__project', 'snapshot')
     search_fields = ('asset__name', 'instance_id', 'snapshot__name', 'snapshot__project__name')
 
+    def save_model(self, request, obj, form, change):
+        previous_snapshot = form.initial.get('snapshot')
+        super().save_model(request, obj, form, change)
+        if change and previous_snapshot != obj.snapshot_id:
+            Snapshot.recount([previous_snapshot, obj.snapshot_id])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        Snapshot.recount([obj.snapshot_id])
+
+    def delete_queryset(self, request, queryset):
+        snapshot_ids = set(queryset.values_list('snapshot_id', flat=True))
+        super().delete_queryset(request, queryset)
+        Snapshot.recount(snapshot_ids)
+
     # Helper method to show project name in the list view
     def get_project_name(self, obj):
         return obj.snapshot.project.name
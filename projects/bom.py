@@ -0,0 +1,134 @@
+"""
+Bills of materials for snapshots.
+
+Two GROUP BY queries do the heavy lifting, whatever the instance count:
+  1. instance quantity per asset in the snapshot (covered by the
+     (snapshot, asset) index on AssetInstance),
+  2. lowest / average VendorProduct.cost and longest lead_time_days per asset.
+The category and manufacturer rollups are then folded from the per-asset
+rows, which number in the distinct assets rather than the instances.
+
+Results are cached under the snapshot's updated_at plus the change stamps of
+the catalog tables they read, so a BOM is recomputed only when its snapshot,
+prices or asset classification change.
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Avg, Count, Max, Min
+
+from assets.models import Asset, AssetCategory, Manufacturer, VendorProduct
+from ephany_framework.stamps import table_stamp
+from .models import AssetInstance
+
+BOM_CACHE_TIMEOUT = 60 * 60
+STAMPED_MODELS = (Asset, AssetCategory, Manufacturer, VendorProduct)
+
+CENT = Decimal('0.01')
+
+
+def snapshot_bom(snapshot):
+    """Cached BOM of one Snapshot object."""
+    stamps = ':'.join(str(table_stamp(model)) for model in STAMPED_MODELS)
+    key = f"ephany:bom:{snapshot.pk}:{snapshot.updated_at.isoformat()}:{stamps}"
+    result = cache.get(key)
+    if result is None:
+        result = compute_bom(snapshot)
+        cache.set(key, result, BOM_CACHE_TIMEOUT)
+    return result
+
+
+def compute_bom(snapshot):
+    quantities = dict(
+        AssetInstance.objects.filter(snapshot_id=snapshot.pk)
+        .values('asset_id')
+        .annotate(quantity=Count('id'))
+        .order_by()
+        .values_list('asset_id', 'quantity')
+    )
+
+    assets = (
+        Asset.objects.filter(pk__in=AssetInstance.objects.filter(snapshot_id=snapshot.pk).values('asset_id'))
+        .values(
+            'id', 'type_id', 'name', 'model',
+            'category_id', 'category__name', 'manufacturer_id', 'manufacturer__name',
+        )
+        .annotate(
+            unit_cost_min=Min('vendor_products__cost'),
+            unit_cost_avg=Avg('vendor_products__cost'),
+            lead_time_days_max=Max('vendor_products__lead_time_days'),
+        )
+        .order_by('type_id')
+    )
+
+    by_asset = []
+    by_category, by_manufacturer = {}, {}
+    totals = _rollup(None, None)
+
+    for row in assets:
+        quantity = quantities.get(row['id'], 0)
+        unit_min, unit_avg = _money(row['unit_cost_min']), _money(row['unit_cost_avg'])
+        line = {
+            'asset': row['id'],
+            'type_id': row['type_id'],
+            'name': row['name'],
+            'model': row['model'],
+            'category': row['category_id'],
+            'manufacturer': row['manufacturer_id'],
+            'quantity': quantity,
+            'unit_cost_min': unit_min,
+            'unit_cost_avg': unit_avg,
+            'extended_cost_min': _extend(unit_min, quantity),
+            'extended_cost_avg': _extend(unit_avg, quantity),
+            'lead_time_days_max': row['lead_time_days_max'],
+        }
+        by_asset.append(line)
+
+        category = by_category.setdefault(row['category_id'], _rollup('category', row['category_id'], row['category__name']))
+        manufacturer = by_manufacturer.setdefault(
+            row['manufacturer_id'], _rollup('manufacturer', row['manufacturer_id'], row['manufacturer__name']),
+        )
+        for rollup in (category, manufacturer, totals):
+            _add(rollup, line)
+
+    return {
+        'snapshot': snapshot.pk,
+        'project': snapshot.project_id,
+        'totals': totals,
+        'by_asset': by_asset,
+        'by_category': sorted(by_category.values(), key=lambda r: (r['name'] is None, r['name'] or '')),
+        'by_manufacturer': sorted(by_manufacturer.values(), key=lambda r: r['name']),
+    }
+
+
+def _rollup(kind, pk, name=None):
+    rollup = {kind: pk, 'name': name} if kind else {}
+    rollup.update({
+        'quantity': 0,
+        'unpriced_quantity': 0,
+        'extended_cost_min': Decimal('0.00'),
+        'extended_cost_avg': Decimal('0.00'),
+        'lead_time_days_max': None,
+    })
+    return rollup
+
+
+def _add(rollup, line):
+    rollup['quantity'] += line['quantity']
+    if line['extended_cost_min'] is None:
+        rollup['unpriced_quantity'] += line['quantity']
+    else:
+        rollup['extended_cost_min'] += line['extended_cost_min']
+        rollup['extended_cost_avg'] += line['extended_cost_avg']
+    if line['lead_time_days_max'] is not None:
+        rollup['lead_time_days_max'] = max(rollup['lead_time_days_max'] or 0, line['lead_time_days_max'])
+
+
+def _money(value):
+    if value is None:
+        return None
+    return Decimal(value).quantize(CENT)
+
+
+def _extend(unit_cost, quantity):
+    return None if unit_cost is None else (unit_cost * quantity).quantize(CENT)
@@ -0,0 +1,66 @@
+"""
+Snapshot cloning.
+
+A new phase usually starts as a copy of the previous snapshot. Copying is two
+set-based INSERT ... SELECT statements inside one transaction, so no instance
+is ever loaded into Python:
+
+  1. the instances themselves, in source id order,
+  2. their custom field index rows, pairing source and copy by position
+     (ROW_NUMBER over id on both sides) since the copies are inserted in
+     source id order.
+"""
+import datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import AssetInstance, InstanceFieldValue, Snapshot
+
+
+def clone_snapshot(source, name=None, date=None, project=None):
+    """Copies `source` and all of its instances into a new snapshot, which is returned."""
+    with transaction.atomic():
+        target = Snapshot.objects.create(
+            project=project or source.project,
+            name=name or f"{source.name} (copy)",
+            date=date or datetime.date.today(),
+        )
+        with connection.cursor() as cursor:
+            copied = _copy_instances(cursor, source.pk, target.pk)
+            _copy_field_index(cursor, source.pk, target.pk)
+        Snapshot.touch([target.pk], instance_delta=copied)
+        target.instance_count = copied
+    return target
+
+
+def _copy_instances(cursor, source_id, target_id):
+    qn = connection.ops.quote_name
+    table = qn(AssetInstance._meta.db_table)
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+
+    cursor.execute(
+        f"INSERT INTO {table} (snapshot_id, asset_id, instance_id, location, custom_fields, created_at, updated_at) "
+        f"SELECT %s, asset_id, instance_id, location, custom_fields, %s, %s "
+        f"FROM {table} WHERE snapshot_id = %s ORDER BY id",
+        [target_id, now, now, source_id],
+    )
+    return cursor.rowcount
+
+
+def _copy_field_index(cursor, source_id, target_id):
+    qn = connection.ops.quote_name
+    instances = qn(AssetInstance._meta.db_table)
+    values = qn(InstanceFieldValue._meta.db_table)
+    owner = qn(InstanceFieldValue._meta.get_field('instance').column)
+
+    cursor.execute(
+        f"INSERT INTO {values} ({owner}, name, value_num, value_text) "
+        f"SELECT dst.id, v.name, v.value_num, v.value_text "
+        f"FROM {values} v "
+        f"JOIN (SELECT id, ROW_NUMBER() OVER (ORDER BY id) AS position FROM {instances} WHERE snapshot_id = %s) src "
+        f"ON src.id = v.{owner} "
+        f"JOIN (SELECT id, ROW_NUMBER() OVER (ORDER BY id) AS position FROM {instances} WHERE snapshot_id = %s) dst "
+        f"ON dst.position = src.position",
+        [source_id, target_id],
+    )
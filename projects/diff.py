@@ -0,0 +1,146 @@
+"""
+Snapshot diffs.
+
+Instances are matched across two snapshots by instance_id when they have
+one, otherwise by (asset, location). Each snapshot is read as two streams
+sorted on those keys by the database, and the streams are merged in a single
+pass, so only one key group per side is held in memory at a time.
+Unmatched instances are added or removed. Matched ones are modified when their
+asset, location or any custom field differs.
+
+When several instances share a key (five untagged chairs in one room), they
+are paired in id order and the surplus is reported as added or removed.
+
+Results are cached under both snapshots' updated_at stamps. Instance writes
+touch their snapshot (see Snapshot.touch), so a changed snapshot gets a new
+cache key rather than a stale entry.
+"""
+from itertools import groupby
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce, Collate
+
+from .models import AssetInstance
+
+DIFF_CHUNK_SIZE = 2000
+DIFF_CACHE_TIMEOUT = 60 * 60
+
+COLUMNS = ['id', 'instance_id', 'asset_id', 'location', 'custom_fields']
+
+# Collations that compare like Python strings (by code point), so the
+# database sort order and the merge agree.
+BINARY_COLLATIONS = {'postgresql': 'C', 'mysql': 'utf8mb4_bin'}
+
+
+def diff_snapshots(old, new):
+    """Cached diff of two Snapshot objects."""
+    key = f"ephany:snapshot-diff:{old.pk}:{old.updated_at.isoformat()}:{new.pk}:{new.updated_at.isoformat()}"
+    result = cache.get(key)
+    if result is None:
+        result = compute_diff(old.pk, new.pk)
+        cache.set(key, result, DIFF_CACHE_TIMEOUT)
+    return result
+
+
+def compute_diff(old_id, new_id):
+    result = {
+        'from': old_id,
+        'to': new_id,
+        'summary': {'added': 0, 'removed': 0, 'modified': 0, 'unchanged': 0},
+        'added': [],
+        'removed': [],
+        'modified': [],
+    }
+
+    for keyed in (True, False):
+        merged = _merge(_groups(old_id, keyed), _groups(new_id, keyed))
+        for old_rows, new_rows in merged:
+            for before, after in zip(old_rows, new_rows):
+                changes = _changes(before, after)
+                if changes:
+                    result['modified'].append({
+                        'from': before['id'],
+                        'to': after['id'],
+                        'instance_id': after['instance_id'],
+                        'changes': changes,
+                    })
+                else:
+                    result['summary']['unchanged'] += 1
+            result['removed'].extend(old_rows[len(new_rows):])
+            result['added'].extend(new_rows[len(old_rows):])
+
+    for section in ('added', 'removed', 'modified'):
+        result['summary'][section] = len(result[section])
+    return result
+
+
+def _binary(expression):
+    collation = BINARY_COLLATIONS.get(connection.vendor)
+    return Collate(expression, collation) if collation else expression
+
+
+def _groups(snapshot_id, keyed):
+    """
+    Yields (key, [row, ...]) in key order for one snapshot: instances with an
+    instance_id when `keyed`, else the untagged ones keyed by (asset, location).
+    """
+    untagged = Q(instance_id__isnull=True) | Q(instance_id='')
+    queryset = AssetInstance.objects.filter(snapshot_id=snapshot_id)
+
+    if keyed:
+        queryset = queryset.exclude(untagged).order_by(_binary(F('instance_id')), 'id')
+        key = lambda row: row['instance_id']  # noqa: E731
+    else:
+        queryset = queryset.filter(untagged).annotate(
+            location_key=Coalesce('location', Value('')),
+        ).order_by('asset_id', _binary(F('location_key')), 'id')
+        key = lambda row: (row['asset_id'], row['location'] or '')  # noqa: E731
+
+    rows = (
+        dict(zip(COLUMNS, values))
+        for values in queryset.values_list(*COLUMNS).iterator(chunk_size=DIFF_CHUNK_SIZE)
+    )
+    for group_key, group in groupby(rows, key=key):
+        yield group_key, [_public(row) for row in group]
+
+
+def _merge(old_groups, new_groups):
+    """Sorted merge of two (key, rows) streams into (old rows, new rows) pairs."""
+    old = next(old_groups, None)
+    new = next(new_groups, None)
+    while old is not None or new is not None:
+        if new is None or (old is not None and old[0] < new[0]):
+            yield old[1], []
+            old = next(old_groups, None)
+        elif old is None or new[0] < old[0]:
+            yield [], new[1]
+            new = next(new_groups, None)
+        else:
+            yield old[1], new[1]
+            old = next(old_groups, None)
+            new = next(new_groups, None)
+
+
+def _public(row):
+    row['asset'] = row.pop('asset_id')
+    row['custom_fields'] = row['custom_fields'] or {}
+    return row
+
+
+def _changes(before, after):
+    changes = {}
+    if before['asset'] != after['asset']:
+        changes['asset'] = {'from': before['asset'], 'to': after['asset']}
+    if (before['location'] or '') != (after['location'] or ''):
+        changes['location'] = {'from': before['location'], 'to': after['location']}
+
+    custom_fields = {}
+    old_fields, new_fields = before['custom_fields'], after['custom_fields']
+    for name in sorted(old_fields.keys() | new_fields.keys()):
+        if old_fields.get(name) != new_fields.get(name) or (name in old_fields) != (name in new_fields):
+            custom_fields[name] = {'from': old_fields.get(name), 'to': new_fields.get(name)}
+    if custom_fields:
+        changes['custom_fields'] = custom_fields
+    return changes
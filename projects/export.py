@@ -0,0 +1,110 @@
+"""
+Streaming snapshot exports.
+
+Both formats are generators over server-side `iterator(chunk_size=...)`
+querysets, so memory stays flat however many instances a snapshot holds.
+
+NDJSON stream layout, one JSON object per line:
+    {"type": "snapshot", ...}        once
+    {"type": "asset", "id": ...}     once per distinct asset used by the snapshot
+    {"type": "instance", "asset": <asset id>, ...}   once per instance
+
+CSV is one flat row per instance with the asset referenced by id (plus its
+type_id and name for readability).
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from assets.models import Asset
+from assets.serializers import AssetSerializer
+from ephany_framework.prefetch import plan_eager_loading
+from .models import AssetInstance
+
+EXPORT_CHUNK_SIZE = 2000
+
+INSTANCE_FIELDS = ['id', 'instance_id', 'asset', 'location', 'custom_fields', 'created_at', 'updated_at']
+
+CSV_COLUMNS = [
+    'id', 'instance_id', 'asset', 'asset_type_id', 'asset_name',
+    'location', 'custom_fields', 'created_at', 'updated_at',
+]
+
+
+def snapshot_instances(snapshot):
+    return AssetInstance.objects.filter(snapshot=snapshot).order_by('id')
+
+
+def snapshot_assets(snapshot, serializer):
+    """Distinct assets used by the snapshot, eager-loaded for `serializer`."""
+    queryset = Asset.objects.filter(
+        pk__in=AssetInstance.objects.filter(snapshot=snapshot).values('asset_id')
+    ).order_by('id')
+    select, prefetch = plan_eager_loading(serializer, Asset)
+    return queryset.select_related(*select).prefetch_related(*prefetch)
+
+
+def stream_ndjson(snapshot, context, chunk_size=EXPORT_CHUNK_SIZE):
+    encoder = DjangoJSONEncoder()
+
+    yield encoder.encode({
+        'type': 'snapshot',
+        'id': snapshot.id,
+        'project': snapshot.project_id,
+        'name': snapshot.name,
+        'date': snapshot.date,
+    }) + '\n'
+
+    serializer = AssetSerializer(context=context)
+    lines = []
+    for asset in snapshot_assets(snapshot, serializer).iterator(chunk_size=chunk_size):
+        lines.append(encoder.encode({'type': 'asset', **serializer.to_representation(asset)}))
+        if len(lines) >= chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+
+    rows = snapshot_instances(snapshot).values_list(*_instance_columns()).iterator(chunk_size=chunk_size)
+    for row in rows:
+        lines.append(encoder.encode({'type': 'instance', **dict(zip(INSTANCE_FIELDS, row))}))
+        if len(lines) >= chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+class _Echo:
+    """File-like object whose write() hands the line straight back (for csv.writer)."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(snapshot, chunk_size=EXPORT_CHUNK_SIZE):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+
+    rows = snapshot_instances(snapshot).values_list(
+        'id', 'instance_id', 'asset_id', 'asset__type_id', 'asset__name',
+        'location', 'custom_fields', 'created_at', 'updated_at',
+    ).iterator(chunk_size=chunk_size)
+
+    lines = []
+    for row in rows:
+        row = list(row)
+        row[6] = json.dumps(row[6] or {}, cls=DjangoJSONEncoder)
+        row[7] = row[7].isoformat()
+        row[8] = row[8].isoformat()
+        lines.append(writer.writerow(row))
+        if len(lines) >= chunk_size:
+            yield ''.join(lines)
+            lines = []
+
+    if lines:
+        yield ''.join(lines)
+
+
+def _instance_columns():
+    return ['asset_id' if name == 'asset' else name for name in INSTANCE_FIELDS]
@@ -0,0 +1,118 @@
+"""
+Bulk import of asset instances into snapshots (see assets.importers for the
+batching model). Instances carry no natural key, so every valid row is created.
+
+Accepted keys: snapshot (id; may be defaulted for the whole file), asset (id)
+or asset_type_id, instance_id, location, custom_fields, and cf.<name> columns
+(typed like the asset importer's when <name> is a defined attribute, else text).
+Custom fields are not unit-converted: instance fields are free-form.
+"""
+from collections import Counter
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+
+from assets import fieldindex
+from assets.importers import BulkImporter, error_messages, _as_int
+from assets.models import Asset
+from assets.schema import attribute_registry
+from .models import AssetInstance, InstanceFieldValue, Snapshot
+
+
+class InstanceImporter(BulkImporter):
+
+    def __init__(self, snapshot=None, batch_size=None):
+        super().__init__(batch_size)
+        self.snapshot = snapshot
+
+    def process_batch(self, batch):
+        lookups = self._resolve_relations([record for _, record in batch])
+        schema = attribute_registry.get()
+
+        prepared = []
+        for number, record in batch:
+            try:
+                prepared.append((number, self._build(record, lookups, schema)))
+            except ValidationError as exc:
+                self.fail(number, error_messages(exc))
+
+        self._write(prepared)
+
+    def _resolve_relations(self, records):
+        snapshot_ids, asset_ids, type_ids = set(), set(), set()
+        for record in records:
+            if 'snapshot' in record:
+                snapshot_ids.add(_as_int(record['snapshot']))
+            if 'asset' in record:
+                asset_ids.add(_as_int(record['asset']))
+            elif 'asset_type_id' in record:
+                type_ids.add(str(record['asset_type_id']))
+
+        return {
+            'snapshots': set(Snapshot.objects.filter(pk__in=snapshot_ids).values_list('pk', flat=True)),
+            'asset_ids': set(Asset.objects.filter(pk__in=asset_ids).values_list('pk', flat=True)),
+            'type_ids': dict(Asset.objects.filter(type_id__in=type_ids).values_list('type_id', 'pk')),
+        }
+
+    def _build(self, record, lookups, schema):
+        errors = {}
+
+        if 'snapshot' in record:
+            snapshot_id = _as_int(record['snapshot'])
+            if snapshot_id not in lookups['snapshots']:
+                errors['snapshot'] = [f"Unknown snapshot '{record['snapshot']}'."]
+        elif self.snapshot is not None:
+            snapshot_id = self.snapshot.pk
+        else:
+            snapshot_id = None
+            errors['snapshot'] = ["This field is required."]
+
+        if 'asset' in record:
+            asset_id = _as_int(record['asset'])
+            if asset_id not in lookups['asset_ids']:
+                errors['asset'] = [f"Unknown asset '{record['asset']}'."]
+        elif 'asset_type_id' in record:
+            asset_id = lookups['type_ids'].get(str(record['asset_type_id']))
+            if asset_id is None:
+                errors['asset_type_id'] = [f"Unknown asset type_id '{record['asset_type_id']}'."]
+        else:
+            errors['asset'] = ["Give asset (id) or asset_type_id."]
+
+        custom_fields = {}
+        try:
+            custom_fields = self._custom_fields(record, schema)
+        except ValidationError as exc:
+            errors['custom_fields'] = exc.messages
+
+        if errors:
+            raise ValidationError(errors)
+
+        instance = AssetInstance(
+            snapshot_id=snapshot_id,
+            asset_id=asset_id,
+            instance_id=record.get('instance_id'),
+            location=record.get('location'),
+            custom_fields=custom_fields,
+        )
+        # Lengths, which bulk_create would not check; relations were resolved above
+        instance.clean_fields(exclude=['snapshot', 'asset', 'custom_fields'])
+        return instance
+
+    def _write(self, prepared):
+        if not prepared:
+            return
+
+        instances = [instance for _, instance in prepared]
+        try:
+            with transaction.atomic():
+                # Primary keys come back on PostgreSQL and SQLite 3.35+
+                AssetInstance.objects.bulk_create(instances)
+                fieldindex.reindex_custom_fields(InstanceFieldValue, 'instance', instances)
+                for snapshot_id, created in Counter(instance.snapshot_id for instance in instances).items():
+                    Snapshot.touch([snapshot_id], instance_delta=created)
+        except DatabaseError as exc:
+            for number, _ in prepared:
+                self.fail(number, [f"Database error: {exc}"])
+            return
+
+        self.report['created'] += len(instances)
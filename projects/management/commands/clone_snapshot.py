@@ -0,0 +1,31 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from projects.clone import clone_snapshot
+from projects.models import Project, Snapshot
+
+
+class Command(BaseCommand):
+    help = 'Copies a snapshot and all of its instances into a new snapshot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('snapshot_id', type=int)
+        parser.add_argument('--name', help="Name of the new snapshot (default: '<source name> (copy)')")
+        parser.add_argument('--date', type=datetime.date.fromisoformat, help="YYYY-MM-DD (default: today)")
+        parser.add_argument('--project', help="job_id of the project to clone into (default: the source's)")
+
+    def handle(self, *args, **options):
+        source = Snapshot.objects.filter(pk=options['snapshot_id']).first()
+        if source is None:
+            raise CommandError(f"Snapshot {options['snapshot_id']} does not exist")
+
+        project = None
+        if options['project']:
+            project = Project.objects.filter(job_id=options['project']).first()
+            if project is None:
+                raise CommandError(f"Project '{options['project']}' does not exist")
+
+        target = clone_snapshot(source, name=options['name'], date=options['date'], project=project)
+        self.stdout.write(self.style.SUCCESS(
+            f"Cloned snapshot {source.pk} into {target.pk} ({target.instances.count()} instances)"
+        ))
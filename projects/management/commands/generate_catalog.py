@@ -0,0 +1,179 @@
+import datetime
+import random
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from assets import fieldindex, search
+from assets.models import (
+    Asset, AssetAttribute, AssetCategory, AssetFieldValue, Manufacturer, Vendor, VendorProduct,
+)
+from ephany_framework.stamps import bump_table_stamp
+from projects.models import AssetInstance, InstanceFieldValue, Project, Snapshot
+
+Unit = AssetAttribute.UnitType
+Type = AssetAttribute.AttributeType
+Scope = AssetAttribute.AttributeScope
+
+# name -> (scope, data type, unit, value factory); values are in storage units
+ATTRIBUTES = {
+    'shelf_width': (Scope.TYPE, Type.FLOAT, Unit.LENGTH, lambda rng: round(rng.uniform(300, 1800), 1)),
+    'clearance': (Scope.TYPE, Type.FLOAT, Unit.DISTANCE, lambda rng: round(rng.uniform(10, 900), 1)),
+    'footprint': (Scope.TYPE, Type.FLOAT, Unit.AREA, lambda rng: round(rng.uniform(0.1, 4), 3)),
+    'capacity': (Scope.TYPE, Type.FLOAT, Unit.VOLUME, lambda rng: round(rng.uniform(0.01, 2), 3)),
+    'weight': (Scope.TYPE, Type.FLOAT, Unit.MASS, lambda rng: round(rng.uniform(1, 400), 1)),
+    'voltage': (Scope.TYPE, Type.INTEGER, Unit.NONE, lambda rng: rng.choice([120, 208, 240, 277, 480])),
+    'finish': (Scope.TYPE, Type.STRING, Unit.NONE, lambda rng: rng.choice(FINISHES)),
+    'ada_compliant': (Scope.TYPE, Type.BOOLEAN, Unit.NONE, lambda rng: rng.random() < 0.3),
+    'serial_number': (Scope.INSTANCE, Type.STRING, Unit.NONE, lambda rng: f"SN{rng.randint(10**7, 10**8 - 1)}"),
+    'install_height': (Scope.INSTANCE, Type.FLOAT, Unit.LENGTH, lambda rng: round(rng.uniform(0, 2400), 1)),
+}
+
+ADJECTIVES = ['stainless', 'compact', 'commercial', 'undercounter', 'reach-in', 'insulated',
+              'portable', 'heavy-duty', 'ventilated', 'modular', 'ada', 'wall-mount']
+NOUNS = ['sink', 'refrigerator', 'freezer', 'oven', 'fryer', 'griddle', 'shelving',
+         'dishwasher', 'ice machine', 'hood', 'mixer', 'faucet', 'cabinet', 'range']
+FINISHES = ['chrome', 'satin', 'black', 'white', 'brushed nickel', 'galvanized']
+ROOMS = ['Kitchen', 'Bar', 'Prep', 'Dish', 'Storage', 'Front of House', 'Restroom', 'Office']
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates a synthetic catalog and projects for benchmarking. '
+        'Adds to whatever SYN- data already exists, so sizes can be grown step by step.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--manufacturers', type=int, default=50)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--attributes', type=int, default=len(ATTRIBUTES),
+                            help=f"How many of the {len(ATTRIBUTES)} sample attributes to define and fill")
+        parser.add_argument('--vendors', type=int, default=10)
+        parser.add_argument('--assets', type=int, default=1000)
+        parser.add_argument('--offers', type=int, default=2, help="Vendor offers per asset")
+        parser.add_argument('--projects', type=int, default=5)
+        parser.add_argument('--snapshots', type=int, default=3, help="Snapshots per project")
+        parser.add_argument('--instances', type=int, default=1000, help="Instances per snapshot")
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        with transaction.atomic():
+            attributes = self._attributes(options['attributes'])
+            manufacturers = self._named(Manufacturer, 'SYN Maker', options['manufacturers'])
+            categories = self._named(AssetCategory, 'SYN Category', options['categories'])
+            vendors = self._named(Vendor, 'SYN Vendor', options['vendors'])
+            assets, offers = self._assets(
+                options['assets'], manufacturers, categories, vendors, options['offers'], attributes,
+            )
+            instances = self._projects(options['projects'], options['snapshots'], options['instances'], attributes)
+
+        # bulk_create skips the post_save hooks that keep these in sync
+        search.rebuild_index()
+        for model in (Manufacturer, AssetCategory, Vendor, Asset, VendorProduct):
+            bump_table_stamp(model)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {len(manufacturers)} manufacturers, {len(categories)} categories, {len(vendors)} vendors, "
+            f"{assets} assets, {offers} vendor offers and {instances} instances"
+        ))
+
+    def _bulk_create(self, model, objects):
+        return model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def _attributes(self, count):
+        attributes = {}
+        for name in list(ATTRIBUTES)[:count]:
+            scope, data_type, unit_type, factory = ATTRIBUTES[name]
+            AssetAttribute.objects.get_or_create(
+                name=name, defaults={'scope': scope, 'data_type': data_type, 'unit_type': unit_type},
+            )
+            attributes[name] = (scope, factory)
+        return attributes
+
+    def _named(self, model, prefix, count):
+        start = model.objects.filter(name__startswith=prefix).count()
+        return self._bulk_create(model, [model(name=f"{prefix} {i:04d}") for i in range(start, start + count)])
+
+    def _custom_fields(self, attributes, scope):
+        return {name: factory(self.rng) for name, (field_scope, factory) in attributes.items() if field_scope == scope}
+
+    def _assets(self, count, manufacturers, categories, vendors, offers_per_asset, attributes):
+        """Creates assets batch by batch, each with its index rows and vendor offers. Returns the counts."""
+        manufacturers = manufacturers or list(Manufacturer.objects.all()[:100])
+        categories = categories or list(AssetCategory.objects.all()[:100])
+        vendors = vendors or list(Vendor.objects.all()[:100])
+        start = Asset.objects.filter(type_id__startswith='SYN-').count()
+
+        created = offers = 0
+        for offset in range(start, start + count, self.batch_size):
+            batch = []
+            for i in range(offset, min(offset + self.batch_size, start + count)):
+                noun = self.rng.choice(NOUNS)
+                batch.append(Asset(
+                    type_id=f"SYN-{i:07d}",
+                    manufacturer=self.rng.choice(manufacturers),
+                    category=self.rng.choice(categories) if categories else None,
+                    model=f"{noun[:3].upper()}-{self.rng.randint(100, 99999)}",
+                    name=f"{self.rng.choice(ADJECTIVES).title()} {noun.title()}",
+                    description=f"{self.rng.choice(ADJECTIVES)} {noun} with {self.rng.choice(FINISHES)} finish",
+                    overall_height=round(self.rng.uniform(300, 2400), 1),
+                    overall_width=round(self.rng.uniform(300, 2400), 1),
+                    overall_depth=round(self.rng.uniform(300, 1200), 1),
+                    custom_fields=self._custom_fields(attributes, Scope.TYPE),
+                ))
+            batch = self._bulk_create(Asset, batch)
+            fieldindex.reindex_custom_fields(AssetFieldValue, 'asset', batch, batch_size=self.batch_size)
+            offers += len(self._bulk_create(VendorProduct, [
+                VendorProduct(
+                    asset=asset,
+                    vendor=vendor,
+                    sku=f"{vendor.pk}-{asset.type_id}",
+                    cost=Decimal(self.rng.randint(5_000, 2_500_000)) / 100,
+                    lead_time_days=self.rng.randint(1, 120),
+                )
+                for asset in batch
+                for vendor in self.rng.sample(vendors, min(offers_per_asset, len(vendors)))
+            ]))
+            created += len(batch)
+        return created, offers
+
+    def _projects(self, projects, snapshots, instances, attributes):
+        asset_ids = list(Asset.objects.filter(type_id__startswith='SYN-').values_list('pk', flat=True))
+        if not asset_ids:
+            return 0
+
+        start = Project.objects.filter(job_id__startswith='SYN-').count()
+        created_projects = self._bulk_create(Project, [
+            Project(job_id=f"SYN-{i:05d}", name=f"Synthetic Project {i}") for i in range(start, start + projects)
+        ])
+        today = datetime.date.today()
+        created_snapshots = self._bulk_create(Snapshot, [
+            Snapshot(project=project, name=f"Phase {n + 1}", date=today + datetime.timedelta(days=30 * n))
+            for project in created_projects
+            for n in range(snapshots)
+        ])
+
+        total = 0
+        for snapshot in created_snapshots:
+            for offset in range(0, instances, self.batch_size):
+                batch = self._bulk_create(AssetInstance, [
+                    AssetInstance(
+                        snapshot=snapshot,
+                        asset_id=self.rng.choice(asset_ids),
+                        instance_id=f"{snapshot.pk}-{i:06d}",
+                        location=f"{self.rng.choice(ROOMS)} {self.rng.randint(100, 499)}",
+                        custom_fields=self._custom_fields(attributes, Scope.INSTANCE),
+                    )
+                    for i in range(offset, min(offset + self.batch_size, instances))
+                ])
+                fieldindex.reindex_custom_fields(InstanceFieldValue, 'instance', batch, batch_size=self.batch_size)
+                total += len(batch)
+
+        Snapshot.recount([snapshot.pk for snapshot in created_snapshots])
+        Project.recount([project.pk for project in created_projects])
+        return total
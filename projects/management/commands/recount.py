@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from projects.models import Project, Snapshot
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the denormalized snapshot instance counts and project snapshot counts'
+
+    def handle(self, *args, **kwargs):
+        snapshots = Snapshot.recount()
+        projects = Project.recount()
+        self.stdout.write(self.style.SUCCESS(f"Recounted {snapshots} snapshots and {projects} projects"))
@@ -0,0 +1,52 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from ephany_framework.instrumentation import (
+    METRICS, STATS_FILE_PREFIX, load_extra_stats, load_stats, stats_dir, summarize,
+)
+
+
+class Command(BaseCommand):
+    help = "Per-endpoint latency and query percentiles recorded by InstrumentationMiddleware (all workers)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help="Stats directory (default: INSTRUMENTATION_DIR)")
+        parser.add_argument('--json', action='store_true', help="Print the full summary as JSON")
+        parser.add_argument('--sort', choices=METRICS, default='total_ms', help="Order endpoints by this metric's p95")
+        parser.add_argument('--reset', action='store_true', help="Delete the workers' stats files after dumping")
+
+    def handle(self, *args, **options):
+        directory = Path(options['dir']) if options['dir'] else stats_dir()
+        summary = summarize(load_stats(directory))
+        ordered = sorted(summary.items(), key=lambda item: item[1][options['sort']]['p95'] or 0, reverse=True)
+        extra = load_extra_stats(directory)
+
+        if options['json']:
+            self.stdout.write(json.dumps({'endpoints': dict(ordered), 'extra': extra}, indent=2))
+        elif not ordered:
+            self.stdout.write(self.style.WARNING(f"No stats in {directory}. Is INSTRUMENTATION_ENABLED on?"))
+        else:
+            self.stdout.write(
+                f"{'endpoint':<48} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+                f"{'sql p95':>9} {'q p95':>6} {'ser p95':>9}"
+            )
+            for endpoint, row in ordered:
+                self.stdout.write(
+                    f"{endpoint:<48} {row['count']:>7} {row['total_ms']['p50']:>9.1f} {row['total_ms']['p95']:>9.1f} "
+                    f"{row['total_ms']['p99']:>9.1f} {row['sql_ms']['p95']:>9.1f} {row['queries']['p95']:>6} "
+                    f"{row['serializer_ms']['p95']:>9.1f}"
+                )
+
+        keys = extra.get('api_key_cache')
+        if keys and not options['json']:
+            lookups = keys.get('hits', 0) + keys.get('misses', 0)
+            hit_rate = keys.get('hits', 0) / lookups if lookups else 0.0
+            self.stdout.write(
+                f"\nAPI key cache ({keys['workers']} workers): {keys.get('hits', 0)} hits, {keys.get('misses', 0)} misses "
+                f"({hit_rate:.1%}), {keys.get('evictions', 0)} evictions, {keys.get('size', 0)} entries"
+            )
+
+        if options['reset']:
+            for path in directory.glob(f"{STATS_FILE_PREFIX}*.json"):
+                path.unlink(missing_ok=True)
@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-18 01:33
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counts(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    Snapshot = apps.get_model('projects', 'Snapshot')
+    AssetInstance = apps.get_model('projects', 'AssetInstance')
+
+    instances = AssetInstance.objects.filter(snapshot=OuterRef('pk')).values('snapshot').annotate(n=Count('pk')).values('n')
+    Snapshot.objects.update(instance_count=Coalesce(Subquery(instances), Value(0)))
+
+    snapshots = Snapshot.objects.filter(project=OuterRef('pk')).values('project').annotate(n=Count('pk')).values('n')
+    Project.objects.update(snapshot_count=Coalesce(Subquery(snapshots), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0010_instancefieldvalue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='snapshot_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='snapshot',
+            name='instance_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 01:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0021_assetfieldvalue'),
+        ('projects', '0011_project_snapshot_count_snapshot_instance_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assetinstance',
+            index=models.Index(fields=['snapshot', 'asset'], name='instance_snapshot_asset_idx'),
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
-from assets.models import Asset
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from assets.models import Asset, CustomFieldValue
 
 
 class Project(models.Model):
@@ -8,21 +11,64 @@ class Project(models.Model):
     description = models.TextField(blank=True, null=True)
     portfolio_img = models.ImageField(upload_to='project_thumbnails/', blank=True, null=True)
 
+    # Denormalized; kept in sync by projects.signals, repaired by `manage.py recount`
+    snapshot_count = models.PositiveIntegerField(default=0, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.job_id} - {self.name}"
 
+    @classmethod
+    def adjust_snapshot_count(cls, pk, delta):
+        cls.objects.filter(pk=pk).update(snapshot_count=F('snapshot_count') + delta)
+
+    @classmethod
+    def recount(cls, pks=None):
+        """Recomputes snapshot_count in one UPDATE (all projects when pks is None)."""
+        queryset = cls.objects.all() if pks is None else cls.objects.filter(pk__in=pks)
+        counts = Snapshot.objects.filter(project=OuterRef('pk')).values('project').annotate(n=Count('pk')).values('n')
+        return queryset.update(snapshot_count=Coalesce(Subquery(counts), Value(0)))
+
 
 class Snapshot(models.Model):
     project = models.ForeignKey(Project, related_name='snapshots', on_delete=models.CASCADE)
     name = models.CharField(max_length=200)
     date = models.DateField()
 
+    # Denormalized; kept in sync with touch(), repaired by `manage.py recount`
+    instance_count = models.PositiveIntegerField(default=0, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    @classmethod
+    def touch(cls, pks, instance_delta=0):
+        """
+        Marks snapshots as changed after writes to their instances, so caches
+        keyed on updated_at (snapshot diffs) are not served stale, and moves
+        their instance_count by `instance_delta` in the same UPDATE.
+        """
+        pks = {pk for pk in pks if pk is not None}
+        if not pks:
+            return
+        changes = {'updated_at': timezone.now()}
+        if instance_delta:
+            changes['instance_count'] = F('instance_count') + instance_delta
+        cls.objects.filter(pk__in=pks).update(**changes)
+
+    @classmethod
+    def recount(cls, pks=None):
+        """
+        Recomputes instance_count in one UPDATE (all snapshots when pks is None).
+        Callers recount after instance writes that bypassed touch(), so this
+        moves updated_at as well.
+        """
+        queryset = cls.objects.all() if pks is None else cls.objects.filter(pk__in=pks)
+        counts = AssetInstance.objects.filter(snapshot=OuterRef('pk')).values('snapshot').annotate(n=Count('pk')).values('n')
+        return queryset.update(instance_count=Coalesce(Subquery(counts), Value(0)), updated_at=timezone.now())
+
 
 class AssetInstance(models.Model):
     """
@@ -40,5 +86,25 @@ class AssetInstance(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Covers per-snapshot GROUP BY asset (bills of materials)
+            models.Index(fields=['snapshot', 'asset'], name='instance_snapshot_asset_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.asset.name} in {self.snapshot.project.name}"
\ No newline at end of file
+        return f"{self.asset.name} in {self.snapshot.project.name}"
+
+
+class InstanceFieldValue(CustomFieldValue):
+    instance = models.ForeignKey(AssetInstance, on_delete=models.CASCADE, related_name='field_values')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name', 'value_num'], name='instance_cf_num_idx'),
+            models.Index(fields=['name', 'value_text'], name='instance_cf_text_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.instance_id}.{self.name}"
+
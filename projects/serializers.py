@@ -1,11 +1,17 @@
 from rest_framework import serializers
 from .models import Project, Snapshot, AssetInstance
 from assets.serializers import AssetSerializer
+from ephany_framework.fieldsets import SparseFieldsetMixin
+from ephany_framework.thumbnails import ThumbnailField
 
 
-class AssetInstanceSerializer(serializers.ModelSerializer):
+class AssetInstanceSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     asset_details = AssetSerializer(source='asset', read_only=True)
 
+    expandable_fields = {
+        'snapshot_details': lambda: SnapshotSerializer(source='snapshot', read_only=True),
+    }
+
     class Meta:
         model = AssetInstance
         fields = [
@@ -20,18 +26,33 @@ class AssetInstanceSerializer(serializers.ModelSerializer):
             'updated_at'
         ]
 
+    def get_fields(self):
+        fields = super().get_fields()
+        # Sideloaded responses carry each asset once, in a separate map
+        if self.context.get('sideload_assets'):
+            fields.pop('asset_details', None)
+        return fields
 
-class SnapshotSerializer(serializers.ModelSerializer):
-    instance_count = serializers.IntegerField(source='instances.count', read_only=True)
 
+class SnapshotSerializer(serializers.ModelSerializer):
     class Meta:
         model = Snapshot
         fields = ['id', 'project', 'name', 'date', 'instance_count', 'created_at']
 
 
+class SnapshotCloneSerializer(serializers.Serializer):
+    """Optional overrides for the new snapshot; defaults come from the source."""
+    name = serializers.CharField(max_length=200, required=False)
+    date = serializers.DateField(required=False)
+    project = serializers.PrimaryKeyRelatedField(queryset=Project.objects.all(), required=False)
+
+
 class ProjectSerializer(serializers.ModelSerializer):
-    snapshot_count = serializers.IntegerField(source='snapshots.count', read_only=True)
+    portfolio_img_thumb = ThumbnailField(source='portfolio_img')
 
     class Meta:
         model = Project
-        fields = ['id', 'job_id', 'name', 'description', 'portfolio_img', 'snapshot_count', 'created_at']
\ No newline at end of file
+        fields = [
+            'id', 'job_id', 'name', 'description', 'portfolio_img', 'portfolio_img_thumb', 'snapshot_count',
+            'created_at',
+        ]
\ No newline at end of file
@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from assets import fieldindex
+from ephany_framework import thumbnails
+from .models import AssetInstance, InstanceFieldValue, Project, Snapshot
+
+
+# Mirror instance custom_fields into the indexed side table
+@receiver(post_save, sender=AssetInstance)
+def index_instance_custom_fields(sender, instance, **kwargs):
+    fieldindex.reindex_custom_fields(InstanceFieldValue, 'instance', [instance])
+
+
+# Instance writes change their snapshot (updated_at, instance_count). Deletes and
+# moves between snapshots are handled where they happen (AssetInstanceViewSet,
+# the admin), with one UPDATE per request. A post_delete receiver would run one
+# UPDATE per instance whenever a snapshot or project is deleted. Those cascades
+# fetch their instances anyway because InstanceFieldValue cascades from them,
+# but the per-row UPDATEs are not worth it for rows that are going away. Other
+# deletes (QuerySet.delete() from scripts or the shell) leave instance_count and
+# updated_at stale until `manage.py recount`.
+@receiver(post_save, sender=AssetInstance)
+def touch_instance_snapshot(sender, instance, created, **kwargs):
+    Snapshot.touch([instance.snapshot_id], instance_delta=1 if created else 0)
+
+
+# Snapshots are few per project, so these can run per row
+@receiver(post_save, sender=Snapshot)
+def count_created_snapshot(sender, instance, created, **kwargs):
+    if created:
+        Project.adjust_snapshot_count(instance.project_id, 1)
+
+
+@receiver(post_delete, sender=Snapshot)
+def count_deleted_snapshot(sender, instance, **kwargs):
+    Project.adjust_snapshot_count(instance.project_id, -1)
+
+
+thumbnails.register(Project, 'portfolio_img')
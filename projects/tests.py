@@ -1,3 +1,507 @@
-from django.test import TestCase
+import asyncio
+import csv
+import datetime
+import io
+import json
+import tempfile
+import warnings
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib import admin
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from access.cache import api_key_cache
+from assets.models import Asset, Manufacturer
+from ephany_framework.instrumentation import InstrumentationMiddleware, endpoint_stats
+from . import export
+from .models import AssetInstance, Project, Snapshot
+
+
+class ProjectsTestCase(TestCase):
+    """Shared fixture: one project, one snapshot, one asset."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.project = Project.objects.create(job_id='NYC-001', name='Flagship')
+        cls.snapshot = Snapshot.objects.create(project=cls.project, name='Phase 1', date=datetime.date(2026, 1, 1))
+        cls.manufacturer = Manufacturer.objects.create(name='Elkay')
+        cls.asset = Asset.objects.create(type_id='SINK-1', manufacturer=cls.manufacturer, model='LR', name='Sink')
+
+    def setUp(self):
+        self.api = APIClient()
+
+
+class InstanceCustomFieldFilterTests(ProjectsTestCase):
+
+    def test_free_form_instance_fields_are_filterable(self):
+        tagged = AssetInstance.objects.create(
+            snapshot=self.snapshot, asset=self.asset, custom_fields={'tag_number': 12, 'system': 'Plumbing'},
+        )
+        AssetInstance.objects.create(snapshot=self.snapshot, asset=self.asset, custom_fields={'tag_number': 40})
+
+        response = self.api.get('/api/instances/', {'cf.tag_number__lt': '20'})
+        self.assertEqual([row['id'] for row in response.data['results']], [tagged.id])
+
+        response = self.api.get('/api/instances/', {'cf.system': 'plumbing', 'cf.tag_number': '12'})
+        self.assertEqual([row['id'] for row in response.data['results']], [tagged.id])
+
+
+class KeysetPaginationTests(ProjectsTestCase):
+
+    def test_cursor_walk_visits_every_row_without_counting(self):
+        created = [
+            AssetInstance.objects.create(snapshot=self.snapshot, asset=self.asset, location=f"Room {i}").id
+            for i in range(5)
+        ]
+
+        seen = []
+        url, params = '/api/instances/', {'snapshot': self.snapshot.id, 'cursor': '', 'page_size': 2}
+        while url:
+            with self.assertNumQueries(3):
+                # snapshot filter lookup + page SELECT + files prefetch; no COUNT
+                response = self.api.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            seen.extend(row['id'] for row in response.data['results'])
+            url, params = response.data['next'], None
+
+        self.assertEqual(seen, created)
+
+    def test_cursor_refuses_client_ordering(self):
+        response = self.api.get('/api/projects/', {'cursor': '', 'ordering': 'name'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cursor', response.data)
+        self.assertEqual(self.api.get('/api/projects/', {'cursor': '', 'ordering': ''}).status_code, 200)
+
+    def test_page_number_mode_is_the_default(self):
+        response = self.api.get('/api/projects/')
+        self.assertEqual(response.data['count'], 1)
+
+
+class SnapshotExportTests(ProjectsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        other = Asset.objects.create(type_id='ICE-1', manufacturer=self.manufacturer, model='KM', name='Ice')
+        for i, asset in enumerate([self.asset, other, self.asset]):
+            AssetInstance.objects.create(
+                snapshot=self.snapshot, asset=asset, instance_id=f"TAG-{i}", custom_fields={'tag': i},
+            )
+
+    def _body(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_emits_each_asset_once(self):
+        response = self.api.get(f'/api/snapshots/{self.snapshot.id}/export/', {'format': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        records = [json.loads(line) for line in self._body(response).splitlines()]
+
+        self.assertEqual([r['type'] for r in records], ['snapshot', 'asset', 'asset', 'instance', 'instance', 'instance'])
+        self.assertEqual(records[1]['type_id'], 'SINK-1')
+        self.assertEqual([r['asset'] for r in records[3:]], [self.asset.id, records[2]['id'], self.asset.id])
+        self.assertEqual(records[5]['custom_fields'], {'tag': 2})
+
+    def test_csv_has_one_row_per_instance(self):
+        response = self.api.get(f'/api/snapshots/{self.snapshot.id}/export/', {'format': 'csv'})
+        rows = list(csv.DictReader(io.StringIO(self._body(response))))
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['asset_type_id'], 'SINK-1')
+        self.assertEqual(json.loads(rows[2]['custom_fields']), {'tag': 2})
+
+    async def test_asgi_sends_pieces_as_they_are_produced(self):
+        produced = []
+
+        def stream_ndjson(snapshot, context):
+            for piece in original(snapshot, context, chunk_size=1):
+                produced.append(piece)
+                yield piece
+
+        original = export.stream_ndjson
+        sent = []
+
+        async def send(message):
+            if message['type'] == 'http.response.body' and message.get('body'):
+                sent.append((message['body'], len(produced)))
+
+        request = {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def receive():
+            nonlocal request
+            if request is None:
+                await asyncio.Event().wait()  # No disconnect
+            message, request = request, None
+            return message
+
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': f'/api/snapshots/{self.snapshot.id}/export/',
+            'query_string': b'format=ndjson', 'headers': [(b'host', b'testserver')],
+        }
+        with mock.patch.object(export, 'stream_ndjson', stream_ndjson), warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            await ASGIHandler()(scope, receive, send)
+
+        self.assertGreater(len(sent), 1)
+        # The first piece went out before the rest was produced, not after draining the generator
+        self.assertEqual(sent[0][1], 1)
+        self.assertEqual(len(b''.join(body for body, _ in sent).splitlines()), 6)
+        self.assertFalse([w for w in caught if 'synchronous iterators' in str(w.message)])
+
+    def test_unknown_snapshot_is_404(self):
+        response = self.api.get('/api/snapshots/999/export/', {'format': 'ndjson'})
+        self.assertEqual(response.status_code, 404)
+
+
+class InstanceBulkImportTests(ProjectsTestCase):
+
+    def test_csv_rows_default_to_the_snapshot_param(self):
+        body = (
+            "asset_type_id,instance_id,location,custom_fields\n"
+            'SINK-1,TAG-1,Kitchen,"{""tag_number"": 7}"\n'
+            "NOPE-9,TAG-2,Bar,\n"
+            "SINK-1,TAG-3,Bar,\n"
+        )
+        response = self.api.generic(
+            'POST', f'/api/instances/bulk/?snapshot={self.snapshot.id}', body, content_type='text/csv',
+        )
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 1))
+        self.assertEqual(response.data['errors'][0]['row'], 2)
+        self.assertEqual(
+            sorted(self.snapshot.instances.values_list('instance_id', flat=True)), ['TAG-1', 'TAG-3'],
+        )
+
+        response = self.api.get('/api/instances/', {'cf.tag_number': '7'})
+        self.assertEqual([row['instance_id'] for row in response.data['results']], ['TAG-1'])
+
+    def test_custom_field_columns_and_column_limits(self):
+        body = (
+            "asset_type_id,instance_id,location,custom_fields,cf.system,cf.tag_number\n"
+            'SINK-1,TAG-1,Kitchen,"{""tag_number"": 7}",Plumbing,8\n'
+            f"SINK-1,TAG-2,{'x' * 201},,,\n"
+        )
+        response = self.api.generic(
+            'POST', f'/api/instances/bulk/?snapshot={self.snapshot.id}', body, content_type='text/csv',
+        )
+
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 1))
+        self.assertEqual(response.data['errors'][0]['row'], 2)
+        self.assertIn('location', response.data['errors'][0]['errors'])
+        # Not a defined attribute, so the cell stays text; the column wins over the JSON object
+        self.assertEqual(
+            self.snapshot.instances.get().custom_fields, {'tag_number': '8', 'system': 'Plumbing'},
+        )
+
+    def test_rows_without_a_snapshot_are_rejected(self):
+        body = json.dumps({'asset': self.asset.id, 'instance_id': 'TAG-1'})
+        response = self.api.generic('POST', '/api/instances/bulk/', body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.data['failed'], 1)
+        self.assertIn('snapshot', response.data['errors'][0]['errors'])
+
+
+class SnapshotCloneTests(ProjectsTestCase):
+
+    def test_clone_copies_instances_and_their_field_index(self):
+        AssetInstance.objects.create(snapshot=self.snapshot, asset=self.asset, instance_id='TAG-1', custom_fields={'tag_number': 1})
+        AssetInstance.objects.create(snapshot=self.snapshot, asset=self.asset, instance_id='TAG-2', custom_fields={'tag_number': 2})
+
+        with self.assertNumQueries(9):
+            # snapshot + project lookups, savepoint, INSERT snapshot, project count,
+            # INSERT..SELECT x2, instance count, release; independent of the number of instances
+            response = self.api.post(
+                f'/api/snapshots/{self.snapshot.id}/clone/', {'name': 'Phase 2', 'date': '2026-06-01'}, format='json',
+            )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['instance_count'], 2)
+
+        clone = Snapshot.objects.get(pk=response.data['id'])
+        self.assertEqual((clone.project, clone.name, str(clone.date)), (self.project, 'Phase 2', '2026-06-01'))
+        self.assertEqual(
+            list(clone.instances.order_by('id').values_list('instance_id', 'custom_fields')),
+            [('TAG-1', {'tag_number': 1}), ('TAG-2', {'tag_number': 2})],
+        )
+
+        response = self.api.get('/api/instances/', {'snapshot': clone.id, 'cf.tag_number': '2'})
+        self.assertEqual([row['instance_id'] for row in response.data['results']], ['TAG-2'])
+
+
+class SnapshotDiffTests(ProjectsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other_asset = Asset.objects.create(type_id='ICE-1', manufacturer=self.manufacturer, model='KM', name='Ice')
+        self.phase2 = Snapshot.objects.create(project=self.project, name='Phase 2', date=datetime.date(2026, 6, 1))
+
+        def place(snapshot, asset, instance_id=None, location=None, **custom_fields):
+            return AssetInstance.objects.create(
+                snapshot=snapshot, asset=asset, instance_id=instance_id, location=location, custom_fields=custom_fields,
+            )
+
+        self.kept = place(self.snapshot, self.asset, 'TAG-1', 'Kitchen', finish='chrome')
+        place(self.phase2, self.asset, 'TAG-1', 'Kitchen', finish='chrome')
+        self.changed = place(self.snapshot, self.asset, 'TAG-2', 'Bar', finish='chrome', gpm=1.5)
+        self.changed_to = place(self.phase2, self.other_asset, 'TAG-2', 'Bar', finish='satin', gpm=1.5, ada=True)
+        self.gone = place(self.snapshot, self.asset, 'TAG-3')
+        # untagged instances pair up on (asset, location)
+        place(self.snapshot, self.asset, location='Lobby')
+        place(self.phase2, self.asset, location='Lobby')
+        self.extra = place(self.phase2, self.asset, location='Lobby')
+
+    def _diff(self, a, b):
+        response = self.api.get(f'/api/snapshots/{a.id}/diff/{b.id}/')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_reports_added_removed_and_field_changes(self):
+        diff = self._diff(self.snapshot, self.phase2)
+
+        self.assertEqual(diff['summary'], {'added': 1, 'removed': 1, 'modified': 1, 'unchanged': 2})
+        self.assertEqual([row['id'] for row in diff['added']], [self.extra.id])
+        self.assertEqual([row['id'] for row in diff['removed']], [self.gone.id])
+        self.assertEqual(diff['modified'][0]['from'], self.changed.id)
+        self.assertEqual(diff['modified'][0]['changes'], {
+            'asset': {'from': self.asset.id, 'to': self.other_asset.id},
+            'custom_fields': {'ada': {'from': None, 'to': True}, 'finish': {'from': 'chrome', 'to': 'satin'}},
+        })
+
+    def test_admin_deletes_invalidate_cached_diffs(self):
+        self.assertEqual(self._diff(self.snapshot, self.phase2)['summary']['added'], 1)
+        admin.site._registry[AssetInstance].delete_model(None, self.extra)
+
+        self.assertEqual(self._diff(self.snapshot, self.phase2)['summary']['added'], 0)
+        self.phase2.refresh_from_db()
+        self.assertEqual(self.phase2.instance_count, 3)
+
+    def test_unknown_or_malformed_other_snapshot_is_404(self):
+        self.assertEqual(self.api.get(f'/api/snapshots/{self.snapshot.id}/diff/999999/').status_code, 404)
+        self.assertEqual(self.api.get(f'/api/snapshots/{self.snapshot.id}/diff/latest/').status_code, 404)
+
+    def test_cached_result_follows_instance_writes(self):
+        self.assertEqual(self._diff(self.snapshot, self.phase2)['summary']['added'], 1)
+
+        with self.assertNumQueries(2):
+            # both snapshot lookups; the diff itself comes from the cache
+            self._diff(self.snapshot, self.phase2)
+
+        response = self.api.delete(f'/api/instances/{self.extra.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self._diff(self.snapshot, self.phase2)['summary']['added'], 0)
+
+        self.api.patch(f'/api/instances/{self.kept.id}/', {'location': 'Pantry'}, format='json')
+        self.assertEqual(self._diff(self.snapshot, self.phase2)['summary']['modified'], 2)
+
+
+class DenormalizedCountTests(ProjectsTestCase):
+
+    def _get(self, url):
+        return self.api.get(url).data
+
+    def test_project_list_query_count_is_constant(self):
+        for i in range(5):
+            project = Project.objects.create(job_id=f'JOB-{i}', name=f'Job {i}')
+            Snapshot.objects.create(project=project, name='Phase 1', date=datetime.date(2026, 1, 1))
+
+        with self.assertNumQueries(2):
+            # COUNT + page; no per-row counts
+            response = self.api.get('/api/projects/')
+        self.assertEqual({row['snapshot_count'] for row in response.data['results']}, {1})
+
+    def test_counters_follow_writes_and_recount_repairs_drift(self):
+        response = self.api.post('/api/instances/', {'snapshot': self.snapshot.id, 'asset': self.asset.id}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.api.post('/api/instances/', {'snapshot': self.snapshot.id, 'asset': self.asset.id}, format='json')
+        self.assertEqual(self._get(f'/api/snapshots/{self.snapshot.id}/')['instance_count'], 2)
+
+        self.api.delete(f'/api/instances/{response.data["id"]}/')
+        self.assertEqual(self._get(f'/api/snapshots/{self.snapshot.id}/')['instance_count'], 1)
+        self.assertEqual(self._get(f'/api/projects/{self.project.id}/')['snapshot_count'], 1)
+
+        # queryset deletes skip the bookkeeping; recount repairs it
+        AssetInstance.objects.all().delete()
+        call_command('recount', stdout=io.StringIO())
+        self.assertEqual(self._get(f'/api/snapshots/{self.snapshot.id}/')['instance_count'], 0)
+
+
+class BillOfMaterialsTests(ProjectsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from assets.models import AssetCategory, Vendor, VendorProduct
+
+        sinks = AssetCategory.objects.create(name='Sinks')
+        self.asset.category = sinks
+        self.asset.save()
+        self.ice = Asset.objects.create(type_id='ICE-1', manufacturer=self.manufacturer, model='KM', name='Ice')
+
+        acme, bolt = Vendor.objects.create(name='Acme'), Vendor.objects.create(name='Bolt')
+        VendorProduct.objects.create(asset=self.asset, vendor=acme, cost='100.00', lead_time_days=10)
+        self.bolt_sink = VendorProduct.objects.create(asset=self.asset, vendor=bolt, cost='150.00', lead_time_days=30)
+
+        for asset in (self.asset, self.asset, self.asset, self.ice):
+            AssetInstance.objects.create(snapshot=self.snapshot, asset=asset)
+
+    def test_rollups_extend_vendor_costs(self):
+        response = self.api.get(f'/api/snapshots/{self.snapshot.id}/bom/')
+        self.assertEqual(response.status_code, 200)
+        bom = response.json()
+
+        sink = bom['by_asset'][1]
+        self.assertEqual((sink['type_id'], sink['quantity']), ('SINK-1', 3))
+        self.assertEqual((sink['extended_cost_min'], sink['extended_cost_avg'], sink['lead_time_days_max']), (300.0, 375.0, 30))
+        self.assertIsNone(bom['by_asset'][0]['extended_cost_min'])
+
+        self.assertEqual(bom['totals']['quantity'], 4)
+        self.assertEqual(bom['totals']['unpriced_quantity'], 1)
+        self.assertEqual([(r['name'], r['quantity']) for r in bom['by_category']], [('Sinks', 3), (None, 1)])
+        self.assertEqual([(r['name'], r['quantity']) for r in bom['by_manufacturer']], [('Elkay', 4)])
+
+        self.assertEqual(self.api.get(f'/api/projects/{self.project.id}/bom/').json()['snapshot'], self.snapshot.id)
+
+    def test_cache_follows_instances_and_prices(self):
+        url = f'/api/snapshots/{self.snapshot.id}/bom/'
+        self.api.get(url)
+        with self.assertNumQueries(1):
+            # snapshot lookup only
+            self.api.get(url)
+
+        self.bolt_sink.cost = '50.00'
+        self.bolt_sink.save()
+        self.assertEqual(self.api.get(url).json()['by_asset'][1]['unit_cost_min'], 50.0)
+
+        AssetInstance.objects.create(snapshot=self.snapshot, asset=self.ice)
+        self.assertEqual(self.api.get(url).json()['totals']['quantity'], 5)
+
+
+class GenerateCatalogTests(TestCase):
+
+    def test_generates_indexed_catalog_and_counted_snapshots(self):
+        options = {'assets': 30, 'instances': 7, 'projects': 2, 'snapshots': 2, 'batch_size': 8, 'stdout': io.StringIO()}
+        call_command('generate_catalog', **options)
+        call_command('generate_catalog', **{**options, 'assets': 5, 'projects': 0})
+
+        self.assertEqual(Asset.objects.filter(type_id__startswith='SYN-').count(), 35)
+        self.assertEqual(AssetInstance.objects.count(), 28)
+        self.assertEqual(set(Snapshot.objects.values_list('instance_count', flat=True)), {7})
+        self.assertEqual(set(Project.objects.values_list('snapshot_count', flat=True)), {2})
+
+        # Bulk-created rows are filterable through the custom field index
+        response = APIClient().get('/api/assets/', {'cf.voltage': 208})
+        expected = sum(1 for fields in Asset.objects.values_list('custom_fields', flat=True) if fields['voltage'] == 208)
+        self.assertEqual(response.data['count'], expected)
+
+
+class InstanceFieldsetTests(ProjectsTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = Asset.objects.create(type_id='SINK-2', manufacturer=cls.manufacturer, model='LR2', name='Sink 2')
+        AssetInstance.objects.bulk_create(
+            [AssetInstance(snapshot=cls.snapshot, asset=cls.asset, location=f'Room {i}') for i in range(6)]
+            + [AssetInstance(snapshot=cls.snapshot, asset=cls.other)]
+        )
+
+    def test_sparse_fields_skip_the_nested_asset(self):
+        with self.assertNumQueries(2):
+            # COUNT + page, without the asset joins and files prefetch
+            response = self.api.get('/api/instances/', {'fields': 'id,asset,location'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'asset', 'location'})
+
+    def test_dotted_fields_trim_nested_serializers(self):
+        response = self.api.get('/api/instances/', {'fields': 'id,asset_details.name,asset_details.custom_fields'})
+        self.assertEqual(response.data['results'][0]['asset_details'], {'name': 'Sink', 'custom_fields': {}})
+
+    def test_sideload_renders_each_asset_once(self):
+        response = self.api.get('/api/instances/', {'sideload': 'assets', 'expand': 'snapshot_details'})
+        self.assertEqual(response.data['count'], 7)
+
+        row = response.data['results'][0]
+        self.assertNotIn('asset_details', row)
+        self.assertEqual(row['snapshot_details']['name'], 'Phase 1')
+        self.assertEqual(sorted(response.data['assets']), sorted([str(self.asset.pk), str(self.other.pk)]))
+        self.assertEqual(response.data['assets'][str(self.asset.pk)]['manufacturer']['name'], 'Elkay')
+
+        response = self.api.get('/api/instances/', {'sideload': 'assets', 'fields': 'id,asset,assets.type_id'})
+        self.assertEqual(response.data['assets'][str(self.other.pk)], {'type_id': 'SINK-2'})
+
+    def test_writes_ignore_fieldsets(self):
+        response = self.api.post(
+            '/api/instances/?fields=id', {'snapshot': self.snapshot.pk, 'asset': self.asset.pk}, format='json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('asset_details', response.data)
+
+
+class InstrumentationMiddlewareTests(TestCase):
+
+    def setUp(self):
+        endpoint_stats.reset()
+        self.addCleanup(endpoint_stats.reset)
+
+    def test_disabled_by_default(self):
+        response = self.client.get('/api/categories/')
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(INSTRUMENTATION_ENABLED=True)
+    def test_server_timing_and_per_endpoint_stats(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/categories/')
+        self.assertRegex(
+            response['Server-Timing'],
+            rf'^db;dur=[\d.]+;desc="{len(queries)} queries", serialize;dur=[\d.]+, total;dur=[\d.]+$',
+        )
+
+        self.client.get('/api/categories/')
+        stats = endpoint_stats.snapshot()
+        self.assertEqual(list(stats), ['GET assetcategory-list'])
+        self.assertEqual(stats['GET assetcategory-list']['count'], 2)
+
+    @override_settings(INSTRUMENTATION_ENABLED=True)
+    async def test_runs_natively_in_async_chains(self):
+        def query():
+            # A thread of its own, like a server's sync_to_async executor, with a new connection
+            try:
+                return Project.objects.count()
+            finally:
+                connection.close()
+
+        async def view(request):
+            return HttpResponse(await sync_to_async(query, thread_sensitive=False)())
+
+        middleware = InstrumentationMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = await middleware(AsyncRequestFactory().get('/api/projects/'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="1 queries", serialize;dur=0\.0, total;dur=[\d.]+$')
+        self.assertEqual(endpoint_stats.snapshot()['GET <unresolved>']['count'], 1)
+
+    @override_settings(INSTRUMENTATION_ENABLED=True)
+    def test_request_stats_merges_worker_files(self):
+        with tempfile.TemporaryDirectory() as directory, self.settings(INSTRUMENTATION_DIR=directory):
+            for _ in range(3):
+                self.client.get('/api/categories/')
+            endpoint_stats.flush()
+            # A second worker's file
+            other = json.loads(next(Path(directory).glob('requests-*.json')).read_text())
+            Path(directory, 'requests-0.json').write_text(json.dumps(other))
+
+            out = io.StringIO()
+            call_command('request_stats', '--json', stdout=out)
+        dump = json.loads(out.getvalue())
+        row = dump['endpoints']['GET assetcategory-list']
+        self.assertEqual((row['count'], row['window']), (6, 6))
+        self.assertEqual(set(row['total_ms']), {'p50', 'p90', 'p95', 'p99', 'max'})
+        # Each worker's API key cache counters are summed
+        self.assertEqual(dump['extra']['api_key_cache']['workers'], 2)
+        self.assertEqual(dump['extra']['api_key_cache']['max_size'], 2 * api_key_cache.max_size)
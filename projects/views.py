@@ -1,25 +1,197 @@
-from rest_framework import viewsets
+from django.http import StreamingHttpResponse
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
 from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Project, Snapshot, AssetInstance
-from .serializers import ProjectSerializer, SnapshotSerializer, AssetInstanceSerializer
+from assets.filters import CustomFieldFilter
+from assets.importers import ImportFormatError, records_from_request
+from assets.models import Asset
+from assets.serializers import AssetSerializer
+from ephany_framework.pagination import OptionalCursorPagination
+from ephany_framework.prefetch import EagerLoadingMixin, plan_eager_loading
+from ephany_framework.renderers import CSVRenderer, NDJSONRenderer
+from ephany_framework.streaming import streaming_content
+from . import export
+from .bom import snapshot_bom
+from .clone import clone_snapshot
+from .diff import diff_snapshots
+from .importers import InstanceImporter
+from .models import Project, Snapshot, AssetInstance, InstanceFieldValue
+from .serializers import ProjectSerializer, SnapshotSerializer, SnapshotCloneSerializer, AssetInstanceSerializer
 
 class ProjectViewSet(viewsets.ModelViewSet):
     queryset = Project.objects.all()
     serializer_class = ProjectSerializer
+    pagination_class = OptionalCursorPagination
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     search_fields = ['job_id', 'name']
 
+    @action(detail=True, methods=['get'])
+    def bom(self, request, pk=None):
+        """
+        Bill of materials for the project's current (latest dated) snapshot.
+        Endpoint: /api/projects/{id}/bom/
+        """
+        project = self.get_object()
+        snapshot = project.snapshots.order_by('-date', '-id').first()
+        if snapshot is None:
+            return Response({'detail': "Project has no snapshots."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(snapshot_bom(snapshot), status=status.HTTP_200_OK)
+
 class SnapshotViewSet(viewsets.ModelViewSet):
     queryset = Snapshot.objects.all()
     serializer_class = SnapshotSerializer
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_fields = ['project'] # Find snapshots for a project
 
-class AssetInstanceViewSet(viewsets.ModelViewSet):
+    def perform_update(self, serializer):
+        previous_project = serializer.instance.project_id
+        super().perform_update(serializer)
+        if serializer.instance.project_id != previous_project:
+            Project.adjust_snapshot_count(previous_project, -1)
+            Project.adjust_snapshot_count(serializer.instance.project_id, 1)
+
+    @action(detail=True, methods=['get'], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request, pk=None):
+        """
+        Streams every instance of the snapshot without buffering the body.
+        Endpoint: /api/snapshots/{id}/export/?format=ndjson|csv
+        NDJSON emits each distinct asset once; instances reference it by id.
+        """
+        snapshot = self.get_object()
+        renderer = request.accepted_renderer
+
+        if renderer.format == 'csv':
+            stream = export.stream_csv(snapshot)
+        else:
+            stream = export.stream_ndjson(snapshot, self.get_serializer_context())
+
+        response = StreamingHttpResponse(
+            streaming_content(request, stream), content_type=f"{renderer.media_type}; charset=utf-8",
+        )
+        response['Content-Disposition'] = f'attachment; filename="snapshot-{snapshot.id}.{renderer.format}"'
+        return response
+
+    @action(detail=True, methods=['post'])
+    def clone(self, request, pk=None):
+        """
+        Copies the snapshot and all of its instances into a new snapshot,
+        server-side in one transaction.
+        Endpoint: /api/snapshots/{id}/clone/  body: {"name": ..., "date": ..., "project": ...} (all optional)
+        """
+        source = self.get_object()
+        options = SnapshotCloneSerializer(data=request.data)
+        options.is_valid(raise_exception=True)
+
+        snapshot = clone_snapshot(source, **options.validated_data)
+        serializer = self.get_serializer(snapshot)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get'])
+    def bom(self, request, pk=None):
+        """
+        Bill of materials: quantities by asset, category and manufacturer, with
+        lowest / average vendor cost extended by quantity and the longest lead time.
+        Endpoint: /api/snapshots/{id}/bom/
+        """
+        return Response(snapshot_bom(self.get_object()), status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get'], url_path=r'diff/(?P<other_pk>[^/.]+)')
+    def diff(self, request, pk=None, other_pk=None):
+        """
+        What changed from this snapshot to another: added, removed and modified
+        instances (matched on instance_id, else on asset + location), with
+        field-level custom_fields changes.
+        Endpoint: /api/snapshots/{a}/diff/{b}/
+        """
+        old = self.get_object()
+        # DRF's version answers a malformed id with 404 as well
+        new = get_object_or_404(self.get_queryset(), pk=other_pk)
+        return Response(diff_snapshots(old, new), status=status.HTTP_200_OK)
+
+class AssetInstanceViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = AssetInstance.objects.all()
     serializer_class = AssetInstanceSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    pagination_class = OptionalCursorPagination
+    filter_backends = [DjangoFilterBackend, SearchFilter, CustomFieldFilter]
     # filter by snapshot to see the "state" of the project at that time
     filterset_fields = ['snapshot', 'asset']
-    search_fields = ['asset__name', 'asset__model', 'instance_id', 'custom_fields']
\ No newline at end of file
+    search_fields = ['asset__name', 'asset__model', 'instance_id', 'custom_fields']
+    # Typed custom field filters (?cf.serial_number=...) run against this side index
+    custom_field_index = (InstanceFieldValue, 'instance')
+
+    def _sideloads_assets(self):
+        return self.action == 'list' and self.request.query_params.get('sideload') == 'assets'
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['sideload_assets'] = self._sideloads_assets()
+        return context
+
+    def list(self, request, *args, **kwargs):
+        """
+        ?sideload=assets: instances reference their asset by id only, and each
+        asset on the page is rendered once, in an 'assets' map keyed by id.
+        """
+        if not self._sideloads_assets():
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        instances = list(queryset) if page is None else page
+        data = self.get_serializer(instances, many=True).data
+        assets = self._asset_map({instance.asset_id for instance in instances})
+
+        if page is None:
+            return Response({'results': data, 'assets': assets})
+        response = self.get_paginated_response(data)
+        response.data['assets'] = assets
+        return response
+
+    def _asset_map(self, asset_ids):
+        # Addressed as ?fields=assets.<name>; one render per distinct asset
+        context = {**super().get_serializer_context(), 'fieldset_root': ('assets',)}
+        select, prefetch = plan_eager_loading(AssetSerializer(context=context), Asset)
+        assets = list(
+            Asset.objects.filter(pk__in=asset_ids)
+            .select_related(*select)
+            .prefetch_related(*prefetch)
+            .order_by('pk')
+        )
+        data = AssetSerializer(assets, many=True, context=context).data
+        return {str(asset.pk): row for asset, row in zip(assets, data)}
+
+    def perform_update(self, serializer):
+        previous_snapshot = serializer.instance.snapshot_id
+        super().perform_update(serializer)
+        if serializer.instance.snapshot_id != previous_snapshot:
+            Snapshot.touch([previous_snapshot], instance_delta=-1)
+            Snapshot.touch([serializer.instance.snapshot_id], instance_delta=1)
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        Snapshot.touch([instance.snapshot_id], instance_delta=-1)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Bulk-creates instances from NDJSON or CSV, sent as the raw request body
+        or as a multipart file named 'file'.
+        Endpoint: /api/instances/bulk/?snapshot=<id>  (default for rows without one)
+        Invalid rows are reported individually; the rest are imported.
+        """
+        snapshot = None
+        if request.query_params.get('snapshot'):
+            snapshot = Snapshot.objects.filter(pk=request.query_params['snapshot']).first()
+            if snapshot is None:
+                return Response({'detail': "Unknown snapshot."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            importer = InstanceImporter(snapshot=snapshot, batch_size=request.query_params.get('batch_size'))
+            records = records_from_request(request)
+        except ImportFormatError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(importer.run(records), status=status.HTTP_200_OK)
@@ -0,0 +1,124 @@
+"""
+API benchmark: latency, throughput and query counts of the main endpoints.
+
+Usage:
+    python -m support.benchmarks.api > before.json
+    git checkout my-branch
+    python -m support.benchmarks.api --compare before.json
+
+A synthetic catalog is generated (manage.py generate_catalog) in a throwaway
+test database. Then every scenario (asset list, custom field filter, search,
+instance list, details and writes) is timed through GET/PATCH/POST on the
+test client. Results are printed as JSON tagged with the current commit;
+with --compare, a per-scenario comparison against an earlier run goes to
+stderr.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+
+from .common import BASE_DIR, benchmark_database, setup_django, time_calls
+
+
+def scenarios(client, snapshot_id, asset_id, instance_id):
+    """(name, send) pairs; every send issues one request and returns the response."""
+    patch = {'description': 'Benchmark write'}
+    instance = {'snapshot': snapshot_id, 'asset': asset_id, 'location': 'Benchmark 101'}
+    return [
+        ('asset list', lambda: client.get('/api/assets/')),
+        ('asset list, cursor', lambda: client.get('/api/assets/', {'cursor': ''})),
+        ('asset list, cf filter', lambda: client.get('/api/assets/', {'cf.voltage': 208, 'cf.shelf_width__gte': 900})),
+        ('asset list, pricing', lambda: client.get('/api/assets/', {'include': 'pricing'})),
+        ('asset search ?q=', lambda: client.get('/api/assets/', {'q': 'stainless freezer'})),
+        ('asset search ?search=', lambda: client.get('/api/assets/', {'search': 'stainless freezer'})),
+        ('asset detail', lambda: client.get(f'/api/assets/{asset_id}/')),
+        ('instance list', lambda: client.get('/api/instances/', {'snapshot': snapshot_id})),
+        ('instance list, sideload', lambda: client.get('/api/instances/', {'snapshot': snapshot_id, 'sideload': 'assets'})),
+        ('instance list, lean', lambda: client.get('/api/instances/', {'snapshot': snapshot_id, 'fields': 'id,asset,location'})),
+        ('instance detail', lambda: client.get(f'/api/instances/{instance_id}/')),
+        ('snapshot bom', lambda: client.get(f'/api/snapshots/{snapshot_id}/bom/')),
+        ('asset patch', lambda: client.patch(f'/api/assets/{asset_id}/', patch, content_type='application/json')),
+        ('instance create', lambda: client.post('/api/instances/', instance, content_type='application/json')),
+    ]
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, results, out=sys.stderr):
+    before = {row['scenario']: row for row in baseline['results']}
+    out.write(f"{'scenario':<24} {'p50 before':>11} {'p50 after':>10} {'change':>8} {'queries':>10}\n")
+    for row in results:
+        old = before.get(row['scenario'])
+        if old is None:
+            out.write(f"{row['scenario']:<24} {'-':>11} {row['p50_ms']:>10.2f} {'new':>8} {row['queries']:>10}\n")
+            continue
+        change = (row['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0.0
+        queries = f"{old['queries']}->{row['queries']}"
+        out.write(f"{row['scenario']:<24} {old['p50_ms']:>11.2f} {row['p50_ms']:>10.2f} {change:>+7.1f}% {queries:>10}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--assets', type=int, default=10_000)
+    parser.add_argument('--instances', type=int, default=5_000, help="Instances per snapshot")
+    parser.add_argument('--projects', type=int, default=2)
+    parser.add_argument('--snapshots', type=int, default=2, help="Snapshots per project")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--only', nargs='+', help="Run only these scenarios")
+    parser.add_argument('--compare', type=argparse.FileType(), help="JSON output of an earlier run")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test import Client
+
+    with benchmark_database():
+        call_command(
+            'generate_catalog',
+            assets=args.assets, instances=args.instances, projects=args.projects, snapshots=args.snapshots,
+            seed=args.seed, stdout=sys.stderr,
+        )
+        from projects.models import AssetInstance
+        instance = AssetInstance.objects.order_by('pk').first()
+
+        client = Client()
+        results = []
+        for name, send in scenarios(client, instance.snapshot_id, instance.asset_id, instance.pk):
+            if args.only and name not in args.only:
+                continue
+            stats = time_calls(send, name, repeat=args.repeat, expect=(200, 201))
+            results.append({'scenario': name, **stats})
+        vendor = connection.vendor
+
+    output = {
+        'meta': {
+            'commit': commit(),
+            'python': platform.python_version(),
+            'database': vendor,
+            'assets': args.assets,
+            'instances_per_snapshot': args.instances,
+            'snapshots': args.projects * args.snapshots,
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    print(json.dumps(output, indent=2))
+
+    if args.compare:
+        compare(json.load(args.compare), results)
+
+
+if __name__ == '__main__':
+    main()
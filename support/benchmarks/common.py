@@ -0,0 +1,94 @@
+"""
+Shared plumbing for the benchmark scripts.
+
+Benchmarks run against a throwaway test database (never your db.sqlite3) and
+drive the API through Django's test client, so they measure the full
+middleware -> view -> serializer -> renderer path without a network hop.
+"""
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+
+def setup_django():
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ephany_framework.settings')
+
+    import django
+    django.setup()
+
+
+@contextmanager
+def benchmark_database():
+    """Creates a migrated test database for the duration of the block."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def time_request(client, path, params=None, repeat=20, warmup=2):
+    """
+    Issues the same GET `repeat` times and returns latency stats in milliseconds
+    plus the query count of the last run.
+    """
+    return time_calls(lambda: client.get(path, params or {}), f"GET {path} {params}", repeat=repeat, warmup=warmup)
+
+
+def time_calls(send, label, repeat=20, warmup=2, expect=(200,)):
+    """
+    Calls `send()` (which issues one request and returns its response)
+    `repeat` times. Returns latency stats in milliseconds, throughput and the
+    query count of the last run.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    for _ in range(warmup):
+        send()
+
+    samples = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = send()
+            samples.append((time.perf_counter() - start) * 1000)
+        if response.status_code not in expect:
+            raise RuntimeError(f"{label} returned {response.status_code}")
+
+    return summarize(samples, queries=len(queries))
+
+
+def summarize(samples, **extra):
+    ordered = sorted(samples)
+    return {
+        'runs': len(samples),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'p50_ms': round(percentile(ordered, 50), 3),
+        'p95_ms': round(percentile(ordered, 95), 3),
+        'max_ms': round(ordered[-1], 3),
+        'rps': round(len(samples) / (sum(samples) / 1000), 1) if sum(samples) else 0.0,
+        **extra,
+    }
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    index = (len(ordered) - 1) * pct / 100
+    low = int(index)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (index - low)
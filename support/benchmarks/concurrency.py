@@ -0,0 +1,259 @@
+"""
+Concurrency benchmark: WSGI (gunicorn, threads) vs ASGI (uvicorn, async views).
+
+Usage:
+    pip install gunicorn uvicorn
+    python -m support.benchmarks.concurrency --connections 500 --duration 30 > run.json
+
+A synthetic catalog is generated into a throwaway SQLite database. The
+benchmark then starts each server in turn with the same number of worker
+processes and keeps `--connections` keep-alive connections busy for
+`--duration` seconds. The requests are a mix of catalog reads: asset list,
+search and detail, plus categories, manufacturers and attributes. Throughput,
+latency percentiles and errors are printed as JSON tagged with the current
+commit, and a side-by-side table goes to stderr.
+
+The load generator is one asyncio process on the same machine. Give the
+servers fewer CPUs than the machine has (e.g. --workers 2 on 4 cores), or it
+becomes the bottleneck.
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .api import commit
+from .common import BASE_DIR, percentile
+
+SETTINGS = """\
+from ephany_framework.settings.base import *
+
+DEBUG = False
+ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
+DATABASES = {{'default': {{'ENGINE': 'django.db.backends.sqlite3', 'NAME': {database!r}}}}}
+API_KEY_AUTH_ENABLED = False
+INSTRUMENTATION_ENABLED = False
+"""
+
+
+def server_commands(kind, port, workers, threads):
+    address = f'127.0.0.1:{port}'
+    if kind == 'wsgi':
+        return [
+            sys.executable, '-m', 'gunicorn', 'ephany_framework.wsgi:application', '--bind', address,
+            '--workers', str(workers), '--threads', str(threads), '--worker-class', 'gthread',
+            '--backlog', '2048', '--log-level', 'warning',
+        ]
+    return [
+        sys.executable, '-m', 'uvicorn', 'ephany_framework.asgi:application', '--host', '127.0.0.1',
+        '--port', str(port), '--workers', str(workers), '--backlog', '2048', '--no-access-log',
+        '--log-level', 'warning',
+    ]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def prepare_database(workdir, args):
+    """Writes the benchmark settings module and fills its database. Returns the environment for servers."""
+    (workdir / 'bench_settings.py').write_text(SETTINGS.format(database=str(workdir / 'bench.sqlite3')))
+    env = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': 'bench_settings',
+        'PYTHONPATH': os.pathsep.join([str(workdir), str(BASE_DIR), os.environ.get('PYTHONPATH', '')]),
+        'PYTHONWARNINGS': 'ignore',
+    }
+    env.pop('ASYNC_VIEWS', None)  # asgi.py turns it on for the ASGI run only
+    manage = [sys.executable, str(BASE_DIR / 'manage.py')]
+    subprocess.run([*manage, 'migrate', '--verbosity', '0'], env=env, check=True)
+    subprocess.run(
+        [*manage, 'generate_catalog', '--assets', str(args.assets), '--instances', '0', '--projects', '0',
+         '--seed', str(args.seed)],
+        env=env, check=True, stdout=sys.stderr,
+    )
+    return env
+
+
+def catalog_paths(env):
+    """A mix of read requests against ids that exist in the generated catalog."""
+    script = (
+        "import django; django.setup();"
+        "from assets.models import Asset;"
+        "print(' '.join(map(str, Asset.objects.order_by('pk').values_list('pk', flat=True)[:50])))"
+    )
+    ids = subprocess.run([sys.executable, '-c', script], env=env, check=True, capture_output=True, text=True).stdout.split()
+    return [
+        '/api/assets/?page_size=50',
+        '/api/assets/?search=stainless&page_size=20',
+        *[f'/api/assets/{pk}/' for pk in ids[:10]],
+        '/api/categories/',
+        '/api/manufacturers/',
+        '/api/attributes/',
+    ]
+
+
+async def read_response(reader):
+    """Reads one HTTP/1.1 response; returns (status, keep_alive)."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif status not in (204, 304):
+        await reader.read()
+        return status, False
+    return status, headers.get('connection') != 'close'
+
+
+async def connection_loop(port, paths, offset, deadline, samples, counts):
+    """One client connection issuing requests back to back until `deadline`."""
+    reader = writer = None
+    index = offset
+    while time.monotonic() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAccept: application/json\r\n\r\n'.encode())
+            status, keep_alive = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+            counts['errors'] += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.01)
+            continue
+
+        samples.append((time.perf_counter() - start) * 1000)
+        counts['ok' if status < 400 else 'non_2xx'] += 1
+        if not keep_alive:
+            writer.close()
+            reader = writer = None
+
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(port, paths, connections, duration):
+    samples, counts = [], {'ok': 0, 'non_2xx': 0, 'errors': 0}
+    deadline = time.monotonic() + duration
+    started = time.monotonic()
+    await asyncio.gather(*(
+        connection_loop(port, paths, offset, deadline, samples, counts) for offset in range(connections)
+    ))
+    elapsed = time.monotonic() - started
+    ordered = sorted(samples)
+    return {
+        'requests': len(samples),
+        'rps': round(len(samples) / elapsed, 1),
+        'p50_ms': round(percentile(ordered, 50), 2),
+        'p95_ms': round(percentile(ordered, 95), 2),
+        'p99_ms': round(percentile(ordered, 99), 2),
+        'max_ms': round(ordered[-1], 2) if ordered else 0.0,
+        **counts,
+    }
+
+
+def wait_until_ready(port, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with {process.returncode}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1) as sock:
+                sock.sendall(b'GET /api/categories/ HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n')
+                if sock.recv(12).startswith(b'HTTP/1.1 200'):
+                    return
+        except OSError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"Server on port {port} did not become ready")
+
+
+def benchmark(kind, env, paths, args):
+    port = free_port()
+    process = subprocess.Popen(server_commands(kind, port, args.workers, args.threads), env=env, cwd=BASE_DIR)
+    try:
+        wait_until_ready(port, process)
+        asyncio.run(run_load(port, paths, min(args.connections, 50), args.warmup))
+        return asyncio.run(run_load(port, paths, args.connections, args.duration))
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def report(results, out=sys.stderr):
+    out.write(f"{'server':<6} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'non-2xx':>8}\n")
+    for row in results:
+        out.write(
+            f"{row['server']:<6} {row['rps']:>9.1f} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} "
+            f"{row['p99_ms']:>9.2f} {row['errors']:>7} {row['non_2xx']:>8}\n"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--connections', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=30, help="Seconds of load per server")
+    parser.add_argument('--warmup', type=float, default=5, help="Seconds of light load before measuring")
+    parser.add_argument('--workers', type=int, default=2, help="Worker processes for each server")
+    parser.add_argument('--threads', type=int, default=8, help="Threads per gunicorn worker")
+    parser.add_argument('--assets', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--only', choices=('wsgi', 'asgi'), help="Benchmark one server")
+    args = parser.parse_args()
+
+    kinds = [args.only] if args.only else ['wsgi', 'asgi']
+    for kind, module in (('wsgi', 'gunicorn'), ('asgi', 'uvicorn')):
+        if kind in kinds and importlib.util.find_spec(module) is None:
+            parser.error(f"{module} is required for the {kind.upper()} run (pip install {module})")
+
+    with tempfile.TemporaryDirectory(prefix='ephany-concurrency-') as workdir:
+        env = prepare_database(Path(workdir), args)
+        paths = catalog_paths(env)
+        results = [{'server': kind, **benchmark(kind, env, paths, args)} for kind in kinds]
+
+    output = {
+        'meta': {
+            'commit': commit(),
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'connections': args.connections,
+            'duration_s': args.duration,
+            'workers': args.workers,
+            'threads': args.threads,
+            'assets': args.assets,
+            'paths': paths,
+        },
+        'results': results,
+    }
+    print(json.dumps(output, indent=2))
+    report(results)
+
+
+if __name__ == '__main__':
+    main()
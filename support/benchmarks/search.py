@@ -0,0 +1,81 @@
+"""
+Asset search benchmark: ranked FTS5 (?q=) vs. DRF SearchFilter (?search=).
+
+Usage:
+    python -m support.benchmarks.search
+    python -m support.benchmarks.search --sizes 10000 100000 1000000 --repeat 20 > bench_output.txt
+
+The catalog grows in place between sizes (10k -> 100k -> 1M), and every
+size is timed for the same search terms through GET /api/assets/.
+Results are printed as JSON.
+"""
+import argparse
+import json
+import random
+
+from .common import benchmark_database, setup_django, time_request
+
+ADJECTIVES = ['stainless', 'compact', 'commercial', 'undercounter', 'reach-in', 'insulated',
+              'portable', 'heavy-duty', 'ventilated', 'modular', 'ada', 'wall-mount']
+NOUNS = ['sink', 'refrigerator', 'freezer', 'oven', 'fryer', 'griddle', 'shelving',
+         'dishwasher', 'ice machine', 'hood', 'mixer', 'faucet', 'cabinet', 'range']
+FINISHES = ['chrome', 'satin', 'black', 'white', 'brushed nickel', 'galvanized']
+
+SEARCHES = ['sink', 'stainless freezer', 'satin faucet', 'ventilated hood', 'maker 7']
+
+
+def grow_catalog(target, rng, batch_size=5000):
+    from assets.models import Asset, Manufacturer
+
+    manufacturers = list(Manufacturer.objects.all())
+    if not manufacturers:
+        manufacturers = Manufacturer.objects.bulk_create(
+            [Manufacturer(name=f"Maker {i}") for i in range(200)]
+        )
+
+    existing = Asset.objects.count()
+    while existing < target:
+        size = min(batch_size, target - existing)
+        batch = []
+        for i in range(existing, existing + size):
+            noun = rng.choice(NOUNS)
+            batch.append(Asset(
+                type_id=f"BENCH-{i:07d}",
+                manufacturer=rng.choice(manufacturers),
+                model=f"{noun[:3].upper()}-{rng.randint(100, 99999)}",
+                name=f"{rng.choice(ADJECTIVES).title()} {noun.title()}",
+                description=f"{rng.choice(ADJECTIVES)} {noun} with {rng.choice(FINISHES)} finish",
+            ))
+        Asset.objects.bulk_create(batch)
+        existing += size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import Client
+    from assets import search
+
+    rng = random.Random(args.seed)
+    results = []
+    with benchmark_database():
+        client = Client()
+        for size in sorted(args.sizes):
+            grow_catalog(size, rng)
+            search.rebuild_index()
+
+            for term in SEARCHES:
+                for mode in ('search', 'q'):
+                    stats = time_request(client, '/api/assets/', {mode: term}, repeat=args.repeat)
+                    results.append({'rows': size, 'param': mode, 'term': term, **stats})
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Unit conversion microbenchmark: per-row cost of rendering dimensions and
+custom fields in a user's units.
+
+    before: the per-value path AssetSerializer used to take (spec category
+            lookup + UnitConverter.from_storage with its dict lookups and
+            try/except, for every value of every row)
+    after:  ConversionPlan, compiled once per request
+
+Usage:
+    python -m support.benchmarks.units
+    python -m support.benchmarks.units --rows 50000 --repeat 7
+
+No database is needed. Results are printed as JSON (microseconds per row).
+"""
+import argparse
+import json
+import random
+import timeit
+
+from .common import setup_django
+
+DIMENSIONS = ['overall_height', 'overall_width', 'overall_depth']
+
+ATTRIBUTES = {
+    'shelf_width': 'autodesk.spec.aec:length-2.0.0',
+    'clearance': 'autodesk.spec.aec:distance-1.0.0',
+    'footprint': 'autodesk.spec.aec:area-2.0.0',
+    'capacity': 'autodesk.spec.aec:volume-2.0.0',
+    'weight': 'autodesk.spec.aec:mass-2.0.0',
+    'voltage': 'autodesk.spec:number-2.0.0',
+    'finish': 'autodesk.spec:string-2.0.0',
+}
+
+IMPERIAL = {'length': 'in', 'area': 'sq_ft', 'volume': 'cu_ft', 'mass': 'lb'}
+
+
+def make_rows(count, rng):
+    rows = []
+    for _ in range(count):
+        row = {field: rng.uniform(100, 3000) for field in DIMENSIONS}
+        row['custom_fields'] = {
+            'shelf_width': rng.uniform(100, 900),
+            'clearance': rng.uniform(10, 90),
+            'footprint': rng.uniform(0.1, 4),
+            'capacity': rng.uniform(0.01, 2),
+            'weight': rng.uniform(1, 400),
+            'voltage': rng.choice([120, 208, 277]),
+            'finish': rng.choice(['chrome', 'satin']),
+        }
+        rows.append(row)
+    return rows
+
+
+def render_before(rows, user_units, attribute_units):
+    from ephany_framework.utils import UnitConverter
+
+    for row in rows:
+        for field in DIMENSIONS:
+            if row[field] is not None:
+                UnitConverter.from_storage(row[field], user_units['length'], 'length')
+        converted = row['custom_fields'].copy()
+        for key, value in converted.items():
+            category = UnitConverter.category_for_spec(attribute_units.get(key))
+            if category and isinstance(value, (int, float)):
+                target_unit = user_units.get(category)
+                if target_unit:
+                    converted[key] = UnitConverter.from_storage(value, target_unit, category)
+
+
+def render_after(rows, user_units, attribute_units):
+    from ephany_framework.utils import ConversionPlan
+
+    plan = ConversionPlan(user_units, attribute_units)
+    for row in rows:
+        for field in DIMENSIONS:
+            plan.dimension(row[field])
+        plan.custom_fields(row['custom_fields'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    rows = make_rows(args.rows, random.Random(args.seed))
+
+    results = []
+    for label, render in (('before', render_before), ('after', render_after)):
+        best = min(timeit.repeat(lambda: render(rows, IMPERIAL, ATTRIBUTES), number=1, repeat=args.repeat))
+        results.append({'path': label, 'rows': args.rows, 'us_per_row': round(best / args.rows * 1e6, 3)})
+
+    results.append({'speedup': round(results[0]['us_per_row'] / results[1]['us_per_row'], 2)})
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()